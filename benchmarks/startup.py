@@ -0,0 +1,119 @@
+"""
+Startup benchmark: guards CLI import time against heavy dependencies creeping back in.
+
+Runs each scenario in a fresh interpreter with `-X importtime`, reports the
+cumulative import time and the slowest top-level imports, and exits non-zero
+if a scenario loads a forbidden module or exceeds its time budget.
+
+Usage: python benchmarks/startup.py [--repeat 5] [--budget-scale 1.0]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('pandas', 'scipy', 'yfinance', 'matplotlib')
+
+# Parametric VaR end to end: prices through the fetch path (served by a price cache whose
+# downloader is a local stand-in for Yahoo Finance) into returns and the VaR calculation.
+# Fetching needs pandas, but nothing should load yfinance, scipy or matplotlib.
+PARAMETRIC_RUN = '''
+import tempfile
+import numpy as np
+import pandas as pd
+from src.data_fetcher import fetch_stock_data, set_price_cache
+from src.price_cache import PriceCache
+from src.parametric_var import calculate_parametric_var
+
+def downloader(symbol, period=None, start=None):
+    dates = pd.bdate_range(end='2024-12-31', periods=400)
+    prices = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, len(dates))))
+    return pd.Series(prices, index=dates, name=symbol)
+
+with tempfile.TemporaryDirectory() as directory:
+    set_price_cache(PriceCache(directory, downloader))
+    returns = fetch_stock_data('RELIANCE', 'NSE', 252)
+    calculate_parametric_var(returns, 1000000, 0.99, 10)
+'''
+
+# (name, python arguments, modules that must not be imported, budget in ms)
+SCENARIOS = [
+    ('import src.cli', ['-c', 'import src.cli'], HEAVY_MODULES, 150),
+    ('main.py --help', ['main.py', '--help'], HEAVY_MODULES, 150),
+    ('main.py surface --help', ['main.py', 'surface', '--help'], HEAVY_MODULES, 300),
+    ('main.py backtest --help', ['main.py', 'backtest', '--help'], HEAVY_MODULES, 300),
+    ('import src.parametric_var', ['-c', 'import src.parametric_var'], HEAVY_MODULES, 300),
+    ('parametric VaR end to end', ['-c', PARAMETRIC_RUN], ('scipy', 'yfinance', 'matplotlib'), 800),
+]
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output.
+
+    :param stderr: Interpreter stderr
+    :return: List of (module, cumulative microseconds, nesting depth)
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(cumulative), depth))
+    return imports
+
+def measure(arguments):
+    """
+    Run one scenario in a fresh interpreter.
+
+    :param arguments: Arguments passed to the interpreter after -X importtime
+    :return: Tuple of (total import time in ms, list of parsed imports)
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', *arguments],
+        cwd=BASE_DIR, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONPATH': BASE_DIR}
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(arguments)} failed:\n{completed.stderr[-2000:]}")
+    imports = parse_importtime(completed.stderr)
+    total = sum(cumulative for _, cumulative, depth in imports if depth == 0) / 1000
+    return total, imports
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CLI startup import time')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per scenario; the fastest is reported [default: 5]')
+    parser.add_argument('--budget-scale', type=float, default=1.0, help='Multiply every time budget (for slow machines) [default: 1.0]')
+    parser.add_argument('--top', type=int, default=5, help='Slowest top-level imports to list [default: 5]')
+    args = parser.parse_args()
+
+    failures = []
+    for name, arguments, forbidden, budget in SCENARIOS:
+        runs = [measure(arguments) for _ in range(args.repeat)]
+        total, imports = min(runs, key=lambda run: run[0])
+        budget *= args.budget_scale
+
+        loaded = sorted({module.split('.')[0] for module, _, _ in imports} & set(forbidden))
+        status = 'ok'
+        if loaded:
+            status = 'FAIL'
+            failures.append(f"{name}: imports {', '.join(loaded)}")
+        if total > budget:
+            status = 'FAIL'
+            failures.append(f"{name}: {total:.1f} ms exceeds budget of {budget:.0f} ms")
+
+        print(f"{name:<30} {total:8.1f} ms  (budget {budget:.0f} ms)  {status}")
+        top_level = sorted((entry for entry in imports if entry[2] == 0), key=lambda entry: -entry[1])
+        for module, cumulative, _ in top_level[:args.top]:
+            print(f"    {module:<40} {cumulative / 1000:8.1f} ms")
+
+    if failures:
+        print("\nStartup regressions:")
+        for failure in failures:
+            print(f"• {failure}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""
+VaR benchmark suite: wall time and peak memory of every calculator on synthetic data.
+
+Sweeps series lengths, horizons, simulation counts and portfolio sizes across
+the parametric, historical and Monte Carlo calculators (lognormal and
+path-wise), the portfolio calculators, the price-to-returns transform and
+report rendering. No network access is needed.
+
+Usage:
+    python benchmarks/var_benchmarks.py run --output benchmarks/baseline.json [--quick] [--filter historical]
+    python benchmarks/var_benchmarks.py compare benchmarks/baseline.json current.json [--threshold 0.2]
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime
+from functools import partial
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import numpy as np
+import pandas as pd
+
+from src.parametric_var import calculate_parametric_var
+from src.historical_var import calculate_historical_var
+from src.monte_carlo_var import calculate_monte_carlo_var, calculate_path_monte_carlo_var
+from src.portfolio_var import (
+    calculate_portfolio_parametric_var,
+    calculate_portfolio_historical_var,
+    calculate_portfolio_monte_carlo_var
+)
+from src.returns_transform import transform_prices
+from src.renderer import render_report
+
+SERIES_LENGTHS = (252, 2520, 25200, 252000, 1000000)
+HORIZONS = (1, 10)
+SIMULATIONS = (10000, 100000, 1000000)
+PORTFOLIO_SIZES = (10, 100, 500)
+REPORT_SIZES = (1, 20)
+
+# Reduced sweep for quick checks
+QUICK_SERIES_LENGTHS = (252, 25200)
+QUICK_SIMULATIONS = (10000, 100000)
+QUICK_PORTFOLIO_SIZES = (10, 100)
+
+PORTFOLIO_VALUE = 1000000.0
+CONFIDENCE_LEVEL = 0.99
+SEED = 42
+
+def synthetic_returns(length, assets=None, seed=SEED):
+    """Fat-tailed daily log returns (Student-t, 4 degrees of freedom) of a given shape"""
+    rng = np.random.default_rng(seed)
+    shape = length if assets is None else (length, assets)
+    return 0.0003 + 0.01 * rng.standard_t(4, shape) / np.sqrt(2.0)
+
+def synthetic_prices(length, assets, seed=SEED, missing=0.02):
+    """Closing price Series per asset on business days, with a fraction of non-trading days"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2000-01-03', periods=length)
+    prices = 100 * np.exp(np.cumsum(synthetic_returns(length, assets, seed), axis=0))
+    histories = []
+    for column in range(assets):
+        series = pd.Series(prices[:, column], index=dates, name=f"SYN{column}.NS")
+        histories.append(series[rng.random(length) >= missing])
+    return histories
+
+def _single_asset_case(calculator, length, **kwargs):
+    """Setup for a single-asset calculator on a raw array, so each call pays for validation and statistics"""
+    returns = synthetic_returns(length)
+    return lambda: calculator(returns, PORTFOLIO_VALUE, CONFIDENCE_LEVEL, **kwargs)
+
+def _portfolio_case(calculator, assets, **kwargs):
+    """Setup for a portfolio calculator over a year of returns with equal holdings"""
+    returns = synthetic_returns(252, assets)
+    holdings = np.full(assets, PORTFOLIO_VALUE / assets)
+    return lambda: calculator(returns, holdings, CONFIDENCE_LEVEL, **kwargs)
+
+def _transform_series_case(length):
+    """Setup for one symbol's prices to its ReturnSeries, as fetch_stock_data does"""
+    prices = synthetic_prices(length, 1)[0]
+    return lambda: transform_prices({prices.name: prices}).series(prices.name)
+
+def _transform_case(assets, length, outlier_policy):
+    prices = synthetic_prices(length, assets)
+    return lambda: transform_prices(prices, outlier_policy=outlier_policy)
+
+def build_cases(quick=False):
+    """
+    Build the benchmark cases.
+
+    :param quick: Use the reduced sweep
+    :return: List of (name, params, setup) where setup() returns the zero-argument callable to measure
+    """
+    lengths = QUICK_SERIES_LENGTHS if quick else SERIES_LENGTHS
+    simulations = QUICK_SIMULATIONS if quick else SIMULATIONS
+    portfolio_sizes = QUICK_PORTFOLIO_SIZES if quick else PORTFOLIO_SIZES
+    cases = []
+
+    for length in lengths:
+        for horizon in HORIZONS:
+            cases.append((
+                f"parametric/n={length}/h={horizon}",
+                {'method': 'parametric', 'length': length, 'horizon': horizon},
+                partial(_single_asset_case, calculate_parametric_var, length, horizon=horizon)
+            ))
+            for method in (('bootstrap', 'overlapping') if horizon > 1 else ('bootstrap',)):
+                cases.append((
+                    f"historical/{method}/n={length}/h={horizon}",
+                    {'method': 'historical', 'aggregation': method, 'length': length, 'horizon': horizon},
+                    partial(_single_asset_case, calculate_historical_var, length,
+                            horizon=horizon, method=method, seed=SEED)
+                ))
+
+    for count in simulations:
+        # Sobol points are balanced only in power-of-two counts
+        for sampling, sampled in (('pseudo', count), ('antithetic', count), ('sobol', 2 ** round(np.log2(count)))):
+            for horizon in HORIZONS:
+                cases.append((
+                    f"monte_carlo/{sampling}/sims={sampled}/h={horizon}",
+                    {'method': 'monte_carlo', 'sampling': sampling, 'simulations': sampled, 'horizon': horizon},
+                    partial(_single_asset_case, calculate_monte_carlo_var, 252, horizon=horizon,
+                            simulations=sampled, seed=SEED, sampling=sampling)
+                ))
+
+    # Path-wise Monte Carlo: per-step cost over a long horizon, in both precisions
+    for count in simulations:
+        for volatility_model in ('constant', 'garch'):
+            for dtype in (np.float64, np.float32):
+                cases.append((
+                    f"monte_carlo_paths/{volatility_model}/{np.dtype(dtype).name}/sims={count}/h=250",
+                    {'method': 'monte_carlo_paths', 'volatility_model': volatility_model,
+                     'dtype': np.dtype(dtype).name, 'simulations': count, 'horizon': 250},
+                    partial(_single_asset_case, calculate_path_monte_carlo_var, 2520, horizon=250,
+                            simulations=count, volatility_model=volatility_model, dtype=dtype, seed=SEED)
+                ))
+
+    calculators = {
+        'parametric': (calculate_portfolio_parametric_var, {}),
+        'historical': (calculate_portfolio_historical_var, {'seed': SEED}),
+        'monte_carlo': (calculate_portfolio_monte_carlo_var, {'seed': SEED}),
+    }
+    for assets in portfolio_sizes:
+        for horizon in HORIZONS:
+            for method, (calculator, options) in calculators.items():
+                cases.append((
+                    f"portfolio/{method}/assets={assets}/h={horizon}",
+                    {'method': f"portfolio_{method}", 'assets': assets, 'horizon': horizon},
+                    partial(_portfolio_case, calculator, assets, horizon=horizon, **options)
+                ))
+
+    # Fetch-to-returns transform: one symbol's series, then the N-symbol matrix
+    for length in lengths[:3]:
+        cases.append((
+            f"transform/transform_prices/n={length}",
+            {'method': 'transform_prices', 'length': length},
+            partial(_transform_series_case, length)
+        ))
+    for assets in portfolio_sizes:
+        for outlier_policy in ('keep', 'mask'):
+            cases.append((
+                f"transform/transform_prices/{outlier_policy}/assets={assets}",
+                {'method': 'transform_prices', 'outlier_policy': outlier_policy, 'assets': assets, 'length': 2520},
+                partial(_transform_case, assets, 2520, outlier_policy)
+            ))
+
+    # Report rendering into a scratch directory
+    for fmt in ('png', 'pdf', 'html', 'none'):
+        for size in REPORT_SIZES:
+            cases.append((
+                f"report/{fmt}/positions={size}",
+                {'method': 'report', 'format': fmt, 'positions': size},
+                partial(_report_case, fmt, size)
+            ))
+    return cases
+
+def _report_case(fmt, size):
+    directory = tempfile.mkdtemp(prefix='var_benchmark_')
+    atexit.register(shutil.rmtree, directory, True)
+    records = [
+        {'ticker': f"SYN{index}", 'exchange': 'NSE', 'portfolio_value': PORTFOLIO_VALUE,
+         'parametric_var': 20000.0 + index, 'historical_var': 21000.0, 'monte_carlo_var': 19500.0}
+        for index in range(size)
+    ]
+    if fmt == 'png':
+        from src.renderer import render_png
+        paths = [os.path.join(directory, f"chart_{index}.png") for index in range(size)]
+        return lambda: render_png(records, paths)
+    filepath = os.path.join(directory, f"report.{'json' if fmt == 'none' else fmt}")
+    return lambda: render_report(records, fmt, filepath)
+
+def measure(function, repeat):
+    """
+    Measure one benchmark case.
+
+    Timing and memory are measured in separate runs, since tracemalloc slows
+    the code it traces.
+
+    :param function: Zero-argument callable
+    :param repeat: Timed runs; the fastest is reported
+    :return: Dict with seconds (best of repeat) and peak_bytes (traced allocation peak)
+    """
+    function()  # Warm up imports, caches and the renderer figure
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(times), 'peak_bytes': peak}
+
+def run(args):
+    cases = [case for case in build_cases(args.quick) if not args.filter or args.filter in case[0]]
+    if not cases:
+        raise SystemExit(f"No benchmark cases match '{args.filter}'")
+
+    results = {}
+    for name, params, setup in cases:
+        function = setup()
+        results[name] = {**params, **measure(function, args.repeat)}
+        print(f"{name:<55} {results[name]['seconds'] * 1000:10.2f} ms {results[name]['peak_bytes'] / 2**20:9.2f} MiB",
+              flush=True)
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'quick': args.quick,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n{len(results)} benchmark results saved to {args.output}")
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    with open(args.current) as f:
+        current = json.load(f)['results']
+
+    regressions = []
+    print(f"{'case':<55} {'time':>10} {'memory':>10}")
+    for name in sorted(set(baseline) & set(current)):
+        time_ratio = current[name]['seconds'] / max(baseline[name]['seconds'], 1e-9)
+        memory_ratio = current[name]['peak_bytes'] / max(baseline[name]['peak_bytes'], 1)
+        flags = []
+        # Sub-millisecond timings are too noisy to judge against a relative threshold
+        if time_ratio > 1 + args.threshold and current[name]['seconds'] > args.min_seconds:
+            flags.append('TIME')
+        if memory_ratio > 1 + args.memory_threshold:
+            flags.append('MEMORY')
+        if flags:
+            regressions.append((name, flags))
+        print(f"{name:<55} {time_ratio:9.2f}x {memory_ratio:9.2f}x  {' '.join(flags)}")
+
+    for name in sorted(set(baseline) ^ set(current)):
+        print(f"{name:<55} {'only in ' + ('baseline' if name in baseline else 'current'):>21}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regressions beyond {args.threshold:.0%} time / {args.memory_threshold:.0%} memory:")
+        for name, flags in regressions:
+            print(f"• {name}: {', '.join(flags)}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+def main():
+    parser = argparse.ArgumentParser(description='VaR calculator benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks and save the results')
+    run_parser.add_argument('--output', type=str, default='benchmark_results.json',
+                            help='Results file [default: benchmark_results.json]')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the fastest is kept [default: 3]')
+    run_parser.add_argument('--quick', action='store_true', help='Reduced sweep (no 1M-row series or 1M simulations)')
+    run_parser.add_argument('--filter', type=str, default=None, help='Only cases whose name contains this text')
+
+    compare_parser = commands.add_parser('compare', help='Compare results against a baseline')
+    compare_parser.add_argument('baseline', type=str, help='Baseline results file')
+    compare_parser.add_argument('current', type=str, help='Current results file')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help='Allowed relative slowdown before flagging [default: 0.2]')
+    compare_parser.add_argument('--memory-threshold', type=float, default=0.2,
+                                help='Allowed relative peak memory growth before flagging [default: 0.2]')
+    compare_parser.add_argument('--min-seconds', type=float, default=0.001,
+                                help='Ignore slowdowns of cases faster than this [default: 0.001]')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,83 @@
-import os
-import getpass
-from datetime import datetime
-
-# Get the absolute path to this file (settings.py)
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Base directory is one level up from config/
-BASE_DIR = os.path.dirname(current_dir)
-
-# Data directories
-DATA_DIR = os.path.join(BASE_DIR, 'data')
-LOGS_DIR = os.path.join(DATA_DIR, 'logs')
-PORTFOLIOS_DIR = os.path.join(DATA_DIR, 'portfolios')
-REPORTS_DIR = os.path.join(DATA_DIR, 'reports')
-
-# Create directories if not exists
-for d in [DATA_DIR, LOGS_DIR, PORTFOLIOS_DIR, REPORTS_DIR]:
-    os.makedirs(d, exist_ok=True)
-
-# Current user and timestamp
-CURRENT_USER = getpass.getuser()
-TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-# Path to logging configuration
-LOGGING_CONF = os.path.join(current_dir, 'logging.conf')
+import os
+from datetime import datetime
+
+# Get the absolute path to this file (settings.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Base directory is one level up from config/
+BASE_DIR = os.path.dirname(current_dir)
+
+# Data directories
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+LOGS_DIR = os.path.join(DATA_DIR, 'logs')
+REPORTS_DIR = os.path.join(DATA_DIR, 'reports')
+PRICES_DIR = os.path.join(DATA_DIR, 'prices')
+
+# Memory-mapped returns matrix built by 'main.py store'
+RETURNS_STORE_DIR = os.path.join(DATA_DIR, 'returns_store')
+
+# SQLite database of recorded VaR runs
+RESULTS_DB = os.path.join(DATA_DIR, 'results.db')
+
+def ensure_dir(path):
+    """Create a directory if not exists (on first use, not at import) and return its path"""
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def __getattr__(name):
+    """Resolve the current user and run timestamp on first access"""
+    if name == 'CURRENT_USER':
+        import getpass
+        value = getpass.getuser()
+    elif name == 'TIMESTAMP':
+        value = datetime.now().strftime("%Y%m%d_%H%M%S")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Cache so later accesses are plain attribute lookups
+    globals()[name] = value
+    return value
+
+# Seconds before cached prices are refreshed from Yahoo Finance
+PRICE_CACHE_MAX_AGE = 3600
+
+# Concurrent bulk fetch: worker threads, per-symbol timeout (seconds),
+# retries per symbol and initial retry backoff (seconds, doubled per retry)
+FETCH_WORKERS = 16
+FETCH_TIMEOUT = 30
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 0.5
+
+# Price-to-returns transform: trading calendar ('union' of every symbol's dates, or
+# 'common' for dates on which every exchange traded), gap policy ('ffill' folds a missed
+# day's move into the next return, 'drop' discards returns spanning a gap), longest gap
+# bridged in days (None for no limit), outlier policy ('keep', 'clip' or 'mask') and
+# threshold (robust standard deviations from the median), and the minimum fraction of
+# dates a symbol's returns must cover
+RETURNS_CALENDAR = 'union'
+GAP_POLICY = 'ffill'
+MAX_GAP_DAYS = None
+OUTLIER_POLICY = 'keep'
+OUTLIER_THRESHOLD = 10.0
+MIN_COVERAGE = 0.9
+
+# CSV or JSON file of splits and dividends (date, symbol, split and/or dividend columns).
+# When set, Yahoo Finance closes are downloaded unadjusted (cached apart, in
+# PRICES_DIR/unadjusted) and every returns transform applies these actions instead;
+# None keeps Yahoo's split- and dividend-adjusted closes
+CORPORATE_ACTIONS_FILE = None
+
+# Resolution (dots per inch) of rendered report images
+REPORT_DPI = 100
+
+# VaR service: bind address, cached entries per cache and their lifetime (seconds)
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8080
+SERVER_CACHE_SIZE = 1024
+SERVER_CACHE_TTL = 300
+
+# Per-run stage timings and counters, appended as JSON lines next to app.log
+METRICS_ENABLED = True
+METRICS_FILE = os.path.join(LOGS_DIR, 'metrics.jsonl')
+
+# Path to logging configuration
+LOGGING_CONF = os.path.join(current_dir, 'logging.conf')
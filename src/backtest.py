@@ -0,0 +1,309 @@
+import bisect
+import numpy as np
+from statistics import NormalDist
+import logging
+from .return_series import ReturnSeries
+from .mc_engine import simulate_standard_normals
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_METHODS = ('parametric', 'historical', 'monte_carlo')
+
+class SortedWindow:
+    """
+    Sliding window kept in sorted order for O(log W) order-statistic lookups.
+
+    Values are inserted and removed by binary search, so moving the window by
+    one observation never re-sorts it.
+    """
+
+    def __init__(self, values=()):
+        self._values = sorted(values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def insert(self, value):
+        bisect.insort(self._values, value)
+
+    def remove(self, value):
+        del self._values[bisect.bisect_left(self._values, value)]
+
+    def quantile(self, q):
+        """Quantile with linear interpolation, matching np.percentile"""
+        position = q * (len(self._values) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(self._values) - 1)
+        return self._values[lower] + (self._values[upper] - self._values[lower]) * (position - lower)
+
+def rolling_moments(returns, window):
+    """
+    Rolling mean and standard deviation (ddof=0) of the trailing window for each day.
+
+    Window sums are updated incrementally (one observation added and one removed
+    per day) through running sums of the centered returns and their squares.
+
+    :param returns: Array of daily log returns
+    :param window: Rolling window size (days)
+    :return: Tuple of (means, stds) for windows ending before days window..n-1
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    # Centering keeps the running sum of squares well conditioned
+    center = returns.mean()
+    centered = returns - center
+    sums = np.concatenate(([0.0], np.cumsum(centered)))
+    squares = np.concatenate(([0.0], np.cumsum(centered ** 2)))
+    window_sums = sums[window:-1] - sums[:-window - 1]
+    window_squares = squares[window:-1] - squares[:-window - 1]
+    mean = window_sums / window
+    variance = np.maximum(window_squares / window - mean ** 2, 0.0)
+    return mean + center, np.sqrt(variance)
+
+def rolling_historical_quantile(returns, window, q):
+    """
+    q-quantile of the trailing window of returns for each day.
+
+    :param returns: Array of daily log returns
+    :param window: Rolling window size (days)
+    :param q: Probability in [0, 1]
+    :return: Quantiles for windows ending before days window..n-1
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    sorted_window = SortedWindow(returns[:window])
+    quantiles = np.empty(len(returns) - window)
+    for day in range(window, len(returns)):
+        quantiles[day - window] = sorted_window.quantile(q)
+        sorted_window.remove(returns[day - window])
+        sorted_window.insert(returns[day])
+    return quantiles
+
+def rolling_var(returns, window=252, confidence_level=0.99, methods=BACKTEST_METHODS,
+                portfolio_value=1.0, simulations=10000, seed=None):
+    """
+    One-day VaR forecast for every day from the trailing window of returns.
+
+    :param returns: Array of daily log returns
+    :param window: Rolling window size (days)
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param methods: Any of 'parametric', 'historical', 'monte_carlo'
+    :param portfolio_value: Portfolio value
+    :param simulations: Monte Carlo simulations count
+    :param seed: Random seed for the Monte Carlo shocks
+    :return: Dict of method -> array of VaR forecasts for days window..n-1
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    forecasts = {}
+    if 'parametric' in methods or 'monte_carlo' in methods:
+        mean, std = rolling_moments(returns, window)
+    if 'parametric' in methods:
+        # Formula: VaR = Portfolio Value × |Z × σ - μ|
+        z_score = NormalDist().inv_cdf(1 - confidence_level)
+        forecasts['parametric'] = portfolio_value * np.abs(z_score * std - mean)
+    if 'historical' in methods:
+        quantiles = rolling_historical_quantile(returns, window, 1 - confidence_level)
+        forecasts['historical'] = -portfolio_value * np.expm1(quantiles)
+    if 'monte_carlo' in methods:
+        # Common shocks for every day: the one-day GBM log return is
+        # (μ - 0.5σ²) + σZ, so only the shock quantile is needed
+        shocks = simulate_standard_normals(simulations, seed=seed)
+        shock_quantile = np.percentile(shocks, 100 * (1 - confidence_level))
+        forecasts['monte_carlo'] = -portfolio_value * np.expm1(mean - 0.5 * std ** 2 + std * shock_quantile)
+    return {method: np.maximum(var, 0.0) for method, var in forecasts.items()}
+
+def kupiec_test(exceptions, confidence_level):
+    """
+    Kupiec proportion-of-failures test of the exception rate.
+
+    :param exceptions: Boolean array of VaR exceptions
+    :param confidence_level: VaR confidence level
+    :return: Tuple of (likelihood ratio, p-value)
+    """
+    from scipy.stats import chi2
+    from scipy.special import xlogy
+
+    n = len(exceptions)
+    x = int(np.sum(exceptions))
+    p = 1 - confidence_level
+    observed = x / n
+    ratio = -2 * (
+        xlogy(n - x, 1 - p) + xlogy(x, p) - xlogy(n - x, 1 - observed) - xlogy(x, observed)
+    )
+    ratio = max(0.0, float(ratio))
+    return ratio, chi2.sf(ratio, 1)
+
+def christoffersen_test(exceptions):
+    """
+    Christoffersen test of independence of consecutive exceptions.
+
+    :param exceptions: Boolean array of VaR exceptions
+    :return: Tuple of (likelihood ratio, p-value)
+    """
+    from scipy.stats import chi2
+    from scipy.special import xlogy
+
+    exceptions = np.asarray(exceptions, dtype=bool)
+    previous, current = exceptions[:-1], exceptions[1:]
+    n00 = np.sum(~previous & ~current)
+    n01 = np.sum(~previous & current)
+    n10 = np.sum(previous & ~current)
+    n11 = np.sum(previous & current)
+
+    pi = (n01 + n11) / max(n00 + n01 + n10 + n11, 1)
+    pi0 = n01 / max(n00 + n01, 1)
+    pi1 = n11 / max(n10 + n11, 1)
+    ratio = -2 * (
+        xlogy(n00 + n10, 1 - pi) + xlogy(n01 + n11, pi)
+        - xlogy(n00, 1 - pi0) - xlogy(n01, pi0) - xlogy(n10, 1 - pi1) - xlogy(n11, pi1)
+    )
+    ratio = max(0.0, float(ratio))
+    return ratio, chi2.sf(ratio, 1)
+
+class BacktestResult:
+    """
+    Outcome of a VaR backtest.
+
+    :ivar exceptions: DataFrame with one row per symbol, method and date:
+                      var, realized_loss, exception
+    :ivar statistics: DataFrame with one row per symbol and method: exception
+                      counts, Kupiec, Christoffersen and conditional coverage tests
+    """
+
+    def __init__(self, exceptions, statistics):
+        self.exceptions = exceptions
+        self.statistics = statistics
+
+@timed('backtest')
+def backtest_var(returns_by_symbol, window=252, confidence_level=0.99, methods=BACKTEST_METHODS,
+                 portfolio_value=1.0, simulations=10000, seed=None):
+    """
+    Backtest rolling one-day VaR forecasts against realized losses.
+
+    :param returns_by_symbol: Dict of symbol -> ReturnSeries, Series or array of daily log returns
+    :param window: Rolling window size (days)
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param methods: Any of 'parametric', 'historical', 'monte_carlo'
+    :param portfolio_value: Portfolio value, or dict of symbol -> portfolio value
+    :param simulations: Monte Carlo simulations count
+    :param seed: Random seed for the Monte Carlo shocks
+    :return: BacktestResult
+    """
+    # Deferred so the CLI can read BACKTEST_METHODS without loading pandas or scipy
+    import pandas as pd
+    from scipy.stats import chi2
+
+    try:
+        # Validate inputs
+        if not 0.90 <= confidence_level <= 0.99:
+            raise ValueError("Confidence level must be between 0.90 and 0.99")
+        if window < 10:
+            raise ValueError("Rolling window must be at least 10 days")
+        unknown = set(methods) - set(BACKTEST_METHODS)
+        if unknown:
+            raise ValueError(f"Unknown methods: {', '.join(sorted(unknown))}")
+        if 'monte_carlo' in methods and simulations <= 1000:
+            raise ValueError("Minimum 1000 simulations required")
+
+        frames = []
+        statistics = []
+        for symbol, returns in returns_by_symbol.items():
+            if isinstance(returns, ReturnSeries):
+                dates = returns.dates
+            else:
+                dates = getattr(returns, 'index', None)
+            returns = np.asarray(returns, dtype=np.float64)
+            if len(returns) <= window:
+                raise ValueError(f"Insufficient data for {symbol}: need more than {window} returns")
+            dates = np.arange(len(returns)) if dates is None else np.asarray(dates)
+
+            value = portfolio_value[symbol] if isinstance(portfolio_value, dict) else portfolio_value
+            realized_loss = -value * np.expm1(returns[window:])
+            forecasts = rolling_var(returns, window, confidence_level, methods, value, simulations, seed)
+
+            for method, var in forecasts.items():
+                exceptions = realized_loss > var
+                frames.append(pd.DataFrame({
+                    'symbol': symbol,
+                    'method': method,
+                    'date': dates[window:],
+                    'var': var,
+                    'realized_loss': realized_loss,
+                    'exception': exceptions,
+                }))
+                kupiec_lr, kupiec_p = kupiec_test(exceptions, confidence_level)
+                independence_lr, independence_p = christoffersen_test(exceptions)
+                statistics.append({
+                    'symbol': symbol,
+                    'method': method,
+                    'observations': len(exceptions),
+                    'exceptions': int(exceptions.sum()),
+                    'expected_exceptions': len(exceptions) * (1 - confidence_level),
+                    'exception_rate': exceptions.mean(),
+                    'kupiec_lr': kupiec_lr,
+                    'kupiec_p': kupiec_p,
+                    'christoffersen_lr': independence_lr,
+                    'christoffersen_p': independence_p,
+                    'conditional_coverage_lr': kupiec_lr + independence_lr,
+                    'conditional_coverage_p': chi2.sf(kupiec_lr + independence_lr, 2),
+                })
+
+        logger.info(
+            f"VaR backtest completed for {len(returns_by_symbol)} symbols x {len(methods)} methods "
+            f"(window={window}, confidence={confidence_level*100:.1f}%)"
+        )
+        return BacktestResult(pd.concat(frames, ignore_index=True), pd.DataFrame(statistics))
+
+    except Exception as e:
+        logger.error(f"VaR backtest failed: {str(e)}")
+        raise RuntimeError(f"VaR backtest error: {str(e)}")
+
+def run_backtest(positions, window=252, history=2520, confidence_level=0.99, methods=BACKTEST_METHODS,
+                 simulations=10000, seed=None, offline=False, fetch_workers=None):
+    """
+    Backtest rolling VaR for every position in one run.
+
+    :param positions: DataFrame with ticker, exchange and portfolio_value columns
+    :param window: Rolling window size (days)
+    :param history: Price history fetched per symbol (days)
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param methods: Any of 'parametric', 'historical', 'monte_carlo'
+    :param simulations: Monte Carlo simulations count
+    :param seed: Random seed for the Monte Carlo shocks
+    :param offline: Serve purely from cache without network access
+    :param fetch_workers: Concurrent price downloads
+    :return: Tuple of (BacktestResult, dict of symbol -> error for skipped symbols)
+    """
+    import pandas as pd
+    from .bulk_fetcher import fetch_bulk_prices
+    from .data_fetcher import yahoo_symbol
+    from .returns_transform import transform_prices
+
+    if history <= window:
+        raise ValueError("Price history must be longer than the rolling window")
+
+    symbols = [yahoo_symbol(t, e) for t, e in zip(positions['ticker'], positions['exchange'])]
+    # Repeated symbols are netted into a single holding
+    holdings = positions.groupby(pd.Index(symbols), sort=False)['portfolio_value'].sum()
+    pairs = list(dict.fromkeys(zip(positions['ticker'], positions['exchange'])))
+    histories, failed = fetch_bulk_prices(pairs, history, offline=offline, max_workers=fetch_workers)
+
+    returns_by_symbol = {}
+    if histories:
+        matrix = transform_prices(histories)
+        for symbol, valid in zip(matrix.symbols, matrix.counts):
+            if valid <= window:
+                failed[symbol] = f"Insufficient data for a {window}-day rolling window"
+            else:
+                returns_by_symbol[symbol] = matrix.series(symbol)
+    for symbol, error in failed.items():
+        logger.warning(f"Skipping {symbol} in backtest: {error}")
+    if not returns_by_symbol:
+        raise ValueError("No symbols with enough data to backtest")
+
+    logger.info(f"Backtesting VaR for {len(returns_by_symbol)} symbols over {history} days")
+    result = backtest_var(
+        returns_by_symbol, window, confidence_level, methods,
+        portfolio_value={symbol: holdings[symbol] for symbol in returns_by_symbol},
+        simulations=simulations, seed=seed
+    )
+    return result, failed
@@ -0,0 +1,162 @@
+import os
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .bulk_fetcher import fetch_bulk_prices
+from .data_fetcher import yahoo_symbol
+from .returns_transform import transform_prices
+from .parametric_var import calculate_parametric_var
+from .historical_var import calculate_historical_var
+from .monte_carlo_var import calculate_monte_carlo_var
+from .instrumentation import metrics, stage
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = ['parametric_var', 'historical_var', 'monte_carlo_var',
+                  'parametric_es', 'historical_es', 'monte_carlo_es', 'error']
+
+def calculate_position_var(task):
+    """
+    Calculate all three VaR measures, with their Expected Shortfall, for one position.
+
+    Runs inside pool workers, so failures are returned rather than raised and
+    one bad position does not abort the batch.
+
+    :param task: Tuple of (returns, portfolio_value, seed, options) where options
+                 is a dict of the run_batch calculation parameters
+    :return: Dict with one value per RESULT_COLUMNS entry
+    """
+    returns, portfolio_value, seed, options = task
+    confidence_level = options['confidence_level']
+    horizon = options['horizon']
+    result = dict.fromkeys(RESULT_COLUMNS)
+    try:
+        result['parametric_var'] = calculate_parametric_var(
+            returns, portfolio_value, confidence_level, horizon
+        )
+        result['historical_var'] = calculate_historical_var(
+            returns, portfolio_value, confidence_level, horizon,
+            method=options['historical_method'], samples=options['bootstrap_samples'], seed=seed
+        )
+        result['monte_carlo_var'] = calculate_monte_carlo_var(
+            returns, portfolio_value, confidence_level, horizon, options['simulations'],
+            seed=seed, sampling=options['sampling'], tolerance=options['tolerance']
+        )
+        for method in ('parametric', 'historical', 'monte_carlo'):
+            result[f"{method}_es"] = result[f"{method}_var"].expected_shortfall
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def _calculate_position_var_instrumented(task):
+    """Pool entry point that also returns the worker's timings, for merging in the parent"""
+    metrics.enable()
+    metrics.reset()
+    return calculate_position_var(task), metrics.snapshot()
+
+def run_batch(positions, confidence_level=0.95, horizon=1, window=252, simulations=10000,
+              historical_method='bootstrap', bootstrap_samples=10000, sampling='pseudo',
+              tolerance=None, seed=None, offline=False, workers=None, fetch_workers=None,
+              returns_store=None):
+    """
+    Calculate VaR for every position in one process.
+
+    Prices for all distinct symbols are fetched concurrently once, then the
+    calculations are spread across a pool of worker processes. With a returns
+    store, windows are instead sliced from its memory mapping without copying
+    and workers receive references to them rather than the data.
+
+    :param positions: DataFrame with ticker, exchange and portfolio_value columns
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param horizon: Time horizon in days
+    :param window: Historical data window size (days of prices, so window - 1 returns)
+    :param simulations: Monte Carlo simulations count
+    :param historical_method: Multi-day historical aggregation, 'bootstrap' or 'overlapping'
+    :param bootstrap_samples: Historical block bootstrap sample count
+    :param sampling: Monte Carlo sampling, 'pseudo', 'antithetic' or 'sobol'
+    :param tolerance: Monte Carlo early-stopping tolerance
+    :param seed: Random seed; each position gets an independent child seed
+    :param offline: Serve purely from cache without network access
+    :param workers: Worker processes for the calculations [default: CPU count]
+    :param fetch_workers: Concurrent price downloads
+    :param returns_store: ReturnsStore to read returns from instead of fetching prices
+    :return: Copy of positions with VaR result columns appended
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 0:
+        raise ValueError("Worker count must be positive")
+
+    results = positions.copy()
+    symbols = [yahoo_symbol(t, e) for t, e in zip(results['ticker'], results['exchange'])]
+    returns_by_symbol = {}
+    if returns_store is not None:
+        failed = {}
+        for symbol in dict.fromkeys(symbols):
+            try:
+                # A window of prices spans one fewer return, as on the fetch path
+                returns_by_symbol[symbol] = returns_store.series(symbol, window - 1)
+            except (KeyError, ValueError) as e:
+                failed[symbol] = e.args[0]
+    else:
+        pairs = list(dict.fromkeys(zip(results['ticker'], results['exchange'])))
+        histories, failed = fetch_bulk_prices(pairs, window, offline=offline, max_workers=fetch_workers)
+        if histories:
+            # Every symbol is cleaned in one pass over the date x symbol price matrix
+            matrix = transform_prices(histories)
+            for symbol, valid in zip(matrix.symbols, matrix.counts):
+                if valid < window * settings.MIN_COVERAGE:
+                    failed[symbol] = "Insufficient data for accurate calculation"
+                else:
+                    try:
+                        returns_by_symbol[symbol] = matrix.series(symbol)
+                    except ValueError as e:
+                        failed[symbol] = str(e)
+
+    options = {
+        'confidence_level': confidence_level,
+        'horizon': horizon,
+        'simulations': simulations,
+        'historical_method': historical_method,
+        'bootstrap_samples': bootstrap_samples,
+        'sampling': sampling,
+        'tolerance': tolerance,
+    }
+    seeds = np.random.SeedSequence(seed).spawn(len(results)) if seed is not None else [None] * len(results)
+    tasks = []
+    rows = []
+    for row, (symbol, value, row_seed) in enumerate(zip(symbols, results['portfolio_value'], seeds)):
+        if symbol in returns_by_symbol:
+            tasks.append((returns_by_symbol[symbol], value, row_seed, options))
+            rows.append(row)
+
+    logger.info(f"Calculating VaR for {len(tasks)} of {len(results)} positions with {workers} workers")
+    with stage('batch.calculate'):
+        if workers == 1 or len(tasks) <= 1:
+            outcomes = list(map(calculate_position_var, tasks))
+        elif metrics.enabled:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunksize = max(1, len(tasks) // (workers * 4))
+                outcomes = []
+                for outcome, snapshot in executor.map(_calculate_position_var_instrumented, tasks,
+                                                      chunksize=chunksize):
+                    outcomes.append(outcome)
+                    metrics.merge(snapshot)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunksize = max(1, len(tasks) // (workers * 4))
+                outcomes = list(executor.map(calculate_position_var, tasks, chunksize=chunksize))
+
+    columns = {column: [None] * len(results) for column in RESULT_COLUMNS}
+    for row, symbol in enumerate(symbols):
+        if symbol in failed:
+            columns['error'][row] = f"Failed to fetch data: {failed[symbol]}"
+    for row, outcome in zip(rows, outcomes):
+        for column in RESULT_COLUMNS:
+            columns[column][row] = outcome[column]
+    for column in RESULT_COLUMNS:
+        results[column] = columns[column]
+
+    errors = results['error'].notna().sum()
+    logger.info(f"Batch complete: {len(results) - errors} positions calculated, {errors} failed")
+    return results
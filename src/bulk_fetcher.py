@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from .data_fetcher import fetch_price_history, align_price_histories, yahoo_symbol
+from .exceptions import DataFetchError
+from .instrumentation import timed
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class BulkFetchResult:
+    """
+    Outcome of a bulk fetch.
+
+    :ivar returns: DataFrame of date-aligned daily log returns (dates x symbols)
+    :ivar failed: Dict of symbol -> error message for symbols that were dropped
+    :ivar partial: Dict of symbol -> fraction of dates traded, for symbols kept
+                   in the matrix whose gaps were filled
+    """
+
+    def __init__(self, returns, failed, partial):
+        self.returns = returns
+        self.failed = failed
+        self.partial = partial
+
+    def __repr__(self):
+        return (
+            f"BulkFetchResult(symbols={self.returns.shape[1]}, dates={len(self.returns)}, "
+            f"failed={len(self.failed)}, partial={len(self.partial)})"
+        )
+
+async def _fetch_one(loop, executor, semaphore, ticker, exchange, window, offline,
+                     timeout, retries, backoff):
+    """Fetch one symbol with a per-attempt timeout and exponential backoff between retries"""
+    symbol = yahoo_symbol(ticker, exchange)
+    async with semaphore:
+        for attempt in range(retries + 1):
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(executor, fetch_price_history, ticker, exchange, window, offline),
+                    timeout
+                )
+            except DataFetchError:
+                # Missing symbols and cache misses are not transient
+                raise
+            except Exception as e:
+                if attempt == retries:
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise DataFetchError(f"Timed out after {timeout}s")
+                    raise
+                delay = backoff * 2 ** attempt
+                logger.warning(f"Fetch attempt {attempt + 1} for {symbol} failed ({e!r}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+async def _fetch_all(positions, window, offline, max_workers, timeout, retries, backoff):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_workers)
+    # Spare threads keep the pool usable while timed-out downloads are still running
+    executor = ThreadPoolExecutor(max_workers=2 * max_workers, thread_name_prefix='fetch')
+    try:
+        tasks = [
+            _fetch_one(loop, executor, semaphore, ticker, exchange, window, offline,
+                       timeout, retries, backoff)
+            for ticker, exchange in positions
+        ]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        # Do not wait for abandoned (timed-out) downloads
+        executor.shutdown(wait=False, cancel_futures=True)
+
+@timed('fetch.bulk')
+def fetch_bulk_prices(positions, window=252, offline=False, max_workers=None, timeout=None,
+                      retries=None, backoff=None):
+    """
+    Fetch closing price histories for many stocks concurrently.
+
+    Downloads run on a thread pool with at most 'max_workers' in flight. Each
+    symbol is retried with exponential backoff; symbols that still fail are
+    reported instead of failing the whole batch.
+
+    :param positions: Iterable of (ticker, exchange) pairs
+    :param window: Historical data window size (days)
+    :param offline: Serve purely from cache without network access
+    :param max_workers: Maximum concurrent downloads [default: settings.FETCH_WORKERS]
+    :param timeout: Seconds allowed per download attempt [default: settings.FETCH_TIMEOUT]
+    :param retries: Retries per symbol after the first attempt [default: settings.FETCH_RETRIES]
+    :param backoff: Initial delay between retries in seconds [default: settings.FETCH_BACKOFF]
+    :return: Tuple of (dict of symbol -> closing price Series, dict of symbol -> error message)
+    """
+    max_workers = max_workers or settings.FETCH_WORKERS
+    timeout = timeout or settings.FETCH_TIMEOUT
+    retries = settings.FETCH_RETRIES if retries is None else retries
+    backoff = settings.FETCH_BACKOFF if backoff is None else backoff
+    if max_workers <= 0:
+        raise ValueError("Worker count must be positive")
+
+    positions = list(positions)
+    logger.info(f"Fetching {window} days of data for {len(positions)} symbols with {max_workers} workers")
+    outcomes = asyncio.run(
+        _fetch_all(positions, window, offline, max_workers, timeout, retries, backoff)
+    )
+
+    histories = {}
+    failed = {}
+    for (ticker, exchange), outcome in zip(positions, outcomes):
+        symbol = yahoo_symbol(ticker, exchange)
+        if isinstance(outcome, BaseException):
+            failed[symbol] = str(outcome) or type(outcome).__name__
+            logger.error(f"Data fetch error for {symbol}: {failed[symbol]}")
+        else:
+            histories[symbol] = outcome
+    return histories, failed
+
+def fetch_bulk_returns(positions, window=252, offline=False, max_workers=None, timeout=None,
+                       retries=None, backoff=None, min_coverage=None):
+    """
+    Fetch date-aligned daily returns for many stocks concurrently.
+
+    Symbols that could not be fetched, or that traded on too few of the common
+    dates, are reported in the result instead of failing the whole batch.
+
+    :param positions: Iterable of (ticker, exchange) pairs
+    :param window: Historical data window size (days)
+    :param offline: Serve purely from cache without network access
+    :param max_workers: Maximum concurrent downloads [default: settings.FETCH_WORKERS]
+    :param timeout: Seconds allowed per download attempt [default: settings.FETCH_TIMEOUT]
+    :param retries: Retries per symbol after the first attempt [default: settings.FETCH_RETRIES]
+    :param backoff: Initial delay between retries in seconds [default: settings.FETCH_BACKOFF]
+    :param min_coverage: Minimum fraction of dates a symbol must have traded [default: settings.MIN_COVERAGE]
+    :return: BulkFetchResult
+    """
+    min_coverage = settings.MIN_COVERAGE if min_coverage is None else min_coverage
+    positions = list(positions)
+    histories, failed = fetch_bulk_prices(
+        positions, window, offline, max_workers, timeout, retries, backoff
+    )
+    if not histories:
+        raise DataFetchError(f"Failed to fetch data for all {len(positions)} symbols")
+
+    returns, coverage = align_price_histories(histories.values())
+    for symbol, fraction in coverage[coverage < min_coverage].items():
+        failed[symbol] = f"Insufficient data ({fraction:.0%} of dates)"
+    returns = returns.loc[:, coverage >= min_coverage]
+    partial = {
+        symbol: fraction for symbol, fraction in coverage.items()
+        if min_coverage <= fraction < 1.0
+    }
+
+    logger.info(
+        f"Fetched {len(returns)} days of returns for {returns.shape[1]} symbols "
+        f"({len(failed)} failed, {len(partial)} partially filled)"
+    )
+    return BulkFetchResult(returns, failed, partial)
+
+def fetch_returns_matrix(positions, window=252, offline=False, max_workers=None):
+    """
+    Fetch date-aligned daily returns for several stocks, requiring every symbol.
+
+    :param positions: Iterable of (ticker, exchange) pairs
+    :param window: Historical data window size (days)
+    :param offline: Serve purely from cache without network access
+    :param max_workers: Maximum concurrent downloads
+    :return: DataFrame of daily log returns (dates x Yahoo symbols)
+    """
+    try:
+        result = fetch_bulk_returns(positions, window, offline=offline, max_workers=max_workers)
+        if result.failed:
+            raise DataFetchError(
+                "Could not fetch: " + "; ".join(f"{symbol} ({error})" for symbol, error in result.failed.items())
+            )
+        if len(result.returns) < window * settings.MIN_COVERAGE:
+            raise DataFetchError("Insufficient data for accurate calculation")
+        return result.returns
+
+    except Exception as e:
+        logger.error(f"Data fetch error: {str(e)}")
+        raise DataFetchError(f"Failed to fetch data: {str(e)}")
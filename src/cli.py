@@ -1,165 +1,1402 @@
-import argparse
-import logging
-import logging.config
-import os
-import sys
-from .data_fetcher import fetch_stock_data
-from .parametric_var import calculate_parametric_var
-from .historical_var import calculate_historical_var
-from .monte_carlo_var import calculate_monte_carlo_var
-from .report_generator import save_portfolio_data, generate_comparison_plot
-from config import settings
-
-# Setup logging
-try:
-    logging.config.fileConfig(
-        settings.LOGGING_CONF,
-        defaults={'logfilename': os.path.join(settings.LOGS_DIR, 'app.log')}
-    )
-except FileNotFoundError:
-    # Fallback basic configuration if logging.conf is missing
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler(os.path.join(settings.LOGS_DIR, 'app.log'))
-        ]
-    )
-    
-logger = logging.getLogger(__name__)
-
-def main():
-    parser = argparse.ArgumentParser(
-        description='Calculate Value at Risk (VaR) for Indian stocks using three methodologies',
-        epilog='Example: python main.py RELIANCE NSE 1000000 --confidence 0.99 --horizon 5'
-    )
-    
-    # Required arguments
-    parser.add_argument(
-        'ticker', 
-        type=str, 
-        help='Stock ticker symbol (e.g.: RELIANCE, INFY)'
-    )
-    parser.add_argument(
-        'exchange', 
-        type=str, 
-        choices=['NSE', 'BSE'],
-        help='Stock exchange: NSE or BSE'
-    )
-    parser.add_argument(
-        'portfolio_value', 
-        type=float, 
-        help='Portfolio value in INR (e.g.: 1000000)'
-    )
-    
-    # Optional parameters
-    parser.add_argument(
-        '--confidence', 
-        type=float, 
-        default=0.95,
-        choices=[0.90, 0.91, 0.92, 0.93, 0.94, 0.95, 0.96, 0.97, 0.98, 0.99],
-        help='Confidence level (0.90-0.99) [default: 0.95]'
-    )
-    parser.add_argument(
-        '--horizon', 
-        type=int, 
-        default=1,
-        help='Time horizon in days [default: 1]'
-    )
-    parser.add_argument(
-        '--window', 
-        type=int, 
-        default=252,
-        help='Historical data window size in days [default: 252]'
-    )
-    parser.add_argument(
-        '--simulations', 
-        type=int, 
-        default=10000,
-        help='Monte Carlo simulations count [default: 10000]'
-    )
-    
-    args = parser.parse_args()
-    
-    try:
-        # Validate inputs
-        if not 0.90 <= args.confidence <= 0.99:
-            raise ValueError("Confidence level must be between 0.90 and 0.99")
-        if args.portfolio_value <= 0:
-            raise ValueError("Portfolio value must be positive")
-        if args.horizon <= 0:
-            raise ValueError("Time horizon must be positive")
-        if args.window <= 0:
-            raise ValueError("Data window size must be positive")
-        if args.simulations <= 0:
-            raise ValueError("Simulation count must be positive")
-            
-        logger.info(f"Calculating VaR for {args.ticker} on {args.exchange}")
-        logger.info(f"Portfolio value: ₹{args.portfolio_value:,.2f}")
-        logger.info(f"Confidence: {args.confidence*100}%, Horizon: {args.horizon} days")
-        logger.info(f"Data window: {args.window} days, Simulations: {args.simulations}")
-        
-        # Fetch stock data
-        returns = fetch_stock_data(
-            args.ticker, 
-            args.exchange, 
-            args.window
-        )
-        
-        # Calculate VaR using different methods
-        parametric_var = calculate_parametric_var(
-            returns, 
-            args.portfolio_value, 
-            args.confidence, 
-            args.horizon
-        )
-        
-        historical_var = calculate_historical_var(
-            returns, 
-            args.portfolio_value, 
-            args.confidence, 
-            args.horizon
-        )
-        
-        monte_carlo_var = calculate_monte_carlo_var(
-            returns, 
-            args.portfolio_value, 
-            args.confidence, 
-            args.horizon, 
-            args.simulations
-        )
-        
-        # Save portfolio data
-        portfolio_file = save_portfolio_data(
-            args.ticker,
-            args.exchange,
-            args.portfolio_value
-        )
-        
-        # Generate report
-        plot_file = generate_comparison_plot(
-            parametric_var,
-            historical_var,
-            monte_carlo_var,
-            args.portfolio_value,
-            args.ticker,
-            args.exchange
-        )
-        
-        # Print results
-        print(f"\nValue at Risk for {args.ticker} ({args.exchange}) portfolio of value ₹{args.portfolio_value:,.2f}:")
-        print(f"• Parametric VaR:   ₹{parametric_var:,.2f}")
-        print(f"• Historical VaR:   ₹{historical_var:,.2f}")
-        print(f"• Monte Carlo VaR:  ₹{monte_carlo_var:,.2f}")
-        print(f"\nPortfolio data saved as: '{os.path.basename(portfolio_file)}'")
-        print(f"Comparison plot saved as: '{os.path.basename(plot_file)}'")
-        
-    except Exception as e:
-        logger.error(f"Error occurred: {str(e)}")
-        print(f"\nError: {str(e)}")
-        print("Please check the logs for more details.")
-        sys.exit(1)
-
-if __name__ == '__main__':
-    main()
+import argparse
+import logging
+import os
+import sys
+import time
+from config import settings
+from .instrumentation import PROFILERS, metrics, start_profiler, write_metrics
+
+# Heavy modules (pandas, scipy, yfinance, matplotlib and the VaR modules that
+# use them) are imported inside the commands that need them, so --help and
+# scheduler invocations do not pay for dependencies they never touch.
+
+logger = logging.getLogger(__name__)
+
+def configure_logging():
+    """Configure console and file logging (called when a command runs, not at import)"""
+    import logging.config
+
+    logfilename = os.path.join(settings.ensure_dir(settings.LOGS_DIR), 'app.log')
+    try:
+        # Module loggers already exist by now (this runs after import), so keep them enabled
+        logging.config.fileConfig(
+            settings.LOGGING_CONF,
+            defaults={'logfilename': logfilename},
+            disable_existing_loggers=False
+        )
+    except FileNotFoundError:
+        # Fallback basic configuration if logging.conf is missing
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.StreamHandler(sys.stdout),
+                logging.FileHandler(logfilename)
+            ]
+        )
+
+def _add_position_arguments(parser):
+    """Add the positional arguments describing a single stock position"""
+    parser.add_argument(
+        'ticker',
+        type=str,
+        help='Stock ticker symbol (e.g.: RELIANCE, INFY)'
+    )
+    parser.add_argument(
+        'exchange',
+        type=str,
+        choices=['NSE', 'BSE'],
+        help='Stock exchange: NSE or BSE'
+    )
+    parser.add_argument(
+        'portfolio_value',
+        type=float,
+        help='Portfolio value in INR (e.g.: 1000000)'
+    )
+
+def _add_calculation_options(parser, grid=False):
+    """
+    Add the VaR calculation options shared by every command.
+
+    :param parser: Argument parser
+    :param grid: Accept lists of confidence levels and horizons instead of one of each
+    """
+    if grid:
+        from .var_surface import DEFAULT_CONFIDENCE_LEVELS, DEFAULT_HORIZONS
+
+        parser.add_argument(
+            '--confidences',
+            type=float,
+            nargs='+',
+            default=list(DEFAULT_CONFIDENCE_LEVELS),
+            help='Confidence levels (0.90-0.99) [default: 0.90 0.91 ... 0.99]'
+        )
+        parser.add_argument(
+            '--horizons',
+            type=int,
+            nargs='+',
+            default=list(DEFAULT_HORIZONS),
+            help='Time horizons in days [default: 1 5 10 20]'
+        )
+    else:
+        parser.add_argument(
+            '--confidence',
+            type=float,
+            default=0.95,
+            help='Confidence level (0.90-0.99) [default: 0.95]'
+        )
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=1,
+            help='Time horizon in days [default: 1]'
+        )
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=252,
+        help='Historical data window size in days [default: 252]'
+    )
+    parser.add_argument(
+        '--simulations',
+        type=int,
+        default=10000,
+        help='Monte Carlo simulations count [default: 10000]'
+    )
+    parser.add_argument(
+        '--historical-method',
+        type=str,
+        default='bootstrap',
+        choices=['bootstrap', 'overlapping'],
+        help='Multi-day historical aggregation: block bootstrap or exact overlapping windows [default: bootstrap]'
+    )
+    parser.add_argument(
+        '--bootstrap-samples',
+        type=int,
+        default=10000,
+        help='Historical block bootstrap sample count [default: 10000]'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for reproducible simulations [default: none]'
+    )
+    parser.add_argument(
+        '--sampling',
+        type=str,
+        default='pseudo',
+        choices=['pseudo', 'antithetic', 'sobol'],
+        help='Monte Carlo sampling: pseudo-random, antithetic or Sobol quasi-random [default: pseudo]'
+    )
+    parser.add_argument(
+        '--mc-workers',
+        type=int,
+        default=1,
+        help='Worker processes for Monte Carlo simulation chunks [default: 1]'
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=None,
+        help='Stop Monte Carlo early once the 95%% CI width of VaR relative to VaR is below this (e.g. 0.01)'
+    )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Use only locally cached prices without contacting Yahoo Finance'
+    )
+
+def _add_report_options(parser, default):
+    """
+    Add the report rendering options.
+
+    :param parser: Argument parser
+    :param default: Default report format
+    """
+    parser.add_argument(
+        '--report',
+        type=str,
+        default=default,
+        choices=['png', 'pdf', 'html', 'none'],
+        help=f'Report format: PNG chart per position, multi-page PDF, HTML dashboard, '
+             f'or none for JSON results only [default: {default}]'
+    )
+    parser.add_argument(
+        '--dpi',
+        type=int,
+        default=settings.REPORT_DPI,
+        help=f'Report image resolution [default: {settings.REPORT_DPI}]'
+    )
+
+def _add_profile_options(parser):
+    """Add the timing and profiling options accepted by every command"""
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print a per-stage timing breakdown after the run'
+    )
+    parser.add_argument(
+        '--profile-output',
+        type=str,
+        default=None,
+        help='Also save a profile of the run to this file (cProfile stats, or collapsed stacks with --profiler sampling)'
+    )
+    parser.add_argument(
+        '--profiler',
+        type=str,
+        choices=PROFILERS,
+        default='cprofile',
+        help='Profiler for --profile-output: cprofile (deterministic) or sampling (low overhead) [default: cprofile]'
+    )
+
+def _finish_instrumentation(args, command, status, wall_seconds, profiler):
+    """Save the profile, append the run's metrics line and print the --profile breakdown"""
+    if profiler is not None:
+        profiler.stop()
+        profiler.dump_stats(args.profile_output)
+        print(f"\nProfile saved as: '{args.profile_output}'")
+    if metrics.enabled:
+        try:
+            settings.ensure_dir(os.path.dirname(settings.METRICS_FILE))
+            write_metrics(settings.METRICS_FILE, command=command, status=status, user=settings.CURRENT_USER,
+                          pid=os.getpid(), wall_seconds=wall_seconds)
+        except OSError as e:
+            logger.warning(f"Could not write metrics: {str(e)}")
+    if args.profile:
+        print(f"\nTiming breakdown ({command}):")
+        print(metrics.format_summary(wall_seconds))
+
+def _validate_calculation_options(args):
+    """Validate the VaR calculation options shared by every command"""
+    confidences = getattr(args, 'confidences', None) or [args.confidence]
+    horizons = getattr(args, 'horizons', None) or [args.horizon]
+    if not all(0.90 <= confidence <= 0.99 for confidence in confidences):
+        raise ValueError("Confidence level must be between 0.90 and 0.99")
+    if not all(horizon > 0 for horizon in horizons):
+        raise ValueError("Time horizon must be positive")
+    if args.window <= 0:
+        raise ValueError("Data window size must be positive")
+    if args.simulations <= 0:
+        raise ValueError("Simulation count must be positive")
+    if args.bootstrap_samples <= 0:
+        raise ValueError("Bootstrap sample count must be positive")
+    if args.mc_workers <= 0:
+        raise ValueError("Monte Carlo worker count must be positive")
+    if args.tolerance is not None and args.tolerance <= 0:
+        raise ValueError("Monte Carlo tolerance must be positive")
+
+def _build_single_parser():
+    parser = argparse.ArgumentParser(
+        description='Calculate Value at Risk (VaR) for Indian stocks using three methodologies',
+        epilog='Example: python main.py RELIANCE NSE 1000000 --confidence 0.99 --horizon 5\n'
+               'Portfolio mode: python main.py portfolio holdings.csv --confidence 0.99\n'
+               'Batch mode:     python main.py batch positions.csv --workers 8\n'
+               'VaR surface:    python main.py surface RELIANCE NSE 1000000 --horizons 1 5 10 20',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    # Required arguments
+    _add_position_arguments(parser)
+
+    # Optional parameters
+    _add_calculation_options(parser)
+    _add_path_options(parser)
+    _add_report_options(parser, 'png')
+    return parser
+
+def _add_path_options(parser):
+    """Path-wise Monte Carlo options (day-by-day simulation instead of one lognormal draw)"""
+    parser.add_argument(
+        '--paths',
+        action='store_true',
+        help='Simulate Monte Carlo VaR day by day along each path (fat tails, volatility clustering, stop-loss)'
+    )
+    parser.add_argument(
+        '--innovations',
+        type=str,
+        default='normal',
+        choices=['normal', 'student_t', 'bootstrap'],
+        help='Daily shocks of path simulations: normal, Student-t or bootstrapped residuals [default: normal]'
+    )
+    parser.add_argument(
+        '--volatility-model',
+        type=str,
+        default='constant',
+        choices=['constant', 'ewma', 'garch'],
+        help='Volatility of path simulations: constant, EWMA or GARCH(1,1) [default: constant]'
+    )
+    parser.add_argument(
+        '--stop-loss',
+        type=float,
+        default=None,
+        help='Close out a simulated path once it loses this fraction of value, e.g. 0.1 [default: none]'
+    )
+    parser.add_argument(
+        '--float32',
+        action='store_true',
+        help='Simulate paths in single precision (half the memory, faster)'
+    )
+
+def _build_portfolio_parser():
+    parser = argparse.ArgumentParser(
+        prog='main.py portfolio',
+        description='Calculate diversified Value at Risk (VaR) for a multi-stock portfolio',
+        epilog='Example: python main.py portfolio holdings.csv --confidence 0.99 --horizon 5'
+    )
+    parser.add_argument(
+        'positions',
+        type=str,
+        help='CSV or JSON file of holdings with columns: ticker, exchange, portfolio_value'
+    )
+    parser.add_argument(
+        '--contributions',
+        action='store_true',
+        help='Show each position\'s marginal and component parametric and historical VaR'
+    )
+    parser.add_argument(
+        '--what-if',
+        type=str,
+        nargs=3,
+        action='append',
+        default=[],
+        metavar=('TICKER', 'EXCHANGE', 'VALUE'),
+        help='Incremental VaR of buying (or, if negative, selling) VALUE INR of a stock; repeatable'
+    )
+    parser.add_argument(
+        '--fetch-workers',
+        type=int,
+        default=settings.FETCH_WORKERS,
+        help=f'Concurrent price downloads [default: {settings.FETCH_WORKERS}]'
+    )
+    _add_calculation_options(parser)
+    return parser
+
+def _build_batch_parser():
+    parser = argparse.ArgumentParser(
+        prog='main.py batch',
+        description='Calculate Value at Risk (VaR) for every position in a file in one run',
+        epilog='Example: python main.py batch positions.csv --workers 8 --output results.csv'
+    )
+    parser.add_argument(
+        'positions',
+        type=str,
+        help='CSV or JSON file of positions with columns: ticker, exchange, portfolio_value'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Worker processes for the calculations [default: CPU count]'
+    )
+    parser.add_argument(
+        '--fetch-workers',
+        type=int,
+        default=settings.FETCH_WORKERS,
+        help=f'Concurrent price downloads [default: {settings.FETCH_WORKERS}]'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Results file (.csv or .json) [default: timestamped CSV in data/reports]'
+    )
+    parser.add_argument(
+        '--returns-store',
+        type=str,
+        nargs='?',
+        const=settings.RETURNS_STORE_DIR,
+        default=None,
+        help='Read returns from a memory-mapped store built by "main.py store" instead of fetching prices '
+             '[default directory: data/returns_store]'
+    )
+    _add_calculation_options(parser)
+    _add_report_options(parser, 'none')
+    return parser
+
+def _build_surface_parser():
+    from .var_surface import SURFACE_METHODS
+
+    parser = argparse.ArgumentParser(
+        prog='main.py surface',
+        description='Calculate a Value at Risk (VaR) surface over confidence levels and horizons',
+        epilog='Example: python main.py surface RELIANCE NSE 1000000 --confidences 0.95 0.99 --horizons 1 10'
+    )
+    _add_position_arguments(parser)
+    parser.add_argument(
+        '--methods',
+        type=str,
+        nargs='+',
+        default=list(SURFACE_METHODS),
+        choices=list(SURFACE_METHODS),
+        help='VaR methods to include [default: all]'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Surface file (.csv or .json) [default: timestamped CSV in data/reports]'
+    )
+    _add_calculation_options(parser, grid=True)
+    return parser
+
+def _build_backtest_parser():
+    from .backtest import BACKTEST_METHODS
+
+    parser = argparse.ArgumentParser(
+        prog='main.py backtest',
+        description='Backtest rolling one-day Value at Risk (VaR) against realized losses',
+        epilog='Example: python main.py backtest positions.csv --history 2520 --confidence 0.99'
+    )
+    parser.add_argument(
+        'positions',
+        type=str,
+        help='CSV or JSON file of positions with columns: ticker, exchange, portfolio_value'
+    )
+    parser.add_argument(
+        '--confidence',
+        type=float,
+        default=0.99,
+        help='Confidence level (0.90-0.99) [default: 0.99]'
+    )
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=252,
+        help='Rolling window size in days [default: 252]'
+    )
+    parser.add_argument(
+        '--history',
+        type=int,
+        default=2520,
+        help='Price history to backtest over in days [default: 2520]'
+    )
+    parser.add_argument(
+        '--methods',
+        type=str,
+        nargs='+',
+        default=list(BACKTEST_METHODS),
+        choices=list(BACKTEST_METHODS),
+        help='VaR methods to backtest [default: all]'
+    )
+    parser.add_argument(
+        '--simulations',
+        type=int,
+        default=10000,
+        help='Monte Carlo simulations count [default: 10000]'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for reproducible simulations [default: none]'
+    )
+    parser.add_argument(
+        '--fetch-workers',
+        type=int,
+        default=settings.FETCH_WORKERS,
+        help=f'Concurrent price downloads [default: {settings.FETCH_WORKERS}]'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Exception series file (.csv or .json); statistics are saved alongside [default: timestamped CSV in data/reports]'
+    )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Use only locally cached prices without contacting Yahoo Finance'
+    )
+    return parser
+
+def _build_store_parser():
+    parser = argparse.ArgumentParser(
+        prog='main.py store',
+        description='Build a memory-mapped returns store for the positions in a file',
+        epilog='Example: python main.py store universe.csv --history 5040'
+    )
+    parser.add_argument(
+        'positions',
+        type=str,
+        help='CSV or JSON file of positions with columns: ticker, exchange, portfolio_value'
+    )
+    parser.add_argument(
+        '--history',
+        type=int,
+        default=2520,
+        help='Price history to store in days [default: 2520]'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=settings.RETURNS_STORE_DIR,
+        help='Store directory [default: data/returns_store]'
+    )
+    parser.add_argument(
+        '--fetch-workers',
+        type=int,
+        default=settings.FETCH_WORKERS,
+        help=f'Concurrent price downloads [default: {settings.FETCH_WORKERS}]'
+    )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Use only locally cached prices without contacting Yahoo Finance'
+    )
+    return parser
+
+def _build_stress_parser():
+    from .scenario_engine import HISTORICAL_PERIODS
+
+    parser = argparse.ArgumentParser(
+        prog='main.py stress',
+        description='Stress test portfolios against historical and user-defined scenarios',
+        epilog='Example: python main.py stress positions.csv --shocks shocks.csv --betas betas.csv --top 5'
+    )
+    parser.add_argument(
+        'positions',
+        type=str,
+        help='CSV or JSON file of positions with columns: ticker, exchange, portfolio_value '
+             'and an optional portfolio column grouping them into portfolios'
+    )
+    parser.add_argument(
+        '--history',
+        type=int,
+        default=5040,
+        help='Price history to draw historical scenarios from in days [default: 5040]'
+    )
+    parser.add_argument(
+        '--periods',
+        type=str,
+        nargs='*',
+        default=list(HISTORICAL_PERIODS),
+        choices=list(HISTORICAL_PERIODS),
+        help='Named stress periods applied as cumulative moves [default: all]'
+    )
+    parser.add_argument(
+        '--no-days',
+        action='store_true',
+        help='Do not apply every historical day as a scenario'
+    )
+    parser.add_argument(
+        '--shocks',
+        type=str,
+        default=None,
+        help='CSV or JSON file of user-defined scenarios: a scenario column and one column per Yahoo '
+             'symbol (or per factor with --betas) of simple-return shocks, e.g. -0.2 for a 20%% fall'
+    )
+    parser.add_argument(
+        '--betas',
+        type=str,
+        default=None,
+        help='CSV or JSON file of factor betas: a symbol column (Yahoo symbol) and one column per factor'
+    )
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=10,
+        help='Worst scenarios ranked per portfolio [default: 10]'
+    )
+    parser.add_argument(
+        '--fetch-workers',
+        type=int,
+        default=settings.FETCH_WORKERS,
+        help=f'Concurrent price downloads [default: {settings.FETCH_WORKERS}]'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Rankings file (.csv or .json) [default: timestamped CSV in data/reports]'
+    )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Use only locally cached prices without contacting Yahoo Finance'
+    )
+    return parser
+
+def _result_record(args, ticker, exchange, portfolio_value, parametric_var, historical_var,
+                   monte_carlo_var, command, expected_shortfalls=None):
+    """
+    Build a results store record from the parsed options and one position's VaR values.
+
+    :param expected_shortfalls: Parametric, historical and Monte Carlo ES [default: read from the VaR results]
+    """
+    if expected_shortfalls is None:
+        expected_shortfalls = [var.expected_shortfall for var in (parametric_var, historical_var, monte_carlo_var)]
+    parametric_es, historical_es, monte_carlo_es = expected_shortfalls
+    return {
+        'command': command,
+        'ticker': ticker,
+        'exchange': exchange,
+        'portfolio_value': float(portfolio_value),
+        'confidence_level': args.confidence,
+        'horizon': args.horizon,
+        'window': args.window,
+        'simulations': args.simulations,
+        'historical_method': args.historical_method,
+        'bootstrap_samples': args.bootstrap_samples,
+        'sampling': args.sampling,
+        'seed': args.seed,
+        'parametric_var': parametric_var,
+        'historical_var': historical_var,
+        'monte_carlo_var': monte_carlo_var,
+        'parametric_es': parametric_es,
+        'historical_es': historical_es,
+        'monte_carlo_es': monte_carlo_es,
+    }
+
+def _build_history_parser():
+    parser = argparse.ArgumentParser(
+        prog='main.py history',
+        description='Query recorded Value at Risk (VaR) results',
+        epilog='Example: python main.py history RELIANCE --exchange NSE --start 2025-01-01'
+    )
+    parser.add_argument(
+        'ticker',
+        type=str,
+        nargs='?',
+        default=None,
+        help='Stock ticker, or positions file name for portfolio runs [default: all]'
+    )
+    parser.add_argument(
+        '--exchange',
+        type=str,
+        choices=['NSE', 'BSE', 'PORTFOLIO'],
+        default=None,
+        help='Stock exchange, or PORTFOLIO for portfolio runs [default: all]'
+    )
+    parser.add_argument(
+        '--start',
+        type=str,
+        default=None,
+        help='First run date, YYYY-MM-DD [default: none]'
+    )
+    parser.add_argument(
+        '--end',
+        type=str,
+        default=None,
+        help='Last run date, YYYY-MM-DD [default: none]'
+    )
+    parser.add_argument(
+        '--user',
+        type=str,
+        default=None,
+        help='Only runs by this user [default: all]'
+    )
+    parser.add_argument(
+        '--limit',
+        type=int,
+        default=None,
+        help='Only the most recent runs [default: all]'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Also save the history to a file (.csv or .json)'
+    )
+    return parser
+
+def _build_serve_parser():
+    parser = argparse.ArgumentParser(
+        prog='main.py serve',
+        description='Serve Value at Risk (VaR) over a local JSON HTTP API with warm caches',
+        epilog='Example: python main.py serve --port 8080 --workers 4\n'
+               '         curl "http://127.0.0.1:8080/var?ticker=RELIANCE&exchange=NSE&portfolio_value=1000000"',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '--host',
+        type=str,
+        default=settings.SERVER_HOST,
+        help=f'Interface to bind [default: {settings.SERVER_HOST}]'
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=settings.SERVER_PORT,
+        help=f'Port to bind [default: {settings.SERVER_PORT}]'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Worker processes for Monte Carlo simulations [default: 1]'
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=settings.SERVER_CACHE_SIZE,
+        help=f'Return series and results kept in memory [default: {settings.SERVER_CACHE_SIZE}]'
+    )
+    parser.add_argument(
+        '--ttl',
+        type=float,
+        default=settings.SERVER_CACHE_TTL,
+        help=f'Seconds before cached series and results expire [default: {settings.SERVER_CACHE_TTL}]'
+    )
+    parser.add_argument(
+        '--data-source',
+        type=str,
+        default='yahoo',
+        choices=['yahoo', 'synthetic'],
+        help='Price data: Yahoo Finance through the price cache, or deterministic synthetic returns for testing [default: yahoo]'
+    )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Use only locally cached prices without contacting Yahoo Finance'
+    )
+    return parser
+
+def _build_stream_parser():
+    from .streaming_var import STREAMING_METHODS, DEFAULT_DECAY
+
+    parser = argparse.ArgumentParser(
+        prog='main.py stream',
+        description='Update intraday Value at Risk (VaR) from a stream of price ticks on standard input',
+        epilog='Example: tick_feed | python main.py stream positions.csv --confidence 0.99\n'
+               '         Each input line is SYMBOL,PRICE (e.g. RELIANCE.NS,2851.5); SYMBOL,PRICE,close\n'
+               '         commits the day\'s close. One CSV line of updated VaR is written per tick.',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        'positions',
+        type=str,
+        help='CSV or JSON file of positions with columns: ticker, exchange, portfolio_value'
+    )
+    parser.add_argument(
+        '--confidence',
+        type=float,
+        default=0.95,
+        help='Confidence level (0.90-0.99) [default: 0.95]'
+    )
+    parser.add_argument(
+        '--horizon',
+        type=int,
+        default=1,
+        help='Time horizon in days [default: 1]'
+    )
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=252,
+        help='Historical data window size in days [default: 252]'
+    )
+    parser.add_argument(
+        '--decay',
+        type=float,
+        default=DEFAULT_DECAY,
+        help=f'EWMA decay factor [default: {DEFAULT_DECAY}]'
+    )
+    parser.add_argument(
+        '--methods',
+        type=str,
+        nargs='+',
+        default=list(STREAMING_METHODS),
+        choices=list(STREAMING_METHODS),
+        help='VaR methods to report [default: all]'
+    )
+    parser.add_argument(
+        '--simulations',
+        type=int,
+        default=10000,
+        help='Monte Carlo shocks drawn once and reused [default: 10000]'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for reproducible simulations [default: none]'
+    )
+    parser.add_argument(
+        '--fetch-workers',
+        type=int,
+        default=settings.FETCH_WORKERS,
+        help=f'Concurrent price downloads [default: {settings.FETCH_WORKERS}]'
+    )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Use only locally cached prices without contacting Yahoo Finance'
+    )
+    return parser
+
+def run_single(args):
+    """Calculate VaR for a single stock position"""
+    from .data_fetcher import fetch_stock_data
+    from .parametric_var import calculate_parametric_var
+    from .historical_var import calculate_historical_var
+    from .monte_carlo_var import calculate_monte_carlo_var, calculate_path_monte_carlo_var
+    from .results_store import ResultsStore
+    from .renderer import render_report
+
+    if args.portfolio_value <= 0:
+        raise ValueError("Portfolio value must be positive")
+    _validate_calculation_options(args)
+    if args.stop_loss is not None and not 0 < args.stop_loss < 1:
+        raise ValueError("Stop-loss must be between 0 and 1")
+    if args.paths:
+        # Path simulation draws its own pseudo-random shocks in one process and runs every path
+        ignored = [flag for flag, used in (('--sampling', args.sampling != 'pseudo'),
+                                           ('--mc-workers', args.mc_workers != 1),
+                                           ('--tolerance', args.tolerance is not None)) if used]
+        if ignored:
+            raise ValueError(f"{', '.join(ignored)} cannot be combined with --paths")
+    if args.dpi <= 0:
+        raise ValueError("Report resolution must be positive")
+
+    logger.info(f"Calculating VaR for {args.ticker} on {args.exchange}")
+    logger.info(f"Portfolio value: ₹{args.portfolio_value:,.2f}")
+    logger.info(f"Confidence: {args.confidence*100}%, Horizon: {args.horizon} days")
+    logger.info(f"Data window: {args.window} days, Simulations: {args.simulations}")
+
+    # Fetch stock data
+    returns = fetch_stock_data(
+        args.ticker,
+        args.exchange,
+        args.window,
+        offline=args.offline
+    )
+
+    # Calculate VaR using different methods
+    parametric_var = calculate_parametric_var(
+        returns,
+        args.portfolio_value,
+        args.confidence,
+        args.horizon
+    )
+
+    historical_var = calculate_historical_var(
+        returns,
+        args.portfolio_value,
+        args.confidence,
+        args.horizon,
+        method=args.historical_method,
+        samples=args.bootstrap_samples,
+        seed=args.seed
+    )
+
+    if args.paths:
+        import numpy as np
+
+        monte_carlo_var = calculate_path_monte_carlo_var(
+            returns,
+            args.portfolio_value,
+            args.confidence,
+            args.horizon,
+            args.simulations,
+            innovations=args.innovations,
+            volatility_model=args.volatility_model,
+            stop_loss=args.stop_loss,
+            dtype=np.float32 if args.float32 else np.float64,
+            seed=args.seed
+        )
+    else:
+        monte_carlo_var = calculate_monte_carlo_var(
+            returns,
+            args.portfolio_value,
+            args.confidence,
+            args.horizon,
+            args.simulations,
+            seed=args.seed,
+            sampling=args.sampling,
+            workers=args.mc_workers,
+            tolerance=args.tolerance
+        )
+
+    # Record the run
+    with ResultsStore() as store:
+        store.append(_result_record(args, args.ticker, args.exchange, args.portfolio_value,
+                                    parametric_var, historical_var, monte_carlo_var, command='single'))
+
+    # Generate report
+    report_file = render_report(
+        [{
+            'ticker': args.ticker,
+            'exchange': args.exchange,
+            'portfolio_value': args.portfolio_value,
+            'parametric_var': parametric_var,
+            'historical_var': historical_var,
+            'monte_carlo_var': monte_carlo_var,
+        }],
+        args.report,
+        dpi=args.dpi
+    )[0]
+
+    # Print results
+    print(f"\nValue at Risk for {args.ticker} ({args.exchange}) portfolio of value ₹{args.portfolio_value:,.2f}:")
+    print(f"• Parametric VaR:   ₹{parametric_var:,.2f}  (ES ₹{parametric_var.expected_shortfall:,.2f})")
+    print(f"• Historical VaR:   ₹{historical_var:,.2f}  (ES ₹{historical_var.expected_shortfall:,.2f})")
+    print(f"• Monte Carlo VaR:  ₹{monte_carlo_var:,.2f}  (ES ₹{monte_carlo_var.expected_shortfall:,.2f})")
+    print(f"\nResults recorded in: '{os.path.basename(store.path)}'")
+    report_label = 'Results' if args.report == 'none' else 'Comparison report'
+    print(f"{report_label} saved as: '{os.path.basename(report_file)}'")
+
+def run_portfolio(args):
+    """Calculate diversified VaR for a portfolio of stock positions"""
+    from .data_fetcher import yahoo_symbol
+    from .bulk_fetcher import fetch_returns_matrix
+    from .positions import load_positions
+    from .results_store import ResultsStore
+    from .portfolio_var import (
+        calculate_portfolio_parametric_var,
+        calculate_portfolio_historical_var,
+        calculate_portfolio_monte_carlo_var
+    )
+
+    _validate_calculation_options(args)
+    if args.fetch_workers <= 0:
+        raise ValueError("Fetch worker count must be positive")
+    # Correlated portfolio simulation draws pseudo-random shocks in one process and runs every path
+    ignored = [flag for flag, used in (('--sampling', args.sampling != 'pseudo'),
+                                       ('--mc-workers', args.mc_workers != 1),
+                                       ('--tolerance', args.tolerance is not None)) if used]
+    if ignored:
+        raise ValueError(f"{', '.join(ignored)} cannot be used for portfolio VaR")
+
+    trades = []
+    for ticker, exchange, value in args.what_if:
+        try:
+            trades.append((ticker.upper(), exchange.upper(), yahoo_symbol(ticker.upper(), exchange), float(value)))
+        except ValueError as e:
+            raise ValueError(f"Invalid --what-if {ticker} {exchange} {value}: {str(e)}")
+
+    positions = load_positions(args.positions)
+    positions['symbol'] = [
+        yahoo_symbol(ticker, exchange)
+        for ticker, exchange in zip(positions['ticker'], positions['exchange'])
+    ]
+    # Repeated symbols are netted into a single holding
+    holdings = positions.groupby('symbol', sort=False)['portfolio_value'].sum()
+    pairs = list(positions.drop_duplicates('symbol')[['ticker', 'exchange']].itertuples(index=False))
+    # Stocks traded in a what-if but not yet held are fetched alongside the holdings
+    pairs += list(dict.fromkeys(
+        (ticker, exchange) for ticker, exchange, symbol, _ in trades if symbol not in holdings.index
+    ))
+    total_value = holdings.sum()
+
+    logger.info(f"Calculating portfolio VaR for {len(holdings)} positions from {args.positions}")
+    logger.info(f"Portfolio value: ₹{total_value:,.2f}")
+    logger.info(f"Confidence: {args.confidence*100}%, Horizon: {args.horizon} days")
+    logger.info(f"Data window: {args.window} days, Simulations: {args.simulations}")
+
+    # Fetch aligned returns for every position
+    returns = fetch_returns_matrix(
+        pairs,
+        args.window,
+        offline=args.offline,
+        max_workers=args.fetch_workers
+    )
+    universe = returns
+    returns = returns[holdings.index]
+    exposures = holdings.values
+
+    parametric_var = calculate_portfolio_parametric_var(
+        returns,
+        exposures,
+        args.confidence,
+        args.horizon
+    )
+
+    historical_var = calculate_portfolio_historical_var(
+        returns,
+        exposures,
+        args.confidence,
+        args.horizon,
+        method=args.historical_method,
+        samples=args.bootstrap_samples,
+        seed=args.seed
+    )
+
+    monte_carlo_var = calculate_portfolio_monte_carlo_var(
+        returns,
+        exposures,
+        args.confidence,
+        args.horizon,
+        args.simulations,
+        seed=args.seed
+    )
+
+    print(f"\nValue at Risk for portfolio of {len(holdings)} positions with value ₹{total_value:,.2f}:")
+    print(f"• Parametric VaR:   ₹{parametric_var:,.2f}  (ES ₹{parametric_var.expected_shortfall:,.2f})")
+    print(f"• Historical VaR:   ₹{historical_var:,.2f}  (ES ₹{historical_var.expected_shortfall:,.2f})")
+    print(f"• Monte Carlo VaR:  ₹{monte_carlo_var:,.2f}  (ES ₹{monte_carlo_var.expected_shortfall:,.2f})")
+
+    # Record the run under the positions file's name, with PORTFOLIO in place of an exchange
+    with ResultsStore() as store:
+        store.append(_result_record(args, os.path.splitext(os.path.basename(args.positions))[0].upper(), 'PORTFOLIO',
+                                    total_value, parametric_var, historical_var, monte_carlo_var,
+                                    command='portfolio'))
+    print(f"\nResults recorded in: '{os.path.basename(store.path)}'")
+
+    if args.contributions or trades:
+        from .marginal_var import MarginalVaR, MARGINAL_METHODS
+
+        marginal = MarginalVaR(
+            universe,
+            holdings,
+            args.confidence,
+            args.horizon,
+            method=args.historical_method,
+            samples=args.bootstrap_samples,
+            seed=args.seed
+        )
+    if args.contributions:
+        table = marginal.contributions().loc[holdings.index]
+        print("\nVaR contributions (marginal VaR per ₹1 added, component VaR sums to the portfolio VaR):")
+        print(table.to_string(formatters={
+            column: (lambda value: f"{value:.4f}") if column.startswith('marginal') else (lambda value: f"₹{value:,.0f}")
+            for column in table.columns
+        }))
+    if trades:
+        print("\nIncremental VaR of proposed trades:")
+        for ticker, exchange, symbol, value in trades:
+            changes = ", ".join(
+                f"{method} {marginal.incremental_var(symbol, value, method):+,.2f}" for method in MARGINAL_METHODS
+            )
+            print(f"• {'Buy' if value >= 0 else 'Sell'} ₹{abs(value):,.2f} of {ticker} ({exchange}): {changes}")
+
+def run_batch_file(args):
+    """Calculate VaR for every position in a positions file"""
+    from .positions import load_positions
+    from .batch import run_batch
+    from .report_generator import save_batch_results
+    from .results_store import ResultsStore
+    from .renderer import render_report
+
+    _validate_calculation_options(args)
+    if args.dpi <= 0:
+        raise ValueError("Report resolution must be positive")
+    if args.workers is not None and args.workers <= 0:
+        raise ValueError("Worker count must be positive")
+    if args.fetch_workers <= 0:
+        raise ValueError("Fetch worker count must be positive")
+    if args.mc_workers != 1:
+        # Positions already run in parallel across --workers; nesting engine pools would oversubscribe
+        raise ValueError("--mc-workers is not supported in batch mode; "
+                         "positions already run in parallel across --workers")
+
+    positions = load_positions(args.positions)
+    returns_store = None
+    if args.returns_store:
+        from .returns_store import ReturnsStore
+        returns_store = ReturnsStore(args.returns_store)
+        logger.info(f"Reading returns from {returns_store}")
+    logger.info(f"Running batch VaR for {len(positions)} positions from {args.positions}")
+    logger.info(f"Confidence: {args.confidence*100}%, Horizon: {args.horizon} days")
+    logger.info(f"Data window: {args.window} days, Simulations: {args.simulations}")
+
+    results = run_batch(
+        positions,
+        args.confidence,
+        args.horizon,
+        args.window,
+        args.simulations,
+        historical_method=args.historical_method,
+        bootstrap_samples=args.bootstrap_samples,
+        sampling=args.sampling,
+        tolerance=args.tolerance,
+        seed=args.seed,
+        offline=args.offline,
+        workers=args.workers,
+        fetch_workers=args.fetch_workers,
+        returns_store=returns_store
+    )
+    results_file = save_batch_results(results, args.output)
+
+    calculated = results[results['error'].isna()]
+    with ResultsStore() as store:
+        store.extend(
+            _result_record(args, ticker, exchange, value, parametric_var, historical_var,
+                           monte_carlo_var, command='batch', expected_shortfalls=expected_shortfalls)
+            for ticker, exchange, value, parametric_var, historical_var, monte_carlo_var, *expected_shortfalls in zip(
+                calculated['ticker'], calculated['exchange'], calculated['portfolio_value'],
+                calculated['parametric_var'], calculated['historical_var'], calculated['monte_carlo_var'],
+                calculated['parametric_es'], calculated['historical_es'], calculated['monte_carlo_es']
+            )
+        )
+
+    failed = results[results['error'].notna()]
+    print(f"\nValue at Risk calculated for {len(results) - len(failed)} of {len(results)} positions")
+    for ticker, exchange, error in zip(failed['ticker'], failed['exchange'], failed['error']):
+        print(f"• {ticker} ({exchange}): {error}")
+    print(f"\nBatch results saved as: '{os.path.basename(results_file)}'")
+    print(f"Results recorded in: '{os.path.basename(store.path)}'")
+
+    if args.report != 'none' and len(calculated):
+        records = calculated[['ticker', 'exchange', 'portfolio_value', 'parametric_var',
+                              'historical_var', 'monte_carlo_var']].to_dict('records')
+        report_files = render_report(records, args.report, dpi=args.dpi, workers=args.workers or os.cpu_count() or 1)
+        if len(report_files) == 1:
+            print(f"Comparison report saved as: '{os.path.basename(report_files[0])}'")
+        else:
+            print(f"Comparison reports saved: {len(report_files)} files in data/reports")
+
+def run_surface(args):
+    """Calculate a VaR surface for a single stock position"""
+    from .data_fetcher import fetch_stock_data
+    from .var_surface import calculate_var_surface
+    from .report_generator import save_var_surface
+
+    if args.portfolio_value <= 0:
+        raise ValueError("Portfolio value must be positive")
+    _validate_calculation_options(args)
+    if args.tolerance is not None:
+        # One shock set serves every horizon and level, so there is no single VaR to converge on
+        raise ValueError("--tolerance is not supported for VaR surfaces; set --simulations instead")
+
+    logger.info(f"Calculating VaR surface for {args.ticker} on {args.exchange}")
+    logger.info(f"Portfolio value: ₹{args.portfolio_value:,.2f}")
+    logger.info(f"Confidence levels: {args.confidences}, Horizons: {args.horizons} days")
+
+    returns = fetch_stock_data(
+        args.ticker,
+        args.exchange,
+        args.window,
+        offline=args.offline
+    )
+
+    surface = calculate_var_surface(
+        returns,
+        args.portfolio_value,
+        confidence_levels=args.confidences,
+        horizons=args.horizons,
+        methods=args.methods,
+        simulations=args.simulations,
+        historical_method=args.historical_method,
+        bootstrap_samples=args.bootstrap_samples,
+        seed=args.seed,
+        sampling=args.sampling,
+        mc_workers=args.mc_workers
+    )
+    surface_file = save_var_surface(surface, args.ticker, args.exchange, args.output)
+
+    table = surface.pivot_table(index=['method', 'horizon'], columns='confidence_level', values='value_at_risk')
+    table.columns = [f"{level * 100:g}%" for level in table.columns]
+    print(f"\nValue at Risk surface for {args.ticker} ({args.exchange}) portfolio of value ₹{args.portfolio_value:,.2f}:")
+    print(table.to_string(float_format=lambda value: f"₹{value:,.0f}"))
+    print(f"\nVaR surface saved as: '{os.path.basename(surface_file)}'")
+
+def run_backtest_file(args):
+    """Backtest rolling VaR for every position in a positions file"""
+    from .positions import load_positions
+    from .backtest import run_backtest
+    from .report_generator import save_backtest_results
+
+    if not 0.90 <= args.confidence <= 0.99:
+        raise ValueError("Confidence level must be between 0.90 and 0.99")
+    if args.fetch_workers <= 0:
+        raise ValueError("Fetch worker count must be positive")
+
+    positions = load_positions(args.positions)
+    logger.info(f"Backtesting VaR for {len(positions)} positions from {args.positions}")
+    logger.info(f"Confidence: {args.confidence*100}%, Window: {args.window} days, History: {args.history} days")
+
+    result, failed = run_backtest(
+        positions,
+        args.window,
+        args.history,
+        args.confidence,
+        methods=args.methods,
+        simulations=args.simulations,
+        seed=args.seed,
+        offline=args.offline,
+        fetch_workers=args.fetch_workers
+    )
+    exceptions_file, statistics_file = save_backtest_results(result, args.output)
+
+    statistics = result.statistics.set_index(['symbol', 'method'])
+    print(f"\nVaR backtest at {args.confidence*100:g}% over a {args.window}-day rolling window:")
+    print(statistics[['observations', 'exceptions', 'expected_exceptions', 'kupiec_p',
+                      'christoffersen_p', 'conditional_coverage_p']].to_string(float_format=lambda value: f"{value:.3f}"))
+    for symbol, error in failed.items():
+        print(f"• {symbol}: {error}")
+    print(f"\nException series saved as: '{os.path.basename(exceptions_file)}'")
+    print(f"Test statistics saved as: '{os.path.basename(statistics_file)}'")
+
+def run_store(args):
+    """Build a memory-mapped returns store from the positions in a file"""
+    from .positions import load_positions
+    from .bulk_fetcher import fetch_bulk_prices
+    from .returns_store import build_returns_store
+
+    if args.history <= 0:
+        raise ValueError("History must be positive")
+    if args.fetch_workers <= 0:
+        raise ValueError("Fetch worker count must be positive")
+
+    positions = load_positions(args.positions)
+    pairs = list(dict.fromkeys(zip(positions['ticker'], positions['exchange'])))
+    logger.info(f"Building returns store for {len(pairs)} symbols with {args.history} days of history")
+
+    histories, failed = fetch_bulk_prices(pairs, args.history, offline=args.offline, max_workers=args.fetch_workers)
+    if not histories:
+        raise ValueError(f"Failed to fetch data for all {len(pairs)} symbols")
+    store = build_returns_store(args.output, histories)
+
+    print(f"\nReturns store of {len(store.dates)} days x {len(store.symbols)} symbols "
+          f"({store.returns.nbytes / 2**20:,.1f} MiB) saved in: '{args.output}'")
+    for symbol, error in failed.items():
+        print(f"• {symbol}: {error}")
+
+def run_stress(args):
+    """Stress test the portfolios in a positions file"""
+    from .positions import load_positions
+    from .bulk_fetcher import fetch_bulk_returns
+    from .scenario_engine import (
+        HISTORICAL_PERIODS, ScenarioSet, historical_day_scenarios, historical_period_scenarios, factor_scenarios,
+        load_shock_table, holdings_matrix, stress_test
+    )
+    from .report_generator import save_stress_results
+
+    if args.history <= 0:
+        raise ValueError("History must be positive")
+    if args.top <= 0:
+        raise ValueError("Number of ranked scenarios must be positive")
+    if args.fetch_workers <= 0:
+        raise ValueError("Fetch worker count must be positive")
+    if args.betas and not args.shocks:
+        raise ValueError("--betas requires a --shocks file of factor scenarios")
+
+    positions = load_positions(args.positions)
+    holdings = holdings_matrix(positions)
+    logger.info(f"Stress testing {len(holdings)} portfolios of {holdings.shape[1]} symbols from {args.positions}")
+
+    scenario_sets = []
+    failed = {}
+    if args.periods or not args.no_days:
+        pairs = list(dict.fromkeys(zip(positions['ticker'], positions['exchange'])))
+        # Keep symbols with short histories: they are unshocked before their first close
+        fetched = fetch_bulk_returns(pairs, args.history, offline=args.offline,
+                                     max_workers=args.fetch_workers, min_coverage=0.0)
+        failed = fetched.failed
+        if not args.no_days:
+            scenario_sets.append(historical_day_scenarios(fetched.returns))
+        if args.periods:
+            scenario_sets.append(historical_period_scenarios(
+                fetched.returns, {name: HISTORICAL_PERIODS[name] for name in args.periods}
+            ))
+    if args.shocks:
+        shocks = load_shock_table(args.shocks, 'scenario')
+        if args.betas:
+            scenario_sets.append(factor_scenarios(load_shock_table(args.betas, 'symbol'), shocks))
+        else:
+            scenario_sets.append(ScenarioSet.from_frame(shocks))
+    if not scenario_sets:
+        raise ValueError("No scenarios selected: pass --shocks or drop --no-days")
+
+    scenarios = scenario_sets[0].concat(*scenario_sets[1:])
+    result = stress_test(holdings, scenarios, top=args.top)
+    rankings_file = save_stress_results(result, args.output)
+
+    worst = result.rankings[result.rankings['rank'] == 1].set_index('portfolio')
+    print(f"\nWorst of {len(scenarios)} scenarios for {len(holdings)} portfolios:")
+    print(worst[['scenario', 'loss', 'loss_pct']].to_string(
+        formatters={'loss': lambda value: f"₹{value:,.0f}", 'loss_pct': lambda value: f"{value:.2%}"}
+    ))
+    for symbol in result.unshocked:
+        print(f"• {symbol}: {failed.get(symbol, 'No scenario data')}; revalued as unchanged")
+    print(f"\nStress test rankings saved as: '{os.path.basename(rankings_file)}'")
+
+def run_history(args):
+    """Print recorded VaR results for a symbol, user or date range"""
+    from .results_store import ResultsStore
+
+    if args.limit is not None and args.limit <= 0:
+        raise ValueError("Limit must be positive")
+
+    with ResultsStore() as store:
+        history = store.history(
+            ticker=args.ticker.upper() if args.ticker else None,
+            exchange=args.exchange,
+            start=args.start,
+            end=args.end,
+            user=args.user,
+            limit=args.limit
+        )
+
+    if history.empty:
+        print("\nNo recorded VaR results match the query")
+        return
+    columns = ['run_at', 'user', 'ticker', 'exchange', 'portfolio_value', 'confidence_level',
+               'horizon', 'parametric_var', 'historical_var', 'monte_carlo_var']
+    print(f"\n{len(history)} recorded VaR results:")
+    print(history[columns].to_string(index=False, float_format=lambda value: f"{value:,.2f}"))
+    if args.output:
+        if os.path.splitext(args.output)[1].lower() == '.json':
+            history.to_json(args.output, orient='records', indent=2, date_format='iso')
+        else:
+            history.to_csv(args.output, index=False)
+        print(f"\nHistory saved as: '{os.path.basename(args.output)}'")
+
+def run_serve(args):
+    """Run the VaR HTTP service until interrupted"""
+    from .server import VaRService, serve, synthetic_returns
+
+    if args.workers <= 0:
+        raise ValueError("Worker count must be positive")
+    if args.cache_size <= 0 or args.ttl <= 0:
+        raise ValueError("Cache size and TTL must be positive")
+
+    service = VaRService(
+        data_source=synthetic_returns if args.data_source == 'synthetic' else None,
+        cache_size=args.cache_size,
+        cache_ttl=args.ttl,
+        workers=args.workers,
+        offline=args.offline
+    )
+    serve(service, args.host, args.port)
+
+def run_stream(args):
+    """Seed streaming VaR from recent history, then update it for every tick on stdin"""
+    from .data_fetcher import yahoo_symbol
+    from .bulk_fetcher import fetch_bulk_prices
+    from .returns_transform import transform_prices
+    from .positions import load_positions
+    from .streaming_var import StreamingVaR
+
+    if not 0.90 <= args.confidence <= 0.99:
+        raise ValueError("Confidence level must be between 0.90 and 0.99")
+    if args.horizon <= 0:
+        raise ValueError("Time horizon must be positive")
+    if args.fetch_workers <= 0:
+        raise ValueError("Fetch worker count must be positive")
+
+    positions = load_positions(args.positions)
+    positions['symbol'] = [
+        yahoo_symbol(ticker, exchange)
+        for ticker, exchange in zip(positions['ticker'], positions['exchange'])
+    ]
+    holdings = positions.groupby('symbol', sort=False)['portfolio_value'].sum()
+    pairs = positions.drop_duplicates('symbol')[['ticker', 'exchange']].itertuples(index=False)
+    histories, failed = fetch_bulk_prices(list(pairs), args.window + 1, offline=args.offline,
+                                          max_workers=args.fetch_workers)
+
+    stream = StreamingVaR(args.window, args.decay, args.simulations, seed=args.seed)
+    # Positions hold a fixed number of shares, valued at the latest tick
+    shares = {}
+    matrix = transform_prices(histories) if histories else None
+    for symbol, close_prices in histories.items():
+        try:
+            stream.add(symbol, matrix.series(symbol), float(close_prices.iloc[-1]))
+            shares[symbol] = holdings[symbol] / float(close_prices.iloc[-1])
+        except (ValueError, RuntimeError) as e:
+            failed[symbol] = str(e)
+    for symbol, error in failed.items():
+        logger.error(f"Not streaming {symbol}: {error}")
+    if not len(stream):
+        raise ValueError("No positions could be seeded")
+    logger.info(f"Streaming VaR for {len(stream)} symbols at {args.confidence*100}% over {args.horizon} days")
+
+    columns = [f"{method}_var" for method in args.methods]
+    print(",".join(['symbol', 'price', 'portfolio_value', 'volatility'] + columns), flush=True)
+    for line in sys.stdin:
+        fields = line.strip().split(',')
+        if not fields[0]:
+            continue
+        try:
+            symbol, price = fields[0], float(fields[1])
+            if price <= 0 or symbol not in stream:
+                raise ValueError
+        except (IndexError, ValueError):
+            logger.warning(f"Skipping invalid tick: {line.strip()}")
+            continue
+
+        if len(fields) > 2 and fields[2].strip().lower() == 'close':
+            stream.close(symbol, price)
+        else:
+            stream.update(symbol, price)
+        value = shares[symbol] * price
+        values = [stream.var(symbol, value, args.confidence, args.horizon, method) for method in args.methods]
+        print(",".join([symbol, f"{price:g}", f"{value:.2f}", f"{stream.volatility(symbol):.6f}"] +
+                       [f"{var:.2f}" for var in values]), flush=True)
+
+# Subcommands run in place of the default single-stock calculation
+COMMANDS = {
+    'portfolio': (_build_portfolio_parser, run_portfolio),
+    'batch': (_build_batch_parser, run_batch_file),
+    'surface': (_build_surface_parser, run_surface),
+    'backtest': (_build_backtest_parser, run_backtest_file),
+    'store': (_build_store_parser, run_store),
+    'stress': (_build_stress_parser, run_stress),
+    'history': (_build_history_parser, run_history),
+    'serve': (_build_serve_parser, run_serve),
+    'stream': (_build_stream_parser, run_stream),
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        command, argv = argv[0], argv[1:]
+        build_parser, run = COMMANDS[command]
+    else:
+        command, build_parser, run = 'single', _build_single_parser, run_single
+    parser = build_parser()
+    _add_profile_options(parser)
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if settings.METRICS_ENABLED or args.profile:
+        metrics.enable()
+    profiler = start_profiler(args.profiler) if args.profile_output else None
+    status = 'error'
+    start = time.perf_counter()
+    try:
+        run(args)
+        status = 'ok'
+
+    except Exception as e:
+        logger.error(f"Error occurred: {str(e)}")
+        print(f"\nError: {str(e)}")
+        print("Please check the logs for more details.")
+        sys.exit(1)
+
+    finally:
+        _finish_instrumentation(args, command, status, time.perf_counter() - start, profiler)
+
+if __name__ == '__main__':
+    main()
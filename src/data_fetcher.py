@@ -1,47 +1,146 @@
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import logging
-from .exceptions import DataFetchError
-
-logger = logging.getLogger(__name__)
-
-def fetch_stock_data(ticker, exchange, window=252):
-    """
-    Fetch historical stock data from Yahoo Finance API.
-    
-    :param ticker: Stock ticker symbol
-    :param exchange: Stock exchange (NSE or BSE)
-    :param window: Historical data window size (days)
-    :return: Array of daily returns
-    """
-    try:
-        # Validate exchange
-        exchange = exchange.upper()
-        if exchange not in ['NSE', 'BSE']:
-            raise ValueError("Invalid exchange. Use 'NSE' or 'BSE'")
-        
-        # Format ticker for Yahoo Finance
-        symbol = f"{ticker}.{'NS' if exchange == 'NSE' else 'BO'}"
-        logger.info(f"Fetching {window} days of data for {symbol}")
-        
-        # Fetch historical data
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=f"{window}d")
-        
-        if hist.empty:
-            raise DataFetchError(f"No data found for {symbol}")
-        
-        # Calculate daily log returns (more stable for financial calculations)
-        close_prices = hist['Close']
-        returns = np.log(close_prices / close_prices.shift(1)).dropna().values
-        
-        if len(returns) < window * 0.9:  # Allow 10% missing data
-            raise DataFetchError("Insufficient data for accurate calculation")
-            
-        logger.info(f"Successfully fetched {len(returns)} days of returns data")
-        return returns
-        
-    except Exception as e:
-        logger.error(f"Data fetch error: {str(e)}")
-        raise DataFetchError(f"Failed to fetch data: {str(e)}")
+import os
+import functools
+import pandas as pd
+import numpy as np
+import logging
+from .exceptions import DataFetchError
+from .price_cache import PriceCache
+from .returns_transform import transform_prices
+from .instrumentation import timed
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+def yahoo_symbol(ticker, exchange):
+    """
+    Format a ticker for Yahoo Finance.
+
+    :param ticker: Stock ticker symbol
+    :param exchange: Stock exchange (NSE or BSE)
+    :return: Yahoo Finance symbol (e.g. RELIANCE.NS)
+    """
+    exchange = exchange.upper()
+    if exchange not in ['NSE', 'BSE']:
+        raise ValueError("Invalid exchange. Use 'NSE' or 'BSE'")
+    return f"{ticker}.{'NS' if exchange == 'NSE' else 'BO'}"
+
+def download_yahoo_prices(symbol, period=None, start=None, adjusted=True):
+    """
+    Download daily closing prices from Yahoo Finance API.
+
+    :param symbol: Yahoo Finance symbol
+    :param period: Lookback period (e.g. '252d')
+    :param start: First date to download (used instead of period)
+    :param adjusted: Closes adjusted for splits and dividends, or the raw traded closes
+    :return: Series of closing prices indexed by date
+    """
+    # Deferred: yfinance is slow to import and only needed on a cache miss
+    import yfinance as yf
+
+    stock = yf.Ticker(symbol)
+    if start is not None:
+        hist = stock.history(start=start, auto_adjust=adjusted)
+    else:
+        hist = stock.history(period=period, auto_adjust=adjusted)
+
+    close_prices = hist['Close'] if not hist.empty else pd.Series(dtype=np.float64)
+    close_prices.name = symbol
+    # Align on calendar dates so NSE and BSE histories share one index
+    if isinstance(close_prices.index, pd.DatetimeIndex):
+        if close_prices.index.tz is not None:
+            close_prices.index = close_prices.index.tz_localize(None)
+        close_prices.index = close_prices.index.normalize()
+    return close_prices
+
+_price_cache = None
+
+def get_price_cache():
+    """
+    Get the shared on-disk price cache, backed by Yahoo Finance.
+
+    With settings.CORPORATE_ACTIONS_FILE set, the cache holds unadjusted closes
+    in its own directory (the transform applies the actions), so they never mix
+    with Yahoo's adjusted closes.
+    """
+    global _price_cache
+    if _price_cache is None:
+        if settings.CORPORATE_ACTIONS_FILE:
+            directory = os.path.join(settings.PRICES_DIR, 'unadjusted')
+            downloader = functools.partial(download_yahoo_prices, adjusted=False)
+        else:
+            directory, downloader = settings.PRICES_DIR, download_yahoo_prices
+        _price_cache = PriceCache(directory, downloader, max_age=settings.PRICE_CACHE_MAX_AGE)
+    return _price_cache
+
+def set_price_cache(cache):
+    """
+    Replace the shared price cache, e.g. with one using a local stand-in downloader.
+
+    :param cache: PriceCache instance (None restores the default on next use)
+    """
+    global _price_cache
+    _price_cache = cache
+
+def fetch_price_history(ticker, exchange, window=252, offline=False):
+    """
+    Fetch historical closing prices, served from the local price cache.
+
+    :param ticker: Stock ticker symbol
+    :param exchange: Stock exchange (NSE or BSE)
+    :param window: Historical data window size (days)
+    :param offline: Serve purely from cache without network access
+    :return: Series of closing prices indexed by date
+    """
+    symbol = yahoo_symbol(ticker, exchange)
+    logger.info(f"Fetching {window} days of data for {symbol}")
+
+    close_prices = get_price_cache().get(symbol, window, offline=offline)
+    if close_prices.empty:
+        raise DataFetchError(f"No data found for {symbol}")
+    return close_prices
+
+@timed('fetch.align')
+def align_price_histories(price_histories):
+    """
+    Align price histories on a common date index and convert them to returns.
+
+    Uses transform_prices with the configured calendar, gap and outlier
+    policies and corporate actions. By default prices are forward-filled across dates on which an
+    asset did not trade, so a missing day's move is folded into the next
+    available return; dates before an asset's first close get a zero return.
+
+    :param price_histories: Iterable of closing price Series (named by symbol)
+    :return: Tuple of (DataFrame of daily log returns (dates x symbols),
+             Series of the fraction of dates each symbol has a valid return)
+    """
+    try:
+        matrix = transform_prices(list(price_histories))
+    except ValueError as e:
+        raise DataFetchError(f"Cannot align price data: {str(e)}")
+    return matrix.to_frame(), pd.Series(matrix.coverage, index=matrix.symbols)
+
+@timed('fetch')
+def fetch_stock_data(ticker, exchange, window=252, offline=False):
+    """
+    Fetch historical stock data from Yahoo Finance API.
+
+    :param ticker: Stock ticker symbol
+    :param exchange: Stock exchange (NSE or BSE)
+    :param window: Historical data window size (days)
+    :param offline: Serve purely from cache without network access
+    :return: ReturnSeries of daily log returns
+    """
+    try:
+        close_prices = fetch_price_history(ticker, exchange, window, offline)
+        symbol = yahoo_symbol(ticker, exchange)
+        returns = transform_prices({symbol: close_prices}).series(symbol)
+
+        if len(returns) < window * settings.MIN_COVERAGE:
+            raise DataFetchError("Insufficient data for accurate calculation")
+
+        logger.info(f"Successfully fetched {len(returns)} days of returns data")
+        return returns
+
+    except Exception as e:
+        logger.error(f"Data fetch error: {str(e)}")
+        raise DataFetchError(f"Failed to fetch data: {str(e)}")
@@ -1,7 +1,7 @@
-class DataFetchError(Exception):
-    """Custom exception for data fetching errors"""
-    pass
-
-class CalculationError(Exception):
-    """Custom exception for calculation errors"""
-    pass
+class DataFetchError(Exception):
+    """Custom exception for data fetching errors"""
+    pass
+
+class CalculationError(Exception):
+    """Custom exception for calculation errors"""
+    pass
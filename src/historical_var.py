@@ -1,73 +1,78 @@
-import numpy as np
-import logging
-
-logger = logging.getLogger(__name__)
-
-def calculate_historical_var(returns, portfolio_value, confidence_level=0.95, horizon=1):
-    """
-    Calculate Value at Risk using historical simulation method.
-    
-    Industry Standards:
-    - Uses actual historical returns without distribution assumptions
-    - Properly handles multi-day horizons with block bootstrapping
-    - Represents loss as positive value
-    - Based on empirical distribution of returns
-    
-    :param returns: Array of historical log returns
-    :param portfolio_value: Current portfolio value
-    :param confidence_level: Confidence level (0.90-0.99)
-    :param horizon: Time horizon in days
-    :return: Historical VaR value (always positive)
-    """
-    try:
-        # Validate inputs
-        if len(returns) < 10:
-            raise ValueError("Insufficient data for calculation (min 10 data points)")
-        if not 0.90 <= confidence_level <= 0.99:
-            raise ValueError("Confidence level must be between 0.90 and 0.99")
-        if portfolio_value <= 0:
-            raise ValueError("Portfolio value must be positive")
-        if horizon <= 0:
-            raise ValueError("Time horizon must be positive")
-        
-        # For multi-day horizon, use block bootstrapping
-        if horizon > 1:
-            horizon_returns = []
-            n = len(returns)
-            # Ensure we have enough data for block sampling
-            if n < horizon:
-                raise ValueError("Insufficient data for horizon period")
-                
-            # Generate 10,000 samples of horizon-period returns
-            for _ in range(10000):
-                # Random start index for a block of 'horizon' days
-                start_idx = np.random.randint(0, n - horizon)
-                # Sum of log returns over the horizon period
-                cumulative_return = np.sum(returns[start_idx:start_idx+horizon])
-                horizon_returns.append(cumulative_return)
-            returns_dist = np.array(horizon_returns)
-        else:
-            returns_dist = returns
-        
-        # Calculate portfolio values after horizon
-        portfolio_values = portfolio_value * np.exp(returns_dist)
-        
-        # Calculate losses (positive values represent losses)
-        losses = portfolio_value - portfolio_values
-        
-        # Calculate VaR as the loss at the confidence level
-        # For 99% confidence, we take the 99th percentile of losses
-        var = np.percentile(losses, 100 * confidence_level)
-        
-        # Ensure non-negative VaR
-        var = max(0, var)
-        
-        logger.info(
-            f"Historical VaR calculated: ₹{var:,.2f} at {confidence_level*100:.1f}% confidence "
-            f"over {horizon} days"
-        )
-        return var
-        
-    except Exception as e:
-        logger.error(f"Historical VaR calculation failed: {str(e)}")
-        raise RuntimeError(f"Historical VaR calculation error: {str(e)}")
+import numpy as np
+import logging
+from .return_series import as_return_series
+from .utils import validate_var_parameters
+from .horizon import aggregate_horizon_returns
+from .var_result import VaRResult, loss_moments, sample_result
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+@timed('var.historical')
+def calculate_historical_var(returns, portfolio_value, confidence_level=0.95, horizon=1,
+                             method='bootstrap', samples=10000, seed=None, details=False):
+    """
+    Calculate Value at Risk using historical simulation method.
+    
+    Industry Standards:
+    - Uses actual historical returns without distribution assumptions
+    - Handles multi-day horizons with overlapping windows or block bootstrapping
+    - Represents loss as positive value
+    - Based on empirical distribution of returns
+    
+    :param returns: ReturnSeries or array of historical log returns
+    :param portfolio_value: Current portfolio value
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param horizon: Time horizon in days
+    :param method: Multi-day aggregation, 'bootstrap' or 'overlapping'
+    :param samples: Number of bootstrap samples
+    :param seed: Random seed for the bootstrap
+    :param details: Also return the tail losses and the moments of the loss distribution
+    :return: Historical VaR (always positive) as a VaRResult carrying the ES
+    """
+    try:
+        # Validate inputs (the series itself is validated once on construction)
+        returns = as_return_series(returns)
+        validate_var_parameters(portfolio_value, confidence_level, horizon)
+        
+        if horizon > 1:
+            # For multi-day horizon, aggregate daily returns into horizon windows
+            returns_dist = aggregate_horizon_returns(
+                returns, horizon, method=method, samples=samples, seed=seed,
+                prefix=returns.prefix_sum
+            )
+            
+            # Losses (positive values represent losses) of the portfolio after the horizon
+            losses = -portfolio_value * np.expm1(returns_dist)
+            
+            # VaR is the loss at the confidence level (for 99% confidence, the 99th
+            # percentile of losses) and ES the mean beyond it, from one partition
+            result = sample_result(losses, confidence_level, horizon, 'historical', details)
+            scenarios = len(returns_dist)
+        else:
+            # Losses fall as returns rise, so the loss percentile is the loss at the
+            # (1 - confidence) return quantile, read from the series' cached sorted copy;
+            # ES averages the returns at or below it from the series' cached tail sums
+            p = 1 - confidence_level
+            tail = None
+            if details:
+                tail = -portfolio_value * np.expm1(returns.sorted[:int(p * (len(returns) - 1)) + 1])
+            result = VaRResult(
+                max(0, -portfolio_value * np.expm1(returns.quantile(p))),
+                max(0, -portfolio_value * returns.tail_mean(p)),
+                confidence_level, horizon, 'historical',
+                tail=tail,
+                moments=loss_moments(-portfolio_value * np.expm1(returns.values)) if details else None
+            )
+            scenarios = len(returns)
+        
+        logger.info(
+            f"Historical VaR calculated: ₹{result:,.2f} (ES ₹{result.expected_shortfall:,.2f}) "
+            f"at {confidence_level*100:.1f}% confidence "
+            f"over {horizon} days ({scenarios} {method if horizon > 1 else 'daily'} scenarios)"
+        )
+        return result
+        
+    except Exception as e:
+        logger.error(f"Historical VaR calculation failed: {str(e)}")
+        raise RuntimeError(f"Historical VaR calculation error: {str(e)}")
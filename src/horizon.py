@@ -0,0 +1,69 @@
+import numpy as np
+import logging
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+HORIZON_METHODS = ('overlapping', 'bootstrap')
+
+def prefix_sum(returns):
+    """
+    Prefix sum of log returns along the time axis with a leading zero row.
+
+    The sum of returns[i:j] is prefix[j] - prefix[i], so any window
+    aggregate costs one subtraction regardless of its length.
+
+    :param returns: Array of log returns (1-D, or 2-D dates x assets)
+    :return: Array with len(returns) + 1 rows
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    prefix = np.zeros((len(returns) + 1,) + returns.shape[1:], dtype=np.float64)
+    np.cumsum(returns, axis=0, out=prefix[1:])
+    return prefix
+
+@timed('var.horizon_aggregation')
+def aggregate_horizon_returns(returns, horizon, method='overlapping', samples=10000,
+                              seed=None, prefix=None):
+    """
+    Aggregate daily log returns into horizon-period log returns.
+
+    Methods:
+    - overlapping: exact sums over every window of 'horizon' consecutive days
+    - bootstrap: 'samples' windows drawn with uniformly random start index
+
+    Both methods are computed from a prefix sum, so the cost is independent of
+    the horizon length. For 2-D input (dates x assets) the same windows are
+    used for every column, which preserves cross-sectional correlation.
+
+    :param returns: Array of daily log returns (1-D, or 2-D dates x assets)
+    :param horizon: Time horizon in days
+    :param method: 'overlapping' or 'bootstrap'
+    :param samples: Number of bootstrap samples (bootstrap only)
+    :param seed: Seed or numpy Generator for the bootstrap (bootstrap only)
+    :param prefix: Precomputed prefix sum of returns (optional)
+    :return: Array of horizon log returns
+    """
+    if method not in HORIZON_METHODS:
+        raise ValueError(f"Unknown horizon method '{method}'. Use one of: {', '.join(HORIZON_METHODS)}")
+    if horizon <= 0:
+        raise ValueError("Time horizon must be positive")
+
+    n = len(returns)
+    if n < horizon:
+        raise ValueError("Insufficient data for horizon period")
+
+    if horizon == 1 and method == 'overlapping':
+        return np.asarray(returns, dtype=np.float64)
+
+    if prefix is None:
+        prefix = prefix_sum(returns)
+    windows = n - horizon + 1
+
+    if method == 'overlapping':
+        return prefix[horizon:] - prefix[:windows]
+
+    if samples <= 0:
+        raise ValueError("Bootstrap sample count must be positive")
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, windows, size=samples)
+    return prefix[starts + horizon] - prefix[starts]
@@ -0,0 +1,251 @@
+import sys
+import json
+import time
+import threading
+import functools
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ('cprofile', 'sampling')
+
+class _Stage:
+    """Context manager timing one pass through a pipeline stage"""
+
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NullStage:
+    """Shared no-op stage handed out while instrumentation is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class MetricsRegistry:
+    """
+    Process-wide timers and counters for the VaR pipeline.
+
+    Timers accumulate calls, total and maximum seconds per stage name; nested
+    stages are timed independently, so a parent's time includes its children.
+    While disabled, stage() returns a shared no-op context manager and count()
+    returns immediately, so instrumented code pays one attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.timers = {}
+        self.counters = {}
+        # Bulk fetch threads record downloads concurrently
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+
+    def record(self, name, seconds):
+        """Add one timed call of a stage"""
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+
+    def stage(self, name):
+        """
+        Time a block of code when enabled.
+
+        :param name: Stage name (dotted, e.g. 'fetch.download')
+        :return: Context manager
+        """
+        return _Stage(self, name) if self.enabled else _NULL_STAGE
+
+    def count(self, name, value=1):
+        """Increment a counter when enabled"""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """
+        Current timers and counters.
+
+        :return: Dict with 'timers' ({name: {calls, seconds, max_seconds}}) and 'counters'
+        """
+        with self._lock:
+            return {
+                'timers': {
+                    name: {'calls': calls, 'seconds': total, 'max_seconds': longest}
+                    for name, (calls, total, longest) in sorted(self.timers.items())
+                },
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def merge(self, snapshot):
+        """Fold in a snapshot taken in another process (e.g. a pool worker)"""
+        with self._lock:
+            for name, timer in snapshot['timers'].items():
+                current = self.timers.setdefault(name, [0, 0.0, 0.0])
+                current[0] += timer['calls']
+                current[1] += timer['seconds']
+                current[2] = max(current[2], timer['max_seconds'])
+            for name, value in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def format_summary(self, wall_seconds=None):
+        """
+        Per-stage breakdown as a text table.
+
+        :param wall_seconds: Total run time, to show each stage's share of it
+        :return: Multi-line string
+        """
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<34} {'calls':>7} {'total s':>10} {'mean ms':>10} {'max ms':>10} {'share':>7}"]
+        for name, timer in snapshot['timers'].items():
+            share = f"{timer['seconds'] / wall_seconds:7.1%}" if wall_seconds else f"{'':>7}"
+            lines.append(
+                f"{name:<34} {timer['calls']:>7} {timer['seconds']:>10.3f} "
+                f"{timer['seconds'] / timer['calls'] * 1000:>10.2f} {timer['max_seconds'] * 1000:>10.2f} {share}"
+            )
+        if wall_seconds:
+            lines.append(f"{'total (wall)':<34} {'':>7} {wall_seconds:>10.3f}")
+        if snapshot['counters']:
+            lines.append("")
+            lines.append(f"{'counter':<34} {'value':>7}")
+            lines.extend(f"{name:<34} {value:>7}" for name, value in snapshot['counters'].items())
+        return "\n".join(lines)
+
+# Shared registry used by every instrumented module
+metrics = MetricsRegistry()
+
+def stage(name):
+    """Time a block of code in the shared registry (no-op when disabled)"""
+    return metrics.stage(name)
+
+def count(name, value=1):
+    """Increment a counter in the shared registry (no-op when disabled)"""
+    metrics.count(name, value)
+
+def timed(name):
+    """
+    Decorator timing every call of a function in the shared registry.
+
+    :param name: Stage name
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metrics.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def write_metrics(filepath, **fields):
+    """
+    Append one JSON line with the shared registry's timers and counters.
+
+    :param filepath: JSON-lines metrics file
+    :param fields: Extra fields for the line (command, status, wall time, ...)
+    """
+    line = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), **fields, **metrics.snapshot()}
+    with open(filepath, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(line) + "\n")
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for the calling thread.
+
+    A background thread samples the profiled thread's stack at a fixed
+    interval and counts each distinct stack. Results are written in the
+    collapsed-stack format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        :param interval: Seconds between samples
+        """
+        self.interval = interval
+        self.samples = Counter()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump_stats(self, filepath):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for stack, samples in self.samples.most_common():
+                f.write(f"{stack} {samples}\n")
+
+def start_profiler(kind='cprofile'):
+    """
+    Start profiling the calling thread.
+
+    :param kind: 'cprofile' (deterministic, pstats output) or 'sampling' (collapsed stacks)
+    :return: Profiler with stop() and dump_stats(filepath)
+    """
+    if kind == 'cprofile':
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        # Same stop() interface as the sampling profiler
+        profiler.stop = profiler.disable
+        return profiler
+    if kind == 'sampling':
+        profiler = SamplingProfiler()
+        profiler.start()
+        return profiler
+    raise ValueError(f"Unknown profiler '{kind}'. Use one of: {', '.join(PROFILERS)}")
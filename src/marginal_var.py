@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+import logging
+from .portfolio_var import _validate_portfolio_inputs, covariance_matrix, portfolio_scenario_pnl
+from .instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
+MARGINAL_METHODS = ('parametric', 'historical')
+
+class MarginalVaR:
+    """
+    Marginal, component and incremental VaR of a portfolio for pre-trade checks.
+
+    Built once per portfolio, it caches everything a what-if needs:
+    - parametric: the covariance matrix Σ, the covariance-weighted exposures Σh,
+      the portfolio variance hᵀΣh and mean P&L
+    - historical: the scenario return matrix and the portfolio's scenario P&L vector
+
+    Adding Δ of asset j is a rank-1 change to the holdings, so its VaR follows
+    without revaluing the book: the new variance is
+    hᵀΣh + 2Δ(Σh)ⱼ + Δ²Σⱼⱼ (O(1)), and the new scenario P&L is the cached vector
+    plus Δ times asset j's scenario returns (O(scenarios), plus a partial sort).
+    apply_trade commits a change by updating the caches in O(assets + scenarios).
+
+    Component VaRs are Euler allocations and sum to the portfolio VaR. For
+    historical VaR they are read from the scenarios that define the loss
+    percentile (interpolated exactly as np.percentile does).
+    """
+
+    def __init__(self, returns, holdings, confidence_level=0.95, horizon=1,
+                 method='bootstrap', samples=10000, seed=None):
+        """
+        :param returns: Returns matrix of daily log returns (dates x assets); a DataFrame's
+                        columns name the assets. Include candidate assets with zero holdings
+                        to evaluate trades in names not yet held
+        :param holdings: Position values in INR, one per asset (a Series is aligned to the
+                         returns columns, missing assets are zero)
+        :param confidence_level: Confidence level (0.90-0.99)
+        :param horizon: Time horizon in days
+        :param method: Multi-day aggregation for historical VaR, 'bootstrap' or 'overlapping'
+        :param samples: Number of bootstrap samples
+        :param seed: Random seed for the bootstrap
+        """
+        if isinstance(returns, pd.DataFrame):
+            self.assets = list(returns.columns)
+            if isinstance(holdings, pd.Series):
+                holdings = holdings.reindex(returns.columns, fill_value=0.0)
+        else:
+            self.assets = list(range(np.shape(returns)[1]))
+        returns, holdings = _validate_portfolio_inputs(returns, holdings, confidence_level, horizon)
+
+        with stage('var.marginal.setup'):
+            self.confidence_level = confidence_level
+            self.horizon = horizon
+            self.holdings = holdings.copy()
+            self._columns = {asset: column for column, asset in enumerate(self.assets)}
+
+            # Parametric: VaR = |z·σp·√T - μp·T|, as in calculate_portfolio_parametric_var
+            self._z = NormalDist().inv_cdf(1 - confidence_level)
+            self._mean, self._cov = covariance_matrix(returns)
+            self._exposures = self._cov @ holdings
+            self._variance = float(holdings @ self._exposures)
+            self._mean_pnl = float(holdings @ self._mean)
+
+            # Historical: scenario simple returns, stored column-major so one
+            # asset's scenarios are contiguous for the rank-1 P&L update
+            if horizon > 1:
+                from .horizon import aggregate_horizon_returns
+                returns = aggregate_horizon_returns(returns, horizon, method=method, samples=samples, seed=seed)
+            self._scenarios = np.asfortranarray(np.expm1(returns))
+            self._pnl = portfolio_scenario_pnl(returns, holdings)
+            # Linear interpolation between the two order statistics around the
+            # percentile, as in np.percentile
+            position = confidence_level * (len(self._pnl) - 1)
+            self._lower = int(position)
+            self._upper = min(self._lower + 1, len(self._pnl) - 1)
+            self._fraction = position - self._lower
+
+        logger.info(
+            f"Marginal VaR cache built for {len(holdings)} assets and {len(self._pnl)} scenarios "
+            f"at {confidence_level*100:.1f}% confidence over {horizon} days"
+        )
+
+    def _column(self, asset):
+        column = self._columns.get(asset)
+        if column is None:
+            raise KeyError(f"{asset} is not in the portfolio universe")
+        return column
+
+    def _parametric_var(self, variance, mean_pnl):
+        return abs(self._z * np.sqrt(max(variance, 0.0) * self.horizon) - mean_pnl * self.horizon)
+
+    def _historical_var(self, pnl):
+        # Loss percentile: losses are -pnl, so read the two order statistics of -pnl
+        losses = np.partition(-pnl, (self._lower, self._upper))
+        lower, upper = losses[self._lower], losses[self._upper]
+        return max(0.0, lower + (upper - lower) * self._fraction)
+
+    def _check_method(self, method):
+        if method not in MARGINAL_METHODS:
+            raise ValueError(f"Unknown method '{method}'. Use one of: {', '.join(MARGINAL_METHODS)}")
+
+    def var(self, method='parametric'):
+        """
+        Current portfolio VaR.
+
+        :param method: 'parametric' or 'historical'
+        :return: VaR value (always positive)
+        """
+        self._check_method(method)
+        if method == 'parametric':
+            return self._parametric_var(self._variance, self._mean_pnl)
+        return self._historical_var(self._pnl)
+
+    def marginal_var(self, method='parametric'):
+        """
+        Change in VaR per rupee added to each asset (∂VaR/∂hᵢ).
+
+        :param method: 'parametric' or 'historical'
+        :return: Array with one marginal VaR per asset
+        """
+        self._check_method(method)
+        if method == 'parametric':
+            sigma = np.sqrt(max(self._variance, 0.0))
+            sign = np.sign(self._z * sigma * np.sqrt(self.horizon) - self._mean_pnl * self.horizon)
+            if sigma == 0:
+                return -sign * self._mean * self.horizon
+            return sign * (self._z * np.sqrt(self.horizon) * self._exposures / sigma - self._mean * self.horizon)
+
+        # Loss of each asset in the (interpolated) scenario at the loss percentile
+        order = np.argpartition(-self._pnl, (self._lower, self._upper))
+        lower, upper = order[self._lower], order[self._upper]
+        return -((1 - self._fraction) * self._scenarios[lower] + self._fraction * self._scenarios[upper])
+
+    def component_var(self, method='parametric'):
+        """
+        Each position's share of VaR (hᵢ · marginal VaRᵢ); the components sum to the portfolio VaR.
+
+        :param method: 'parametric' or 'historical'
+        :return: Array with one component VaR per asset
+        """
+        return self.holdings * self.marginal_var(method)
+
+    def what_if(self, asset, delta, method='parametric'):
+        """
+        Portfolio VaR after adding delta of an asset, without changing the cached portfolio.
+
+        :param asset: Asset name (returns column) or position
+        :param delta: Change in position value in INR (negative to sell)
+        :param method: 'parametric' or 'historical'
+        :return: VaR value after the trade
+        """
+        self._check_method(method)
+        column = self._column(asset)
+        if method == 'parametric':
+            variance = self._variance + 2 * delta * self._exposures[column] + delta * delta * self._cov[column, column]
+            return self._parametric_var(variance, self._mean_pnl + delta * self._mean[column])
+        return self._historical_var(self._pnl + delta * self._scenarios[:, column])
+
+    def incremental_var(self, asset, delta, method='parametric'):
+        """
+        Change in portfolio VaR from adding delta of an asset.
+
+        :param asset: Asset name (returns column) or position
+        :param delta: Change in position value in INR (negative to sell)
+        :param method: 'parametric' or 'historical'
+        :return: VaR after the trade minus VaR before (negative when the trade reduces risk)
+        """
+        return self.what_if(asset, delta, method) - self.var(method)
+
+    def apply_trade(self, asset, delta):
+        """
+        Commit a trade to the cached portfolio with a rank-1 update of every cache.
+
+        :param asset: Asset name (returns column) or position
+        :param delta: Change in position value in INR (negative to sell)
+        """
+        column = self._column(asset)
+        self._variance += 2 * delta * self._exposures[column] + delta * delta * self._cov[column, column]
+        self._exposures += delta * self._cov[:, column]
+        self._mean_pnl += delta * self._mean[column]
+        self._pnl += delta * self._scenarios[:, column]
+        self.holdings[column] += delta
+
+    def contributions(self, methods=MARGINAL_METHODS):
+        """
+        Per-asset risk decomposition.
+
+        :param methods: VaR methods to decompose
+        :return: DataFrame indexed by asset with holding and, per method,
+                 marginal_<method> and component_<method> columns
+        """
+        table = pd.DataFrame({'holding': self.holdings}, index=pd.Index(self.assets, name='asset'))
+        for method in methods:
+            marginal = self.marginal_var(method)
+            table[f"marginal_{method}"] = marginal
+            table[f"component_{method}"] = self.holdings * marginal
+        return table
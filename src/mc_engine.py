@@ -0,0 +1,335 @@
+import numpy as np
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from .instrumentation import timed, count
+from .var_result import loss_moments
+
+logger = logging.getLogger(__name__)
+
+SAMPLING_METHODS = ('pseudo', 'antithetic', 'sobol')
+
+# Simulations generated per chunk; bounds memory per worker to a few MB
+DEFAULT_CHUNK_SIZE = 2 ** 20
+
+# Largest chunk when a tolerance is set, so convergence is checked every few thousand paths
+TOLERANCE_CHUNK_SIZE = 2 ** 12
+
+# Histogram resolution and range (in standard deviations) of the quantile sketch
+SKETCH_BINS = 2 ** 16
+SKETCH_RANGE = 12.0
+
+class QuantileSketch:
+    """
+    Mergeable fixed-bin histogram for streaming quantile estimates.
+
+    Values outside [low, high) are counted in underflow/overflow bins. Two
+    sketches with the same bins merge by adding counts, so chunks simulated in
+    different processes combine into one estimate without keeping samples.
+    """
+
+    def __init__(self, low, high, bins=SKETCH_BINS, counts=None):
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.width = (high - low) / bins
+        # counts[0] is underflow, counts[-1] is overflow
+        self.counts = np.zeros(bins + 2, dtype=np.int64) if counts is None else counts
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def add(self, values):
+        """Add an array of values to the sketch"""
+        index = np.floor((values - self.low) / self.width)
+        np.clip(index, -1, self.bins, out=index)
+        self.counts += np.bincount(index.astype(np.int64) + 1, minlength=self.bins + 2)
+
+    def merge(self, other):
+        """Merge another sketch with identical bins into this one"""
+        self.counts += other.counts
+
+    def quantile(self, q):
+        """
+        Estimate quantile(s) by linear interpolation within the containing bin.
+
+        :param q: Probability or array of probabilities in [0, 1]
+        :return: Estimated quantile(s)
+        """
+        q = np.asarray(q, dtype=np.float64)
+        cumulative = np.cumsum(self.counts)
+        target = q * cumulative[-1]
+        position = np.searchsorted(cumulative, target, side='left')
+        position = np.clip(position, 1, self.bins)
+        below = cumulative[position - 1]
+        in_bin = np.maximum(self.counts[position], 1)
+        fraction = np.clip((target - below) / in_bin, 0.0, 1.0)
+        return self.low + (position - 1 + fraction) * self.width
+
+    def _centres(self, function):
+        """Bin representatives: underflow at low, bin midpoints, overflow at high"""
+        centres = np.concatenate(([self.low], self.low + (np.arange(self.bins) + 0.5) * self.width, [self.high]))
+        return centres if function is None else function(centres)
+
+    def tail_mean(self, q, function=None):
+        """
+        Estimate the mean of the lowest q fraction of values (the lower-tail expectation).
+
+        :param q: Probability in (0, 1]
+        :param function: Optional transform applied to the values before averaging (e.g. np.expm1)
+        :return: Estimated mean of function(value) over values at or below the q-quantile
+        """
+        cumulative = np.cumsum(self.counts)
+        target = q * cumulative[-1]
+        position = int(np.clip(np.searchsorted(cumulative, target, side='left'), 1, self.bins))
+        centres = self._centres(function)
+        # Whole bins below the quantile, plus the part of its bin that lies below it
+        taken = target - cumulative[position - 1]
+        fraction = min(taken / max(self.counts[position], 1), 1.0)
+        partial = self.low + (position - 1 + fraction / 2) * self.width
+        if function is not None:
+            partial = function(partial)
+        return float((self.counts[:position] @ centres[:position] + taken * partial) / target)
+
+    def moments(self, function=None):
+        """
+        Estimate the mean, standard deviation, skewness and excess kurtosis from the bins.
+
+        :param function: Optional transform applied to the values first
+        :return: Dict of mean, std, skewness, kurtosis
+        """
+        return loss_moments(self._centres(function), weights=self.counts)
+
+class MonteCarloEstimate:
+    """
+    Quantile of simulated horizon log returns with a confidence interval.
+
+    :ivar quantile: Estimated (1 - confidence) quantile of horizon log returns
+    :ivar ci_low: Lower bound of the 95% confidence interval of the quantile
+    :ivar ci_high: Upper bound of the 95% confidence interval of the quantile
+    :ivar simulations: Number of simulations used
+    :ivar tail_mean: Mean simple return (expm1 of the log return) at or below the quantile
+    :ivar tail: Simulated log returns at or below the quantile (unordered), if requested
+                and the run fitted in one chunk
+    :ivar moments: Moments of the simulated simple returns, if requested
+    """
+
+    def __init__(self, quantile, ci_low, ci_high, simulations, tail_mean, tail=None, moments=None):
+        self.quantile = quantile
+        self.ci_low = ci_low
+        self.ci_high = ci_high
+        self.simulations = simulations
+        self.tail_mean = tail_mean
+        self.tail = tail
+        self.moments = moments
+
+def _standard_normals(chunk_index, start, size, sampling, seed_sequence):
+    """Draw standard normal shocks for one chunk, reproducible from its position in the run"""
+    if sampling == 'sobol':
+        # Deferred: scipy.stats is slow to import and only needed for Sobol sampling
+        from scipy.stats import norm, qmc
+
+        # One scrambled sequence shared by all chunks; each chunk takes its own segment
+        sobol = qmc.Sobol(d=1, scramble=True, seed=np.random.default_rng(seed_sequence))
+        if start:
+            sobol.fast_forward(start)
+        uniforms = sobol.random(size)[:, 0]
+        return norm.ppf(np.clip(uniforms, 1e-16, 1 - 1e-16))
+
+    rng = np.random.default_rng(np.random.SeedSequence(
+        seed_sequence.entropy, spawn_key=seed_sequence.spawn_key + (chunk_index,)
+    ))
+    if sampling == 'antithetic':
+        half = rng.standard_normal((size + 1) // 2)
+        return np.concatenate((half, -half))[:size]
+    return rng.standard_normal(size)
+
+def _simulate_chunk(spec):
+    """
+    Simulate one chunk of horizon log returns.
+
+    :param spec: Tuple of (chunk_index, start, size, drift, volatility, sampling,
+                 seed_sequence, sketch bounds or None for raw values)
+    :return: Sketch counts, or the raw simulated values when bounds is None
+    """
+    chunk_index, start, size, drift, volatility, sampling, seed_sequence, bounds = spec
+    values = _standard_normals(chunk_index, start, size, sampling, seed_sequence)
+    values *= volatility
+    values += drift
+    if bounds is None:
+        return values
+    sketch = QuantileSketch(*bounds)
+    sketch.add(values)
+    return sketch.counts
+
+def simulate_standard_normals(simulations, seed=None, sampling='pseudo'):
+    """
+    Draw one array of standard normal shocks with the engine's sampling schemes.
+
+    :param simulations: Number of shocks
+    :param seed: Random seed or numpy SeedSequence
+    :param sampling: 'pseudo', 'antithetic' or 'sobol'
+    :return: Array of standard normal shocks
+    """
+    if sampling not in SAMPLING_METHODS:
+        raise ValueError(f"Unknown sampling method '{sampling}'. Use one of: {', '.join(SAMPLING_METHODS)}")
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return _standard_normals(0, 0, simulations, sampling, seed)
+
+@timed('var.monte_carlo.simulation')
+def simulate_standard_normal_quantiles(probabilities, simulations, chunk_size=None, workers=1,
+                                       seed=None, sampling='pseudo'):
+    """
+    Estimate quantiles of standard normal shocks with the chunked engine.
+
+    A single chunk is evaluated exactly with np.percentile; otherwise chunks
+    are reduced to mergeable quantile sketches (simulated across worker
+    processes when workers > 1) so memory stays bounded however many shocks
+    are drawn. Reproducible for a given seed regardless of the number of workers.
+
+    :param probabilities: Array of probabilities in [0, 1]
+    :param simulations: Number of shocks
+    :param chunk_size: Shocks per chunk [default: DEFAULT_CHUNK_SIZE]
+    :param workers: Worker processes simulating chunks in parallel
+    :param seed: Random seed or numpy SeedSequence
+    :param sampling: 'pseudo', 'antithetic' or 'sobol'
+    :return: Array of estimated quantiles
+    """
+    if sampling not in SAMPLING_METHODS:
+        raise ValueError(f"Unknown sampling method '{sampling}'. Use one of: {', '.join(SAMPLING_METHODS)}")
+    if workers <= 0:
+        raise ValueError("Worker count must be positive")
+    chunk_size = min(chunk_size or DEFAULT_CHUNK_SIZE, simulations)
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    starts = range(0, simulations, chunk_size)
+    count('mc.simulations', simulations)
+
+    if len(starts) == 1:
+        values = _simulate_chunk((0, 0, simulations, 0.0, 1.0, sampling, seed, None))
+        return np.percentile(values, 100 * probabilities)
+
+    bounds = (-SKETCH_RANGE, SKETCH_RANGE)
+    sketch = QuantileSketch(*bounds)
+    specs = [
+        (index, start, min(chunk_size, simulations - start), 0.0, 1.0, sampling, seed, bounds)
+        for index, start in enumerate(starts)
+    ]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_simulate_chunk, specs))
+    else:
+        chunks = map(_simulate_chunk, specs)
+    for counts in chunks:
+        sketch.merge(QuantileSketch(*bounds, counts=counts))
+    return sketch.quantile(probabilities)
+
+def _rank_bounds(p, n, z=1.959963984540054):
+    """Probabilities of the order statistics bounding a 95% CI of the p-quantile of n samples"""
+    half_width = z * np.sqrt(n * p * (1 - p)) / n
+    return [max(p - half_width, 0.0), min(p + half_width, 1.0)]
+
+@timed('var.monte_carlo.simulation')
+def simulate_lognormal_quantile(drift, volatility, confidence_level, simulations,
+                                chunk_size=None, workers=1, seed=None, sampling='pseudo',
+                                tolerance=None, details=False):
+    """
+    Estimate the lower-tail quantile and tail mean of lognormal horizon returns by simulation.
+
+    Simulates log returns drift + volatility·Z in fixed-size chunks. A single
+    chunk is evaluated exactly; otherwise each chunk is reduced to a mergeable
+    quantile sketch so memory stays bounded however many paths are run. The
+    tail mean (for Expected Shortfall) comes from the same selection pass or
+    sketch as the quantile.
+    With a tolerance, chunks are capped at TOLERANCE_CHUNK_SIZE so the
+    convergence check runs every few thousand paths.
+    Chunk i always uses the i-th generator spawned from the seed, so results
+    are reproducible for a given seed regardless of the number of workers.
+
+    :param drift: Horizon drift of log returns
+    :param volatility: Horizon volatility of log returns
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param simulations: Maximum number of simulations
+    :param chunk_size: Simulations per chunk [default: DEFAULT_CHUNK_SIZE]
+    :param workers: Worker processes simulating chunks in parallel
+    :param seed: Random seed or numpy SeedSequence
+    :param sampling: 'pseudo', 'antithetic' or 'sobol'
+    :param tolerance: Stop early once the 95% CI width of VaR, relative to VaR, is below this
+    :param details: Also return the tail sample (single-chunk runs) and the moments of the simple returns
+    :return: MonteCarloEstimate
+    """
+    if sampling not in SAMPLING_METHODS:
+        raise ValueError(f"Unknown sampling method '{sampling}'. Use one of: {', '.join(SAMPLING_METHODS)}")
+    if workers <= 0:
+        raise ValueError("Worker count must be positive")
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    if tolerance is not None:
+        chunk_size = min(chunk_size, TOLERANCE_CHUNK_SIZE)
+        if simulations <= chunk_size:
+            logger.warning(
+                f"Monte Carlo tolerance has no effect: {simulations} simulations fit in one "
+                f"chunk of {chunk_size}, so every simulation is run"
+            )
+    chunk_size = min(chunk_size, simulations)
+    if sampling == 'sobol' and chunk_size & (chunk_size - 1):
+        logger.warning("Sobol sampling is best balanced with a power-of-two chunk size")
+
+    p = 1 - confidence_level
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    starts = range(0, simulations, chunk_size)
+    sizes = [min(chunk_size, simulations - start) for start in starts]
+
+    # Small runs fit in one chunk and use the exact empirical quantile
+    if len(sizes) == 1:
+        values = _simulate_chunk((0, 0, simulations, drift, volatility, sampling, seed, None))
+        # One in-place partition around the order statistics of the quantile and its CI
+        # bounds (interpolated as np.percentile does) also leaves the tail below the quantile
+        positions = np.array([p] + _rank_bounds(p, simulations)) * (simulations - 1)
+        lower = positions.astype(np.int64)
+        upper = np.minimum(lower + 1, simulations - 1)
+        values.partition(np.unique(np.concatenate((lower, upper))))
+        quantile, low, high = values[lower] + (values[upper] - values[lower]) * (positions - lower)
+        tail = values[:lower[0] + 1]
+        count('mc.simulations', simulations)
+        return MonteCarloEstimate(
+            quantile, low, high, simulations, float(np.mean(np.expm1(tail))),
+            tail=tail.copy() if details else None,
+            moments=loss_moments(np.expm1(values)) if details else None
+        )
+
+    spread = max(volatility, 1e-12) * SKETCH_RANGE
+    bounds = (drift - spread, drift + spread)
+    sketch = QuantileSketch(*bounds)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for first in range(0, len(sizes), workers):
+            specs = [
+                (index, starts[index], sizes[index], drift, volatility, sampling, seed, bounds)
+                for index in range(first, min(first + workers, len(sizes)))
+            ]
+            chunks = executor.map(_simulate_chunk, specs) if executor else map(_simulate_chunk, specs)
+            for counts in chunks:
+                sketch.merge(QuantileSketch(*bounds, counts=counts))
+
+            n = sketch.count
+            quantile = sketch.quantile(p)
+            low, high = sketch.quantile(_rank_bounds(p, n))
+            if tolerance is not None and n < simulations:
+                var = -np.expm1(quantile)
+                if var > 0 and (np.exp(high) - np.exp(low)) / var <= tolerance:
+                    logger.info(f"Monte Carlo converged after {n} of {simulations} simulations")
+                    break
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if sketch.counts[0] > p * n / 2:
+        logger.warning("Quantile sketch underflow is significant; VaR may be understated")
+    count('mc.simulations', n)
+    return MonteCarloEstimate(
+        float(quantile), float(low), float(high), n, sketch.tail_mean(p, np.expm1),
+        moments=sketch.moments(np.expm1) if details else None
+    )
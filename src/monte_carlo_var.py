@@ -1,74 +1,158 @@
-import numpy as np
-import logging
-
-logger = logging.getLogger(__name__)
-
-def calculate_monte_carlo_var(returns, portfolio_value, confidence_level=0.95, horizon=1, simulations=10000):
-    """
-    Calculate Value at Risk using Monte Carlo simulation.
-    
-    Industry Standards:
-    - Assumes lognormal distribution of stock prices
-    - Uses geometric Brownian motion model
-    - Properly scales volatility with time
-    - Represents loss as positive value
-    - Based on Black-Scholes model assumptions
-    
-    :param returns: Array of historical log returns
-    :param portfolio_value: Current portfolio value
-    :param confidence_level: Confidence level (0.90-0.99)
-    :param horizon: Time horizon in days
-    :param simulations: Number of simulations
-    :return: Monte Carlo VaR value (always positive)
-    """
-    try:
-        # Validate inputs
-        if len(returns) < 10:
-            raise ValueError("Insufficient data for calculation (min 10 data points)")
-        if not 0.90 <= confidence_level <= 0.99:
-            raise ValueError("Confidence level must be between 0.90 and 0.99")
-        if portfolio_value <= 0:
-            raise ValueError("Portfolio value must be positive")
-        if horizon <= 0:
-            raise ValueError("Time horizon must be positive")
-        if simulations <= 1000:
-            raise ValueError("Minimum 1000 simulations required")
-        
-        # Convert daily returns to annual basis (252 trading days)
-        daily_mean = np.mean(returns)
-        daily_std = np.std(returns)
-        annual_mean = daily_mean * 252
-        annual_std = daily_std * np.sqrt(252)
-        
-        # Convert horizon to years
-        horizon_years = horizon / 252.0
-        
-        # Simulate future returns using geometric Brownian motion
-        # S_t = S_0 * exp((μ - 0.5σ²)t + σW_t)
-        drift = (annual_mean - 0.5 * annual_std**2) * horizon_years
-        volatility = annual_std * np.sqrt(horizon_years)
-        
-        # Generate random shocks
-        random_shocks = np.random.normal(0, 1, simulations)
-        
-        # Calculate future prices
-        future_prices = portfolio_value * np.exp(drift + volatility * random_shocks)
-        
-        # Calculate losses (positive values represent losses)
-        losses = portfolio_value - future_prices
-        
-        # Calculate VaR as the loss at the confidence level
-        var = np.percentile(losses, 100 * confidence_level)
-        
-        # Ensure non-negative VaR
-        var = max(0, var)
-        
-        logger.info(
-            f"Monte Carlo VaR calculated: ₹{var:,.2f} at {confidence_level*100:.1f}% confidence "
-            f"over {horizon} days (μ={annual_mean:.6f}, σ={annual_std:.6f}, sims={simulations})"
-        )
-        return var
-        
-    except Exception as e:
-        logger.error(f"Monte Carlo VaR calculation failed: {str(e)}")
-        raise RuntimeError(f"Monte Carlo VaR calculation error: {str(e)}")
+import numpy as np
+import logging
+from .return_series import as_return_series
+from .utils import validate_var_parameters
+from .mc_engine import simulate_lognormal_quantile
+from .path_simulation import simulate_paths
+from .var_result import VaRResult, sample_result
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+@timed('var.monte_carlo')
+def calculate_monte_carlo_var(returns, portfolio_value, confidence_level=0.95, horizon=1, simulations=10000,
+                              seed=None, sampling='pseudo', workers=1, chunk_size=None, tolerance=None,
+                              details=False):
+    """
+    Calculate Value at Risk using Monte Carlo simulation.
+    
+    Industry Standards:
+    - Assumes lognormal distribution of stock prices
+    - Uses geometric Brownian motion model
+    - Properly scales volatility with time
+    - Represents loss as positive value
+    - Based on Black-Scholes model assumptions
+    - Streams simulations in chunks with reproducible, optionally parallel generators
+    
+    :param returns: ReturnSeries or array of historical log returns
+    :param portfolio_value: Current portfolio value
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param horizon: Time horizon in days
+    :param simulations: Number of simulations (maximum when a tolerance is set)
+    :param seed: Random seed
+    :param sampling: 'pseudo', 'antithetic' or 'sobol' (quasi-random) shocks
+    :param workers: Worker processes simulating chunks in parallel
+    :param chunk_size: Simulations generated per chunk
+    :param tolerance: Stop early once the 95% CI width of VaR, relative to VaR, is below this
+    :param details: Also return the tail losses (single-chunk runs) and the moments of the loss distribution
+    :return: Monte Carlo VaR (always positive) as a VaRResult carrying the ES
+    """
+    try:
+        # Validate inputs (the series itself is validated once on construction)
+        returns = as_return_series(returns)
+        validate_var_parameters(portfolio_value, confidence_level, horizon)
+        if simulations <= 1000:
+            raise ValueError("Minimum 1000 simulations required")
+        
+        # Convert daily returns to annual basis (252 trading days)
+        daily_mean = returns.mean
+        daily_std = returns.std
+        annual_mean = daily_mean * 252
+        annual_std = daily_std * np.sqrt(252)
+        
+        # Convert horizon to years
+        horizon_years = horizon / 252.0
+        
+        # Simulate future returns using geometric Brownian motion
+        # S_t = S_0 * exp((μ - 0.5σ²)t + σW_t)
+        drift = (annual_mean - 0.5 * annual_std**2) * horizon_years
+        volatility = annual_std * np.sqrt(horizon_years)
+        
+        # Losses fall as the simulated log return rises, so the loss at the
+        # confidence level is the loss at the (1 - confidence) return quantile
+        estimate = simulate_lognormal_quantile(
+            drift, volatility, confidence_level, simulations,
+            chunk_size=chunk_size, workers=workers, seed=seed,
+            sampling=sampling, tolerance=tolerance, details=details
+        )
+        var = -portfolio_value * np.expm1(estimate.quantile)
+        
+        # Ensure non-negative VaR
+        var = max(0, var)
+        expected_shortfall = max(0, -portfolio_value * estimate.tail_mean)
+        
+        moments = None
+        if estimate.moments is not None:
+            # Loss is -value x simple return: flip the sign of the mean and skew
+            moments = {
+                'mean': -portfolio_value * estimate.moments['mean'],
+                'std': portfolio_value * estimate.moments['std'],
+                'skewness': -estimate.moments['skewness'],
+                'kurtosis': estimate.moments['kurtosis'],
+            }
+        
+        logger.info(
+            f"Monte Carlo VaR calculated: ₹{var:,.2f} (ES ₹{expected_shortfall:,.2f}) "
+            f"at {confidence_level*100:.1f}% confidence "
+            f"over {horizon} days (μ={annual_mean:.6f}, σ={annual_std:.6f}, sims={estimate.simulations}, "
+            f"sampling={sampling})"
+        )
+        return VaRResult(
+            var, expected_shortfall, confidence_level, horizon, 'monte_carlo',
+            tail=-portfolio_value * np.expm1(estimate.tail) if estimate.tail is not None else None,
+            moments=moments
+        )
+        
+    except Exception as e:
+        logger.error(f"Monte Carlo VaR calculation failed: {str(e)}")
+        raise RuntimeError(f"Monte Carlo VaR calculation error: {str(e)}")
+
+@timed('var.monte_carlo')
+def calculate_path_monte_carlo_var(returns, portfolio_value, confidence_level=0.95, horizon=1, simulations=10000,
+                                   innovations='normal', volatility_model='constant', degrees_of_freedom=None,
+                                   stop_loss=None, dtype=np.float64, seed=None, chunk_size=None, details=False):
+    """
+    Calculate Value at Risk by simulating daily price paths over the horizon.
+    
+    Unlike calculate_monte_carlo_var, which draws the horizon return in one
+    lognormal step, each path is stepped day by day so path-dependent effects
+    are modelled:
+    - Fat tails per step (Student-t or bootstrapped residual innovations)
+    - Volatility clustering (per-path EWMA or GARCH(1,1) variance)
+    - Stop-loss: a path is closed out once its loss reaches the stop
+    Memory stays O(simulations) however long the horizon (see simulate_paths).
+    
+    :param returns: ReturnSeries or array of historical log returns
+    :param portfolio_value: Current portfolio value
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param horizon: Time horizon in days
+    :param simulations: Number of simulated paths
+    :param innovations: 'normal', 'student_t' or 'bootstrap'
+    :param volatility_model: 'constant', 'ewma' or 'garch'
+    :param degrees_of_freedom: Student-t degrees of freedom [default: fitted from the returns]
+    :param stop_loss: Fraction of value lost at which a path is closed out [default: none]
+    :param dtype: np.float64, or np.float32 for faster, smaller simulations
+    :param seed: Random seed
+    :param chunk_size: Paths stepped together
+    :param details: Also return the tail losses and the moments of the loss distribution
+    :return: Monte Carlo VaR (always positive) as a VaRResult carrying the ES
+    """
+    try:
+        returns = as_return_series(returns)
+        validate_var_parameters(portfolio_value, confidence_level, horizon)
+        if simulations <= 1000:
+            raise ValueError("Minimum 1000 simulations required")
+        
+        paths = simulate_paths(
+            returns, horizon, simulations, innovations=innovations, volatility_model=volatility_model,
+            degrees_of_freedom=degrees_of_freedom, stop_loss=stop_loss, dtype=dtype,
+            chunk_size=chunk_size, seed=seed
+        )
+        # Losses in float64 whatever the simulation precision
+        losses = np.expm1(paths.returns, dtype=np.float64)
+        losses *= -portfolio_value
+        result = sample_result(losses, confidence_level, horizon, 'monte_carlo', details)
+        
+        logger.info(
+            f"Path Monte Carlo VaR calculated: ₹{result:,.2f} (ES ₹{result.expected_shortfall:,.2f}) "
+            f"at {confidence_level*100:.1f}% confidence over {horizon} days "
+            f"(sims={simulations}, innovations={innovations}, volatility={volatility_model}"
+            + (f", ν={paths.degrees_of_freedom:.2f}" if paths.degrees_of_freedom is not None else "")
+            + (f", stopped={paths.stopped}" if stop_loss is not None else "")
+            + ")"
+        )
+        return result
+        
+    except Exception as e:
+        logger.error(f"Path Monte Carlo VaR calculation failed: {str(e)}")
+        raise RuntimeError(f"Monte Carlo VaR calculation error: {str(e)}")
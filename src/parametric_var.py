@@ -1,56 +1,63 @@
-import numpy as np
-from scipy.stats import norm
-import logging
-
-logger = logging.getLogger(__name__)
-
-def calculate_parametric_var(returns, portfolio_value, confidence_level=0.95, horizon=1):
-    """
-    Calculate Value at Risk using parametric (variance-covariance) method.
-    
-    Industry Standards:
-    - Uses log returns for better financial modeling
-    - Properly scales volatility with square root of time
-    - Represents loss as positive value
-    - Based on normal distribution assumption
-    
-    :param returns: Array of historical log returns
-    :param portfolio_value: Current portfolio value
-    :param confidence_level: Confidence level (0.90-0.99)
-    :param horizon: Time horizon in days
-    :return: Parametric VaR value (always positive)
-    """
-    try:
-        # Validate inputs
-        if len(returns) < 10:
-            raise ValueError("Insufficient data for calculation (min 10 data points)")
-        if not 0.90 <= confidence_level <= 0.99:
-            raise ValueError("Confidence level must be between 0.90 and 0.99")
-        if portfolio_value <= 0:
-            raise ValueError("Portfolio value must be positive")
-        if horizon <= 0:
-            raise ValueError("Time horizon must be positive")
-
-        # Calculate mean and standard deviation of returns
-        mean = np.mean(returns)
-        std = np.std(returns)
-        
-        # Calculate z-score based on confidence level
-        z_score = norm.ppf(1 - confidence_level)
-        
-        # Calculate VaR using industry-standard formula
-        # Formula: VaR = Portfolio Value × |Z × σ × √T - μ × T|
-        var = portfolio_value * abs(z_score * std * np.sqrt(horizon) - mean * horizon)
-        
-        # Ensure non-negative VaR
-        var = max(0, var)
-        
-        logger.info(
-            f"Parametric VaR calculated: ₹{var:,.2f} at {confidence_level*100:.1f}% confidence "
-            f"over {horizon} days (μ={mean:.6f}, σ={std:.6f})"
-        )
-        return var
-        
-    except Exception as e:
-        logger.error(f"Parametric VaR calculation failed: {str(e)}")
-        raise RuntimeError(f"Parametric VaR calculation error: {str(e)}")
+import numpy as np
+import logging
+from .return_series import as_return_series
+from .utils import validate_var_parameters
+from .var_result import VaRResult, normal_moments, normal_scores
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+@timed('var.parametric')
+def calculate_parametric_var(returns, portfolio_value, confidence_level=0.95, horizon=1, details=False):
+    """
+    Calculate Value at Risk using parametric (variance-covariance) method.
+    
+    Industry Standards:
+    - Uses log returns for better financial modeling
+    - Properly scales volatility with square root of time
+    - Represents loss as positive value
+    - Based on normal distribution assumption
+    
+    :param returns: ReturnSeries or array of historical log returns
+    :param portfolio_value: Current portfolio value
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param horizon: Time horizon in days
+    :param details: Also return the moments of the loss distribution
+    :return: Parametric VaR (always positive) as a VaRResult carrying the closed-form ES
+    """
+    try:
+        # Validate inputs (the series itself is validated once on construction)
+        returns = as_return_series(returns)
+        validate_var_parameters(portfolio_value, confidence_level, horizon)
+
+        # Mean and standard deviation of returns (memoized on the series)
+        mean = returns.mean
+        std = returns.std
+        
+        # Calculate z-score based on confidence level, with its ES counterpart
+        z_score, es_score = normal_scores(confidence_level)
+        
+        # Calculate VaR using industry-standard formula
+        # Formula: VaR = Portfolio Value × |Z × σ × √T - μ × T|
+        scaled_std = std * np.sqrt(horizon)
+        var = portfolio_value * abs(z_score * scaled_std - mean * horizon)
+        
+        # Ensure non-negative VaR
+        var = max(0, var)
+        
+        # Closed-form ES: the mean normal tail beyond Z lies φ(Z)/(1 - confidence) deviations out
+        expected_shortfall = max(0, portfolio_value * abs(es_score * scaled_std - mean * horizon))
+        
+        logger.info(
+            f"Parametric VaR calculated: ₹{var:,.2f} (ES ₹{expected_shortfall:,.2f}) "
+            f"at {confidence_level*100:.1f}% confidence over {horizon} days (μ={mean:.6f}, σ={std:.6f})"
+        )
+        return VaRResult(
+            var, expected_shortfall, confidence_level, horizon, 'parametric',
+            moments=normal_moments(-portfolio_value * mean * horizon, portfolio_value * scaled_std)
+            if details else None
+        )
+        
+    except Exception as e:
+        logger.error(f"Parametric VaR calculation failed: {str(e)}")
+        raise RuntimeError(f"Parametric VaR calculation error: {str(e)}")
@@ -0,0 +1,233 @@
+import logging
+import numpy as np
+from .return_series import as_return_series
+from .instrumentation import timed, count
+
+logger = logging.getLogger(__name__)
+
+INNOVATIONS = ('normal', 'student_t', 'bootstrap')
+VOLATILITY_MODELS = ('constant', 'ewma', 'garch')
+
+# Paths stepped together; a chunk's state buffers stay in CPU cache
+PATH_CHUNK_SIZE = 2 ** 16
+
+# RiskMetrics decay for EWMA, and GARCH(1,1) reaction (alpha) and persistence (beta)
+# with the long-run variance targeted to the sample variance
+DEFAULT_DECAY = 0.94
+DEFAULT_GARCH = (0.08, 0.90)
+
+# Student-t degrees of freedom fitted from the residuals' excess kurtosis are capped here
+MAX_DEGREES_OF_FREEDOM = 30.0
+
+class PathSimulation:
+    """
+    Outcome of a path simulation.
+
+    :ivar returns: Horizon log return of each path (where it ended, or where it was stopped out)
+    :ivar stopped: Number of paths closed out by the stop-loss
+    :ivar degrees_of_freedom: Student-t degrees of freedom used, if any
+    """
+
+    def __init__(self, returns, stopped, degrees_of_freedom=None):
+        self.returns = returns
+        self.stopped = stopped
+        self.degrees_of_freedom = degrees_of_freedom
+
+def _variance_dynamics(values, mean, volatility_model, decay, garch):
+    """
+    Fit the variance recursion and filter the history through it.
+
+    Every model is var' = omega + persistence·var + reaction·shock², so one
+    stepping loop serves all of them (constant has no recursion).
+
+    :return: Tuple of (omega, persistence, reaction, next-day variance, standardized residuals)
+    """
+    deviations = values - mean
+    sample_variance = float(np.mean(deviations ** 2))
+    if volatility_model == 'constant':
+        scale = np.sqrt(sample_variance) if sample_variance > 0 else 1.0
+        return None, None, None, sample_variance, deviations / scale
+
+    if volatility_model == 'ewma':
+        if not 0 < decay < 1:
+            raise ValueError("Decay must be between 0 and 1")
+        omega, persistence, reaction = 0.0, decay, 1 - decay
+    else:
+        alpha, beta = garch
+        if alpha < 0 or beta < 0 or alpha + beta >= 1:
+            raise ValueError("GARCH parameters must be non-negative with alpha + beta < 1")
+        omega, persistence, reaction = (1 - alpha - beta) * sample_variance, beta, alpha
+
+    # Run the recursion through the history from the sample variance, standardizing
+    # each return by the forecast made before it was seen (filtered residuals)
+    variances = np.empty(len(values))
+    variance = sample_variance
+    for index, deviation in enumerate(deviations.tolist()):
+        variances[index] = variance
+        variance = omega + persistence * variance + reaction * deviation * deviation
+    with np.errstate(invalid='ignore', divide='ignore'):
+        residuals = np.where(variances > 0, deviations / np.sqrt(variances), 0.0)
+    return omega, persistence, reaction, variance, residuals
+
+def _fit_degrees_of_freedom(residuals):
+    """Student-t degrees of freedom matching the residuals' excess kurtosis (6 / (ν - 4))"""
+    centered = residuals - residuals.mean()
+    variance = np.mean(centered ** 2)
+    kurtosis = np.mean(centered ** 4) / variance ** 2 - 3 if variance > 0 else 0.0
+    if kurtosis <= 6 / (MAX_DEGREES_OF_FREEDOM - 4):
+        return MAX_DEGREES_OF_FREEDOM
+    return 4 + 6 / kurtosis
+
+@timed('var.monte_carlo.paths')
+def simulate_paths(returns, horizon, simulations, innovations='normal', volatility_model='constant',
+                   degrees_of_freedom=None, decay=DEFAULT_DECAY, garch=DEFAULT_GARCH, stop_loss=None,
+                   dtype=np.float64, chunk_size=None, seed=None):
+    """
+    Simulate daily log-return paths and return where each one ends.
+
+    Paths are stepped one day at a time, a chunk of paths at a time. Each
+    chunk preallocates its state (cumulative return, per-path variance, the
+    day's innovations and scratch space) once and updates it in place every
+    day, so memory is O(simulations) for the horizon returns plus O(chunk)
+    working space, whatever the horizon. Each day's log return is
+    (μ - ½σₜ²) + σₜεₜ, so constant volatility with normal innovations matches
+    the single-draw lognormal model.
+
+    - innovations: standard normal, unit-variance Student-t (fat tails per
+      step) or residuals bootstrapped from history, standardized by the
+      volatility model (filtered historical simulation for ewma/garch)
+    - volatility_model: constant, or per-path EWMA / GARCH(1,1) variance
+      driven by each path's own shocks (volatility clustering)
+    - stop_loss: a path whose cumulative loss reaches this fraction is closed
+      out at that day's close and stays flat for the rest of the horizon
+
+    Chunk i always uses the i-th generator spawned from the seed, so results
+    are reproducible for a given seed and chunk size.
+
+    :param returns: ReturnSeries or array of historical daily log returns
+    :param horizon: Days per path
+    :param simulations: Number of paths
+    :param innovations: 'normal', 'student_t' or 'bootstrap'
+    :param volatility_model: 'constant', 'ewma' or 'garch'
+    :param degrees_of_freedom: Student-t degrees of freedom (> 2) [default: fitted from the residuals' kurtosis]
+    :param decay: EWMA decay factor (0 < decay < 1)
+    :param garch: GARCH(1,1) (alpha, beta) with alpha + beta < 1
+    :param stop_loss: Fraction of value lost at which a path is closed out (0-1) [default: none]
+    :param dtype: np.float64, or np.float32 to halve memory and bandwidth
+    :param chunk_size: Paths stepped together [default: PATH_CHUNK_SIZE]
+    :param seed: Random seed or numpy SeedSequence
+    :return: PathSimulation
+    """
+    if innovations not in INNOVATIONS:
+        raise ValueError(f"Unknown innovations '{innovations}'. Use one of: {', '.join(INNOVATIONS)}")
+    if volatility_model not in VOLATILITY_MODELS:
+        raise ValueError(f"Unknown volatility model '{volatility_model}'. Use one of: {', '.join(VOLATILITY_MODELS)}")
+    if horizon <= 0:
+        raise ValueError("Time horizon must be positive")
+    if simulations <= 0:
+        raise ValueError("Simulation count must be positive")
+    if stop_loss is not None and not 0 < stop_loss < 1:
+        raise ValueError("Stop-loss must be between 0 and 1")
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError("Simulation dtype must be float32 or float64")
+
+    values = as_return_series(returns).values
+    mean = float(np.mean(values))
+    omega, persistence, reaction, variance, residuals = _variance_dynamics(
+        values, mean, volatility_model, decay, garch
+    )
+    dynamic = omega is not None
+    if innovations == 'student_t':
+        if degrees_of_freedom is None:
+            degrees_of_freedom = _fit_degrees_of_freedom(residuals)
+        elif degrees_of_freedom <= 2:
+            raise ValueError("Student-t degrees of freedom must be greater than 2")
+        # Unit variance: t = z·√((ν - 2) / χ²ᵥ) with χ²ᵥ = 2·Gamma(ν/2)
+        gamma_shape = degrees_of_freedom / 2
+        gamma_scale = 2 / (degrees_of_freedom - 2)
+    else:
+        degrees_of_freedom = None
+    residuals = residuals.astype(dtype)
+    floor = np.log1p(-stop_loss) if stop_loss is not None else None
+
+    chunk_size = min(chunk_size or PATH_CHUNK_SIZE, simulations)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    results = np.empty(simulations, dtype=dtype)
+
+    # Working buffers, allocated once and reused by every chunk and day
+    shocks = np.empty(chunk_size, dtype=dtype)
+    scratch = np.empty(chunk_size, dtype=dtype)
+    gammas = np.empty(chunk_size, dtype=dtype) if innovations == 'student_t' else None
+    uniforms = np.empty(chunk_size) if innovations == 'bootstrap' else None
+    indices = np.empty(chunk_size, dtype=np.intp) if innovations == 'bootstrap' else None
+    variances = np.empty(chunk_size, dtype=dtype) if dynamic else None
+    squares = np.empty(chunk_size, dtype=dtype) if dynamic else None
+    active = np.empty(chunk_size, dtype=bool) if stop_loss is not None else None
+    volatility = np.sqrt(variance)
+    drift = mean - 0.5 * variance
+
+    stopped = 0
+    for chunk_index, start in enumerate(range(0, simulations, chunk_size)):
+        size = min(chunk_size, simulations - start)
+        rng = np.random.default_rng(np.random.SeedSequence(
+            seed.entropy, spawn_key=seed.spawn_key + (chunk_index,)
+        ))
+        cumulative = results[start:start + size]
+        cumulative.fill(0)
+        epsilon, temp = shocks[:size], scratch[:size]
+        if dynamic:
+            variances[:size] = variance
+
+        for _ in range(horizon):
+            # Standardized innovations εₜ
+            if innovations == 'normal':
+                rng.standard_normal(dtype=dtype, out=epsilon)
+            elif innovations == 'student_t':
+                rng.standard_normal(dtype=dtype, out=epsilon)
+                draws = gammas[:size]
+                rng.standard_gamma(gamma_shape, dtype=dtype, out=draws)
+                draws *= gamma_scale
+                np.sqrt(draws, out=draws)
+                epsilon /= draws
+            else:
+                # mode='clip' guards the rare u·n rounding up to n
+                rng.random(out=uniforms[:size])
+                uniforms[:size] *= len(residuals)
+                np.copyto(indices[:size], uniforms[:size], casting='unsafe')
+                np.take(residuals, indices[:size], out=epsilon, mode='clip')
+
+            # Day's log return (μ - ½σₜ²) + σₜεₜ, and next day's variance from the shock σₜεₜ
+            if dynamic:
+                path_variance = variances[:size]
+                np.sqrt(path_variance, out=temp)
+                epsilon *= temp
+                np.multiply(path_variance, -0.5, out=temp)
+                temp += mean
+                path_variance *= persistence
+                path_variance += omega
+                np.square(epsilon, out=squares[:size])
+                squares[:size] *= reaction
+                path_variance += squares[:size]
+                epsilon += temp
+            else:
+                epsilon *= volatility
+                epsilon += drift
+
+            if stop_loss is not None:
+                # Stopped paths are at or below the floor and, once flat, stay there
+                np.greater(cumulative, floor, out=active[:size])
+                epsilon *= active[:size]
+            cumulative += epsilon
+
+        if stop_loss is not None:
+            stopped += int(np.count_nonzero(cumulative <= floor))
+
+    count('mc.path_steps', simulations * horizon)
+    logger.info(
+        f"Simulated {simulations} paths over {horizon} days "
+        f"({innovations} innovations, {volatility_model} volatility, {dtype.name})"
+        + (f", {stopped} stopped out" if stop_loss is not None else "")
+    )
+    return PathSimulation(results, stopped, degrees_of_freedom)
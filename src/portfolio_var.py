@@ -0,0 +1,220 @@
+import numpy as np
+import logging
+from .horizon import aggregate_horizon_returns
+from .instrumentation import timed
+from .var_result import VaRResult, normal_moments, normal_scores, sample_result
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on simulated asset returns held in memory at once (float64 values)
+MC_CHUNK_ELEMENTS = 2 ** 24
+
+def _validate_portfolio_inputs(returns, holdings, confidence_level, horizon):
+    """
+    Validate and convert portfolio VaR inputs.
+
+    :param returns: Returns matrix (dates x assets), DataFrame or array
+    :param holdings: Position values in INR, one per asset
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param horizon: Time horizon in days
+    :return: Tuple of (returns array, holdings array)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    holdings = np.asarray(holdings, dtype=np.float64)
+
+    if returns.ndim != 2:
+        raise ValueError("Returns must be a 2-D matrix (dates x assets)")
+    if len(returns) < 10:
+        raise ValueError("Insufficient data for calculation (min 10 data points)")
+    if holdings.shape != (returns.shape[1],):
+        raise ValueError("Holdings must have one value per returns column")
+    if not np.all(np.isfinite(returns)):
+        raise ValueError("Returns matrix contains missing or non-finite values")
+    if not np.all(np.isfinite(holdings)) or not np.any(holdings):
+        raise ValueError("Holdings must be finite with at least one non-zero position")
+    if not 0.90 <= confidence_level <= 0.99:
+        raise ValueError("Confidence level must be between 0.90 and 0.99")
+    if horizon <= 0:
+        raise ValueError("Time horizon must be positive")
+    return returns, holdings
+
+def covariance_matrix(returns):
+    """
+    Covariance matrix of asset returns (population estimate, like np.std).
+
+    :param returns: Returns matrix (dates x assets)
+    :return: Tuple of (mean vector, covariance matrix)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    mean = returns.mean(axis=0)
+    centered = returns - mean
+    cov = centered.T @ centered / len(returns)
+    return mean, cov
+
+def covariance_factor(cov):
+    """
+    Factorise a covariance matrix as F·Fᵀ for correlated sampling.
+
+    Uses Cholesky when the matrix is positive definite. Large universes with
+    fewer dates than assets give a singular matrix, so this falls back to an
+    eigen decomposition that keeps only the positive eigenvalues; the factor
+    then has as many columns as the matrix rank, which also makes sampling cheaper.
+
+    :param cov: Covariance matrix (assets x assets)
+    :return: Factor matrix F (assets x k)
+    """
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        keep = eigenvalues > eigenvalues.max() * 1e-12
+        logger.info(f"Covariance matrix is singular; using eigen factor of rank {keep.sum()}")
+        return eigenvectors[:, keep] * np.sqrt(eigenvalues[keep])
+
+@timed('var.portfolio_parametric')
+def calculate_portfolio_parametric_var(returns, holdings, confidence_level=0.95, horizon=1, details=False):
+    """
+    Calculate portfolio Value at Risk using the variance-covariance method.
+
+    The portfolio standard deviation comes from a single covariance matrix,
+    sqrt(holdings·Σ·holdings), so diversification across positions is captured.
+
+    :param returns: Returns matrix of daily log returns (dates x assets)
+    :param holdings: Position values in INR, one per asset
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param horizon: Time horizon in days
+    :param details: Also return the moments of the loss distribution
+    :return: Parametric portfolio VaR (always positive) as a VaRResult carrying the closed-form ES
+    """
+    try:
+        returns, holdings = _validate_portfolio_inputs(returns, holdings, confidence_level, horizon)
+
+        mean, cov = covariance_matrix(returns)
+        portfolio_mean = holdings @ mean
+        portfolio_std = np.sqrt(max(holdings @ cov @ holdings, 0.0))
+
+        # Formula: VaR = |Z × σp × √T - μp × T| with σp, μp already in INR
+        z_score, es_score = normal_scores(confidence_level)
+        var = abs(z_score * portfolio_std * np.sqrt(horizon) - portfolio_mean * horizon)
+        var = max(0, var)
+        # Closed-form normal ES: Z replaced by -φ(Z)/(1 - confidence)
+        expected_shortfall = max(0, abs(es_score * portfolio_std * np.sqrt(horizon) - portfolio_mean * horizon))
+
+        logger.info(
+            f"Portfolio parametric VaR calculated: ₹{var:,.2f} (ES ₹{expected_shortfall:,.2f}) "
+            f"at {confidence_level*100:.1f}% confidence "
+            f"over {horizon} days ({len(holdings)} assets, σp=₹{portfolio_std:,.2f})"
+        )
+        return VaRResult(
+            var, expected_shortfall, confidence_level, horizon, 'parametric',
+            moments=normal_moments(-portfolio_mean * horizon, portfolio_std * np.sqrt(horizon)) if details else None
+        )
+
+    except Exception as e:
+        logger.error(f"Portfolio parametric VaR calculation failed: {str(e)}")
+        raise RuntimeError(f"Portfolio parametric VaR calculation error: {str(e)}")
+
+def portfolio_scenario_pnl(returns, holdings, horizon=1, method='overlapping', samples=10000, seed=None):
+    """
+    Revalue the portfolio under every historical scenario.
+
+    :param returns: Returns matrix of daily log returns (dates x assets)
+    :param holdings: Position values in INR, one per asset
+    :param horizon: Time horizon in days
+    :param method: Multi-day aggregation, 'bootstrap' or 'overlapping'
+    :param samples: Number of bootstrap samples
+    :param seed: Random seed for the bootstrap
+    :return: Array of scenario P&L in INR
+    """
+    if horizon > 1:
+        returns = aggregate_horizon_returns(returns, horizon, method=method, samples=samples, seed=seed)
+    # One matrix-vector product revalues every position in every scenario
+    return np.expm1(returns) @ holdings
+
+@timed('var.portfolio_historical')
+def calculate_portfolio_historical_var(returns, holdings, confidence_level=0.95, horizon=1,
+                                       method='bootstrap', samples=10000, seed=None, details=False):
+    """
+    Calculate portfolio Value at Risk using historical simulation.
+
+    Each historical date (or horizon window) is a joint scenario for all assets,
+    so correlations are taken directly from the data.
+
+    :param returns: Returns matrix of daily log returns (dates x assets)
+    :param holdings: Position values in INR, one per asset
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param horizon: Time horizon in days
+    :param method: Multi-day aggregation, 'bootstrap' or 'overlapping'
+    :param samples: Number of bootstrap samples
+    :param seed: Random seed for the bootstrap
+    :param details: Also return the tail losses and the moments of the loss distribution
+    :return: Historical portfolio VaR (always positive) as a VaRResult carrying the ES
+    """
+    try:
+        returns, holdings = _validate_portfolio_inputs(returns, holdings, confidence_level, horizon)
+
+        losses = -portfolio_scenario_pnl(returns, holdings, horizon, method, samples, seed)
+        var = sample_result(losses, confidence_level, horizon, 'historical', details)
+
+        logger.info(
+            f"Portfolio historical VaR calculated: ₹{var:,.2f} (ES ₹{var.expected_shortfall:,.2f}) "
+            f"at {confidence_level*100:.1f}% confidence "
+            f"over {horizon} days ({len(holdings)} assets, {len(losses)} scenarios)"
+        )
+        return var
+
+    except Exception as e:
+        logger.error(f"Portfolio historical VaR calculation failed: {str(e)}")
+        raise RuntimeError(f"Portfolio historical VaR calculation error: {str(e)}")
+
+@timed('var.portfolio_monte_carlo')
+def calculate_portfolio_monte_carlo_var(returns, holdings, confidence_level=0.95, horizon=1,
+                                        simulations=10000, seed=None, details=False):
+    """
+    Calculate portfolio Value at Risk using correlated Monte Carlo simulation.
+
+    Each asset follows geometric Brownian motion; shocks are correlated through
+    a factor of the covariance matrix. Simulations are generated in chunks so
+    memory stays bounded for large universes.
+
+    :param returns: Returns matrix of daily log returns (dates x assets)
+    :param holdings: Position values in INR, one per asset
+    :param confidence_level: Confidence level (0.90-0.99)
+    :param horizon: Time horizon in days
+    :param simulations: Number of simulations
+    :param seed: Random seed
+    :param details: Also return the tail losses and the moments of the loss distribution
+    :return: Monte Carlo portfolio VaR (always positive) as a VaRResult carrying the ES
+    """
+    try:
+        returns, holdings = _validate_portfolio_inputs(returns, holdings, confidence_level, horizon)
+        if simulations <= 1000:
+            raise ValueError("Minimum 1000 simulations required")
+
+        mean, cov = covariance_matrix(returns)
+        factor = covariance_factor(cov * horizon)
+        # Lognormal drift per asset: (μ - 0.5σ²)T
+        drift = (mean - 0.5 * np.diag(cov)) * horizon
+
+        rng = np.random.default_rng(seed)
+        chunk = max(1, MC_CHUNK_ELEMENTS // len(holdings))
+        losses = np.empty(simulations)
+        for start in range(0, simulations, chunk):
+            stop = min(start + chunk, simulations)
+            shocks = rng.standard_normal((stop - start, factor.shape[1]))
+            log_returns = shocks @ factor.T
+            log_returns += drift
+            losses[start:stop] = -(np.expm1(log_returns) @ holdings)
+
+        var = sample_result(losses, confidence_level, horizon, 'monte_carlo', details)
+
+        logger.info(
+            f"Portfolio Monte Carlo VaR calculated: ₹{var:,.2f} (ES ₹{var.expected_shortfall:,.2f}) "
+            f"at {confidence_level*100:.1f}% confidence "
+            f"over {horizon} days ({len(holdings)} assets, factor rank={factor.shape[1]}, sims={simulations})"
+        )
+        return var
+
+    except Exception as e:
+        logger.error(f"Portfolio Monte Carlo VaR calculation failed: {str(e)}")
+        raise RuntimeError(f"Portfolio Monte Carlo VaR calculation error: {str(e)}")
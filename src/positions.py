@@ -0,0 +1,43 @@
+import os
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+POSITION_COLUMNS = ['ticker', 'exchange', 'portfolio_value']
+
+def load_positions(path):
+    """
+    Load positions from a CSV or JSON file.
+
+    The file has one row per position with columns ticker, exchange and
+    portfolio_value; any extra columns are preserved.
+    JSON files hold a list of position records.
+
+    :param path: Path to a .csv or .json positions file
+    :return: DataFrame of positions
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        positions = pd.read_csv(path)
+    elif ext == '.json':
+        positions = pd.read_json(path, orient='records')
+    else:
+        raise ValueError("Positions file must be .csv or .json")
+
+    missing = [col for col in POSITION_COLUMNS if col not in positions.columns]
+    if missing:
+        raise ValueError(f"Positions file is missing columns: {', '.join(missing)}")
+    if positions.empty:
+        raise ValueError("Positions file contains no positions")
+
+    positions['ticker'] = positions['ticker'].astype(str).str.strip().str.upper()
+    positions['exchange'] = positions['exchange'].astype(str).str.strip().str.upper()
+    positions['portfolio_value'] = positions['portfolio_value'].astype(float)
+
+    invalid = positions[~positions['exchange'].isin(['NSE', 'BSE'])]
+    if not invalid.empty:
+        raise ValueError(f"Invalid exchange for: {', '.join(invalid['ticker'])}. Use 'NSE' or 'BSE'")
+
+    logger.info(f"Loaded {len(positions)} positions from {path}")
+    return positions
@@ -0,0 +1,164 @@
+import os
+import math
+import time
+import threading
+import numpy as np
+import pandas as pd
+import logging
+from .exceptions import DataFetchError
+from .instrumentation import stage, count
+
+logger = logging.getLogger(__name__)
+
+# Calendar days requested per trading day on a full download: about 250 trading
+# days a year plus exchange holidays, with a margin for short windows
+CALENDAR_DAYS_PER_TRADING_DAY = 1.5
+CALENDAR_DAYS_MARGIN = 10
+
+class PriceCache:
+    """
+    On-disk store of daily closing prices with incremental refresh.
+
+    Each symbol is kept in its own .npz file (dates as datetime64[D], closes as
+    float64) together with the largest window downloaded and when the symbol
+    was last refreshed, so fresh symbols are served without touching the
+    network. Keeping this metadata per symbol (rather than in a shared index)
+    means processes sharing the directory, such as a scheduled run and the
+    VaR service, never overwrite each other's entries.
+
+    The downloader is any callable downloader(symbol, period=None, start=None)
+    returning a Series of closing prices indexed by date, which lets tests
+    substitute a local stand-in for Yahoo Finance.
+    """
+
+    def __init__(self, directory, downloader, max_age=3600):
+        """
+        :param directory: Directory holding the cache files
+        :param downloader: Callable fetching closing prices for a symbol
+        :param max_age: Seconds before a cached symbol is refreshed
+        """
+        self.directory = directory
+        self.downloader = downloader
+        self.max_age = max_age
+
+    def _path(self, symbol):
+        return os.path.join(self.directory, f"{symbol}.npz")
+
+    def _write_atomic(self, path, write):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _save(self, symbol, prices, entry):
+        os.makedirs(self.directory, exist_ok=True)
+
+        def write_prices(path):
+            with open(path, 'wb') as f:
+                np.savez(
+                    f,
+                    dates=prices.index.values.astype('datetime64[D]'),
+                    close=prices.values.astype(np.float64),
+                    window=np.int64(entry['window']),
+                    checked=np.float64(entry['checked'])
+                )
+
+        self._write_atomic(self._path(symbol), write_prices)
+
+    def _read(self, symbol):
+        """
+        Read a symbol's cached prices and metadata.
+
+        :return: Tuple of (Series of closing prices, dict of window and checked time, or None
+                 for files written without metadata), or (None, None) if not cached
+        """
+        try:
+            with np.load(self._path(symbol)) as data:
+                dates = pd.DatetimeIndex(data['dates'].astype('datetime64[ns]'))
+                prices = pd.Series(data['close'], index=dates, name=symbol)
+                entry = None
+                if 'window' in data.files:
+                    entry = {'window': int(data['window']), 'checked': float(data['checked'])}
+                return prices, entry
+        except FileNotFoundError:
+            return None, None
+
+    def load(self, symbol):
+        """
+        Read all cached closing prices for a symbol.
+
+        :param symbol: Yahoo Finance symbol
+        :return: Series of closing prices indexed by date, or None if not cached
+        """
+        return self._read(symbol)[0]
+
+    def get(self, symbol, window, offline=False):
+        """
+        Closing prices for the most recent 'window' trading days.
+
+        Missing symbols (or windows longer than previously downloaded) are
+        fetched in full, over enough calendar days to cover the window's
+        trading days; stale symbols only fetch the tail from the latest
+        cached date onwards, which also replaces a partial intraday close.
+
+        :param symbol: Yahoo Finance symbol
+        :param window: Historical data window size (days)
+        :param offline: Serve purely from cache without network access
+        :return: Series of closing prices indexed by date
+        """
+        cached, entry = self._read(symbol)
+
+        if offline:
+            if cached is None or cached.empty:
+                raise DataFetchError(f"No cached data for {symbol} (offline mode)")
+            logger.info(f"Serving {symbol} from cache (offline mode)")
+            count('price_cache.hits')
+            return cached.iloc[-window:]
+
+        now = time.time()
+        if entry is None or window > entry['window']:
+            logger.info(f"Downloading {window} days of data for {symbol}")
+            count('price_cache.downloads')
+            with stage('fetch.download'):
+                prices = self.downloader(symbol, period=f"{calendar_days(window)}d")
+            if cached is not None:
+                prices = _merge(cached, prices)
+            entry = {'window': window}
+        elif now - entry['checked'] > self.max_age:
+            entry = dict(entry)
+            latest = cached.index[-1]
+            logger.info(f"Refreshing {symbol} from {latest.date()}")
+            count('price_cache.refreshes')
+            with stage('fetch.download'):
+                fresh = self.downloader(symbol, start=latest)
+            prices = _merge(cached, fresh)
+        else:
+            logger.info(f"Serving {symbol} from cache")
+            count('price_cache.hits')
+            return cached.iloc[-window:]
+
+        if prices.empty:
+            raise DataFetchError(f"No data found for {symbol}")
+        entry['checked'] = now
+        self._save(symbol, prices, entry)
+        return prices.iloc[-window:]
+
+def calendar_days(window):
+    """
+    Calendar days spanning a number of trading days.
+
+    :param window: Trading days
+    :return: Calendar days to request so the download covers the window
+    """
+    return math.ceil(window * CALENDAR_DAYS_PER_TRADING_DAY) + CALENDAR_DAYS_MARGIN
+
+def _merge(cached, fresh):
+    """Merge freshly downloaded prices into cached ones, preferring fresh values"""
+    if fresh.empty:
+        return cached
+    merged = pd.concat([cached[~cached.index.isin(fresh.index)], fresh]).sort_index()
+    merged.name = cached.name
+    return merged
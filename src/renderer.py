@@ -0,0 +1,307 @@
+import os
+import io
+import html
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from .instrumentation import timed, count
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ('png', 'pdf', 'html', 'none')
+
+# Fields of a report record: one position and its three VaR values
+REPORT_FIELDS = ('ticker', 'exchange', 'portfolio_value', 'parametric_var', 'historical_var', 'monte_carlo_var')
+
+METHOD_LABELS = ['Parametric', 'Historical', 'Monte Carlo']
+METHOD_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c']
+
+class ComparisonRenderer:
+    """
+    Draws VaR comparison charts on a single reusable figure.
+
+    Uses the Agg canvas and the object-oriented Figure API directly, so no
+    pyplot global state or GUI backend is involved. The figure and axes are
+    created once and cleared between charts, which avoids rebuilding them
+    for every position.
+    """
+
+    def __init__(self, dpi=None):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.dpi = dpi or settings.REPORT_DPI
+        self.figure = Figure(figsize=(10, 6), dpi=self.dpi)
+        FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        # Fixed margins instead of tight_layout, which re-measures text on every draw
+        self.figure.subplots_adjust(left=0.1, right=0.97, top=0.9, bottom=0.1)
+
+        # Build every artist once; draw() only updates their data and text
+        axes = self.axes
+        self.bars = axes.bar(METHOD_LABELS, [0.0] * len(METHOD_LABELS), color=METHOD_COLORS)
+        # An explicit title position skips matplotlib's per-draw title placement
+        self.title = axes.set_title('', fontsize=14, y=1.01)
+        axes.set_xlabel('Methodology', fontsize=12)
+        axes.set_ylabel('Value at Risk (₹)', fontsize=12)
+        axes.grid(axis='y', linestyle='--', alpha=0.7)
+        axes.set_axisbelow(True)
+        self.labels = [
+            axes.annotate('',
+                          xy=(bar.get_x() + bar.get_width() / 2, 0.0),
+                          xytext=(0, 3),
+                          textcoords="offset points",
+                          ha='center', va='bottom')
+            for bar in self.bars
+        ]
+
+    def draw(self, record):
+        """
+        Draw the comparison chart for one position.
+
+        :param record: Dict with the REPORT_FIELDS keys
+        """
+        values = [record['parametric_var'], record['historical_var'], record['monte_carlo_var']]
+        self.title.set_text(
+            f"VaR Comparison for {record['ticker']} ({record['exchange']}) "
+            f"(Portfolio Value: ₹{record['portfolio_value']:,.2f})"
+        )
+
+        # Update bar heights and their value labels
+        for bar, label, height in zip(self.bars, self.labels, values):
+            bar.set_height(height)
+            label.set_text(f'₹{height:,.2f}')
+            label.xy = (label.xy[0], height)
+
+        # Headroom above the tallest bar for its label
+        self.axes.set_ylim(0, max(max(values), 1e-9) * 1.1)
+
+    def save(self, target, fmt='png'):
+        """
+        Save the current chart.
+
+        :param target: File path, binary buffer or matplotlib PdfPages
+        :param fmt: Image format when target is a path or buffer
+        """
+        if hasattr(target, 'savefig'):
+            target.savefig(self.figure)
+        elif fmt == 'png':
+            # Fast zlib level: PNG encoding otherwise dominates render time
+            self.figure.savefig(target, format=fmt, dpi=self.dpi, pil_kwargs={'compress_level': 1})
+        else:
+            self.figure.savefig(target, format=fmt, dpi=self.dpi)
+
+    def to_svg(self):
+        """Return the current chart as an inline SVG element"""
+        import matplotlib
+
+        buffer = io.StringIO()
+        # Keep text as <text> elements rather than glyph paths; much smaller output
+        with matplotlib.rc_context({'svg.fonttype': 'none'}):
+            self.figure.savefig(buffer, format='svg')
+        document = buffer.getvalue()
+        # Drop the XML prolog and doctype so the SVG can be embedded in HTML
+        return document[document.index('<svg'):]
+
+# One renderer per process and dpi, reused across calls and pool tasks
+_renderers = {}
+
+def get_renderer(dpi=None):
+    """
+    Return this process's shared renderer for a dpi.
+
+    :param dpi: Image resolution [default: settings.REPORT_DPI]
+    :return: ComparisonRenderer
+    """
+    dpi = dpi or settings.REPORT_DPI
+    if dpi not in _renderers:
+        _renderers[dpi] = ComparisonRenderer(dpi)
+    return _renderers[dpi]
+
+def _render_png(task):
+    """Render one record to a PNG file (pool worker entry point)"""
+    record, filepath, dpi = task
+    renderer = get_renderer(dpi)
+    renderer.draw(record)
+    renderer.save(filepath, 'png')
+    return filepath
+
+def _render_svg(task):
+    """Render one record to an SVG string (pool worker entry point)"""
+    record, dpi = task
+    renderer = get_renderer(dpi)
+    renderer.draw(record)
+    return renderer.to_svg()
+
+def _run_tasks(function, tasks, workers):
+    """Map render tasks in-process or across a process pool"""
+    if workers <= 1 or len(tasks) <= 1:
+        return list(map(function, tasks))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        return list(executor.map(function, tasks, chunksize=chunksize))
+
+def report_path(record, fmt, index=None):
+    """
+    Default report path for a single position.
+
+    :param record: Dict with the REPORT_FIELDS keys
+    :param fmt: Report format
+    :param index: Position of the record in a multi-record run, added to the filename so
+                  rows sharing a ticker and exchange do not overwrite each other
+    :return: File path
+    """
+    suffix = f"_{index + 1:04d}" if index is not None else ""
+    filename = (
+        f"var_report_{settings.CURRENT_USER}_{record['exchange']}_{record['ticker']}_"
+        f"{settings.TIMESTAMP}{suffix}.{'json' if fmt == 'none' else fmt}"
+    )
+    return os.path.join(settings.ensure_dir(settings.REPORTS_DIR), filename)
+
+def render_png(records, filepaths=None, dpi=None, workers=1):
+    """
+    Render one PNG chart per position.
+
+    :param records: List of dicts with the REPORT_FIELDS keys
+    :param filepaths: Output paths, one per record [default: timestamped files in data/reports,
+                      numbered by record when there are several]
+    :param dpi: Image resolution [default: settings.REPORT_DPI]
+    :param workers: Worker processes rendering charts in parallel
+    :return: List of saved file paths
+    """
+    if not filepaths:
+        filepaths = [
+            report_path(record, 'png', index if len(records) > 1 else None)
+            for index, record in enumerate(records)
+        ]
+    return _run_tasks(_render_png, [(record, path, dpi) for record, path in zip(records, filepaths)], workers)
+
+def render_pdf(records, filepath, dpi=None):
+    """
+    Render every position as one page of a single PDF.
+
+    Pages are written sequentially through one reused figure, since a PDF has
+    a single writer.
+
+    :param records: List of dicts with the REPORT_FIELDS keys
+    :param filepath: Output path
+    :param dpi: Resolution of rasterized elements [default: settings.REPORT_DPI]
+    :return: Saved file path
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    renderer = get_renderer(dpi)
+    with PdfPages(filepath) as pdf:
+        for record in records:
+            renderer.draw(record)
+            renderer.save(pdf)
+    return filepath
+
+def render_html(records, filepath, title='Value at Risk Report', dpi=None, workers=1):
+    """
+    Render every position into a single self-contained HTML dashboard of inline SVG charts.
+
+    :param records: List of dicts with the REPORT_FIELDS keys
+    :param filepath: Output path
+    :param title: Dashboard title
+    :param dpi: Figure resolution [default: settings.REPORT_DPI]
+    :param workers: Worker processes rendering charts in parallel
+    :return: Saved file path
+    """
+    charts = _run_tasks(_render_svg, [(record, dpi) for record in records], workers)
+    rows = "\n".join(
+        f"<tr><td>{html.escape(str(record['ticker']))}</td><td>{html.escape(str(record['exchange']))}</td>"
+        f"<td>₹{record['portfolio_value']:,.2f}</td><td>₹{record['parametric_var']:,.2f}</td>"
+        f"<td>₹{record['historical_var']:,.2f}</td><td>₹{record['monte_carlo_var']:,.2f}</td></tr>"
+        for record in records
+    )
+    document = f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 2em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 10px; text-align: right; }}
+.chart svg {{ width: 100%; max-width: 800px; height: auto; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p>Generated by {html.escape(settings.CURRENT_USER)} at {settings.TIMESTAMP}</p>
+<table>
+<tr><th>Ticker</th><th>Exchange</th><th>Portfolio Value</th><th>Parametric VaR</th><th>Historical VaR</th><th>Monte Carlo VaR</th></tr>
+{rows}
+</table>
+{"".join(f'<div class="chart">{chart}</div>' for chart in charts)}
+</body>
+</html>
+"""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(document)
+    return filepath
+
+def save_report_data(records, filepath):
+    """
+    Write machine-readable results only (no images) as JSON, or CSV for a .csv path.
+
+    :param records: List of dicts with the REPORT_FIELDS keys
+    :param filepath: Output path
+    :return: Saved file path
+    """
+    if os.path.splitext(filepath)[1].lower() == '.csv':
+        import csv
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump([{field: record[field] for field in REPORT_FIELDS} for record in records], f, indent=2)
+    return filepath
+
+@timed('report')
+def render_report(records, fmt='png', filepath=None, dpi=None, workers=1):
+    """
+    Render VaR comparison reports for one or more positions.
+
+    :param records: List of dicts with the REPORT_FIELDS keys
+    :param fmt: 'png' (one file per position), 'pdf' (multi-page), 'html'
+                (single dashboard) or 'none' (JSON/CSV results, no images)
+    :param filepath: Output path for pdf, html and none, or for png with a single record
+                     [default: timestamped file in data/reports]
+    :param dpi: Image resolution [default: settings.REPORT_DPI]
+    :param workers: Worker processes rendering charts in parallel (png and html)
+    :return: List of saved file paths
+    """
+    try:
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format '{fmt}'. Use one of: {', '.join(REPORT_FORMATS)}")
+        if not records:
+            raise ValueError("No results to report")
+        if filepath is None and len(records) > 1 and fmt != 'png':
+            filepath = os.path.join(
+                settings.ensure_dir(settings.REPORTS_DIR),
+                f"var_report_{settings.CURRENT_USER}_{settings.TIMESTAMP}.{'json' if fmt == 'none' else fmt}"
+            )
+        filepath = filepath or report_path(records[0], fmt)
+        count('report.positions', len(records))
+
+        if fmt == 'png':
+            paths = render_png(records, [filepath] if len(records) == 1 else None, dpi, workers)
+        elif fmt == 'pdf':
+            paths = [render_pdf(records, filepath, dpi)]
+        elif fmt == 'html':
+            paths = [render_html(records, filepath, dpi=dpi, workers=workers)]
+        else:
+            paths = [save_report_data(records, filepath)]
+
+        logger.info(f"Report for {len(records)} positions saved as {fmt}: {paths[0]}" +
+                    (f" (+{len(paths) - 1} more)" if len(paths) > 1 else ""))
+        return paths
+
+    except Exception as e:
+        logger.error(f"Error rendering report: {str(e)}")
+        raise
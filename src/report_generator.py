@@ -1,88 +1,111 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import os
-import logging
-from config import settings
-
-logger = logging.getLogger(__name__)
-
-def save_portfolio_data(ticker, exchange, portfolio_value):
-    """
-    Save portfolio data to CSV file including exchange information.
-    
-    :param ticker: Stock ticker
-    :param exchange: Stock exchange
-    :param portfolio_value: Portfolio value
-    :return: File path of saved data
-    """
-    try:
-        data = {
-            'ticker': [ticker],
-            'exchange': [exchange],
-            'portfolio_value': [portfolio_value],
-            'user': [settings.CURRENT_USER],
-            'timestamp': [settings.TIMESTAMP]
-        }
-        df = pd.DataFrame(data)
-        
-        # Include exchange in filename
-        filename = f"portfolio_{settings.CURRENT_USER}_{exchange}_{ticker}_{settings.TIMESTAMP}.csv"
-        filepath = os.path.join(settings.PORTFOLIOS_DIR, filename)
-        df.to_csv(filepath, index=False)
-        
-        logger.info(f"Portfolio data saved to {filepath}")
-        return filepath
-        
-    except Exception as e:
-        logger.error(f"Error saving portfolio data: {str(e)}")
-        raise
-
-def generate_comparison_plot(parametric_var, historical_var, monte_carlo_var, 
-                             portfolio_value, ticker, exchange):
-    """
-    Generate comparison plot of VaR methodologies including exchange info.
-    
-    :param parametric_var: Parametric VaR value
-    :param historical_var: Historical VaR value
-    :param monte_carlo_var: Monte Carlo VaR value
-    :param portfolio_value: Portfolio value
-    :param ticker: Stock ticker
-    :param exchange: Stock exchange
-    :return: File path of saved plot
-    """
-    try:
-        methods = ['Parametric', 'Historical', 'Monte Carlo']
-        values = [parametric_var, historical_var, monte_carlo_var]
-        
-        plt.figure(figsize=(10, 6))
-        bars = plt.bar(methods, values, color=['#1f77b4', '#ff7f0e', '#2ca02c'])
-        
-        # Include exchange in title
-        plt.title(f'VaR Comparison for {ticker} ({exchange}) (Portfolio Value: ₹{portfolio_value:,.2f})', 
-                 fontsize=14)
-        plt.xlabel('Methodology', fontsize=12)
-        plt.ylabel('Value at Risk (₹)', fontsize=12)
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # Add value labels on bars
-        for bar in bars:
-            height = bar.get_height()
-            plt.annotate(f'₹{height:,.2f}',
-                         xy=(bar.get_x() + bar.get_width() / 2, height),
-                         xytext=(0, 3),
-                         textcoords="offset points",
-                         ha='center', va='bottom')
-        
-        # Include exchange in filename
-        filename = f"var_report_{settings.CURRENT_USER}_{exchange}_{ticker}_{settings.TIMESTAMP}.png"
-        filepath = os.path.join(settings.REPORTS_DIR, filename)
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=300)
-        plt.close()
-        
-        logger.info(f"Comparison plot saved to {filepath}")
-        return filepath
-        
-    except Exception as e:
-        logger.error(f"Error generating plot: {str(e)}")
-        raise
+import os
+import logging
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+def save_batch_results(results, filepath=None):
+    """
+    Save consolidated batch VaR results to a single CSV or JSON file.
+
+    :param results: DataFrame of positions with VaR result columns
+    :param filepath: Output path (.csv or .json); defaults to a timestamped CSV in the reports directory
+    :return: File path of saved results
+    """
+    try:
+        if filepath is None:
+            filename = f"batch_results_{settings.CURRENT_USER}_{settings.TIMESTAMP}.csv"
+            filepath = os.path.join(settings.ensure_dir(settings.REPORTS_DIR), filename)
+
+        if os.path.splitext(filepath)[1].lower() == '.json':
+            results.to_json(filepath, orient='records', indent=2)
+        else:
+            results.to_csv(filepath, index=False)
+
+        logger.info(f"Batch results for {len(results)} positions saved to {filepath}")
+        return filepath
+
+    except Exception as e:
+        logger.error(f"Error saving batch results: {str(e)}")
+        raise
+
+def save_var_surface(surface, ticker, exchange, filepath=None):
+    """
+    Save a VaR surface table to a CSV or JSON file.
+
+    :param surface: DataFrame with columns method, horizon, confidence_level, value_at_risk
+    :param ticker: Stock ticker
+    :param exchange: Stock exchange
+    :param filepath: Output path (.csv or .json); defaults to a timestamped CSV in the reports directory
+    :return: File path of saved surface
+    """
+    try:
+        if filepath is None:
+            filename = f"var_surface_{settings.CURRENT_USER}_{exchange}_{ticker}_{settings.TIMESTAMP}.csv"
+            filepath = os.path.join(settings.ensure_dir(settings.REPORTS_DIR), filename)
+
+        if os.path.splitext(filepath)[1].lower() == '.json':
+            surface.to_json(filepath, orient='records', indent=2)
+        else:
+            surface.to_csv(filepath, index=False)
+
+        logger.info(f"VaR surface saved to {filepath}")
+        return filepath
+
+    except Exception as e:
+        logger.error(f"Error saving VaR surface: {str(e)}")
+        raise
+
+def save_backtest_results(result, filepath=None):
+    """
+    Save a VaR backtest: the exception series, with the test statistics alongside
+    it in a file with the same name suffixed by '_statistics'.
+
+    :param result: BacktestResult with exceptions and statistics DataFrames
+    :param filepath: Exceptions output path (.csv or .json); defaults to a timestamped CSV in the reports directory
+    :return: Tuple of (exceptions file path, statistics file path)
+    """
+    try:
+        if filepath is None:
+            filename = f"backtest_{settings.CURRENT_USER}_{settings.TIMESTAMP}.csv"
+            filepath = os.path.join(settings.ensure_dir(settings.REPORTS_DIR), filename)
+        stem, extension = os.path.splitext(filepath)
+        statistics_path = f"{stem}_statistics{extension}"
+
+        for frame, path in ((result.exceptions, filepath), (result.statistics, statistics_path)):
+            if extension.lower() == '.json':
+                frame.to_json(path, orient='records', indent=2, date_format='iso')
+            else:
+                frame.to_csv(path, index=False)
+
+        logger.info(f"VaR backtest saved to {filepath} and {statistics_path}")
+        return filepath, statistics_path
+
+    except Exception as e:
+        logger.error(f"Error saving VaR backtest: {str(e)}")
+        raise
+
+def save_stress_results(result, filepath=None):
+    """
+    Save the worst-loss rankings of a stress test to a CSV or JSON file.
+
+    :param result: StressResult with a rankings DataFrame
+    :param filepath: Output path (.csv or .json); defaults to a timestamped CSV in the reports directory
+    :return: File path of saved rankings
+    """
+    try:
+        if filepath is None:
+            filename = f"stress_test_{settings.CURRENT_USER}_{settings.TIMESTAMP}.csv"
+            filepath = os.path.join(settings.ensure_dir(settings.REPORTS_DIR), filename)
+
+        if os.path.splitext(filepath)[1].lower() == '.json':
+            result.rankings.to_json(filepath, orient='records', indent=2)
+        else:
+            result.rankings.to_csv(filepath, index=False)
+
+        logger.info(f"Stress test rankings saved to {filepath}")
+        return filepath
+
+    except Exception as e:
+        logger.error(f"Error saving stress test: {str(e)}")
+        raise
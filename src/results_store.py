@@ -0,0 +1,181 @@
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from .instrumentation import stage, count
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Columns of one stored VaR run (besides the auto-increment id)
+RESULT_FIELDS = (
+    'run_at', 'user', 'command', 'ticker', 'exchange', 'portfolio_value',
+    'confidence_level', 'horizon', 'window', 'simulations', 'historical_method',
+    'bootstrap_samples', 'sampling', 'seed',
+    'parametric_var', 'historical_var', 'monte_carlo_var',
+    'parametric_es', 'historical_es', 'monte_carlo_es',
+)
+
+# Columns added after the original schema, with their types; databases created
+# before them gain the columns (NULL for earlier runs) when opened
+_MIGRATIONS = (
+    ('parametric_es', 'REAL'),
+    ('historical_es', 'REAL'),
+    ('monte_carlo_es', 'REAL'),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS var_results (
+    id INTEGER PRIMARY KEY,
+    run_at TEXT NOT NULL,
+    user TEXT NOT NULL,
+    command TEXT,
+    ticker TEXT NOT NULL,
+    exchange TEXT NOT NULL,
+    portfolio_value REAL NOT NULL,
+    confidence_level REAL,
+    horizon INTEGER,
+    window INTEGER,
+    simulations INTEGER,
+    historical_method TEXT,
+    bootstrap_samples INTEGER,
+    sampling TEXT,
+    seed INTEGER,
+    parametric_var REAL,
+    historical_var REAL,
+    monte_carlo_var REAL,
+    parametric_es REAL,
+    historical_es REAL,
+    monte_carlo_es REAL
+);
+CREATE INDEX IF NOT EXISTS idx_var_results_symbol ON var_results (ticker, exchange, run_at);
+CREATE INDEX IF NOT EXISTS idx_var_results_run_at ON var_results (run_at);
+CREATE INDEX IF NOT EXISTS idx_var_results_user ON var_results (user, run_at);
+"""
+
+class ResultsStore:
+    """
+    Append-only SQLite store of VaR runs.
+
+    The database runs in WAL mode so scheduled runs can append while others
+    query. Appended records are buffered and written in one transaction per
+    batch; history queries use the (ticker, exchange, run_at), run_at and
+    (user, run_at) indexes rather than scanning.
+    """
+
+    def __init__(self, path=None, batch_size=500):
+        """
+        :param path: Database file [default: settings.RESULTS_DB]
+        :param batch_size: Buffered records that trigger a write
+        """
+        if path is None:
+            settings.ensure_dir(settings.DATA_DIR)
+            path = settings.RESULTS_DB
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        # Wait on a locked database rather than fail when runs overlap
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add any columns missing from a database created by an older schema"""
+        existing = {row[1] for row in self._connection.execute("PRAGMA table_info(var_results)")}
+        missing = [(column, kind) for column, kind in _MIGRATIONS if column not in existing]
+        if not missing:
+            return
+        with self._connection:
+            for column, kind in missing:
+                self._connection.execute(f"ALTER TABLE var_results ADD COLUMN {column} {kind}")
+        logger.info(f"Added columns to {self.path}: {', '.join(column for column, _ in missing)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, record):
+        """
+        Buffer one run for writing.
+
+        :param record: Dict with RESULT_FIELDS keys; run_at and user default to now
+                       and the current user, other missing fields are stored as NULL
+        """
+        row = dict.fromkeys(RESULT_FIELDS)
+        row.update(record)
+        row['run_at'] = row['run_at'] or datetime.now().isoformat(timespec='seconds')
+        row['user'] = row['user'] or settings.CURRENT_USER
+        self._pending.append(tuple(row[field] for field in RESULT_FIELDS))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def extend(self, records):
+        """Buffer many runs for writing"""
+        for record in records:
+            self.append(record)
+
+    def flush(self):
+        """Write all buffered runs in a single transaction"""
+        if not self._pending:
+            return
+        with stage('results_store.flush'), self._connection:
+            self._connection.executemany(
+                f"INSERT INTO var_results ({', '.join(RESULT_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(RESULT_FIELDS))})",
+                self._pending
+            )
+        count('results_store.rows', len(self._pending))
+        logger.info(f"Recorded {len(self._pending)} VaR results in {self.path}")
+        self._pending = []
+
+    def close(self):
+        """Flush buffered runs and close the database"""
+        try:
+            self.flush()
+        finally:
+            self._connection.close()
+
+    def history(self, ticker=None, exchange=None, start=None, end=None, user=None, limit=None):
+        """
+        Query stored runs, oldest first.
+
+        :param ticker: Stock ticker
+        :param exchange: Stock exchange
+        :param start: First date (date, datetime or 'YYYY-MM-DD'), inclusive
+        :param end: Last date (date, datetime or 'YYYY-MM-DD'), inclusive
+        :param user: User who ran the calculation
+        :param limit: Return only the most recent runs
+        :return: DataFrame with one row per run and the RESULT_FIELDS columns
+        """
+        import pandas as pd
+
+        self.flush()
+        conditions = []
+        parameters = []
+        for column, value in (('ticker', ticker), ('exchange', exchange), ('user', user)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if start is not None:
+            conditions.append("run_at >= ?")
+            parameters.append(str(start)[:10])
+        if end is not None:
+            # Inclusive of the whole end day
+            conditions.append("run_at < ?")
+            parameters.append((datetime.fromisoformat(str(end)[:10]) + timedelta(days=1)).date().isoformat())
+
+        query = f"SELECT {', '.join(RESULT_FIELDS)} FROM var_results"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY run_at DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(int(limit))
+
+        rows = self._connection.execute(query, parameters).fetchall()
+        history = pd.DataFrame(rows[::-1], columns=list(RESULT_FIELDS))
+        history['run_at'] = pd.to_datetime(history['run_at'])
+        return history
@@ -0,0 +1,154 @@
+import numpy as np
+from .horizon import prefix_sum
+
+MIN_OBSERVATIONS = 10
+
+class ReturnSeries:
+    """
+    Immutable series of daily log returns with memoized statistics.
+
+    The returns are validated once on construction and held in a read-only
+    float64 buffer. Mean, standard deviation, a sorted copy, a prefix sum and
+    the running sum of sorted simple returns (for Expected Shortfall) are
+    computed on first use and cached, so every VaR method run on the same
+    series shares them instead of recomputing.
+    """
+
+    __slots__ = ('_values', '_dates', '_mean', '_std', '_sorted', '_prefix', '_tail_sums', '_source')
+
+    def __init__(self, values, dates=None, copy=True):
+        """
+        :param values: Daily log returns
+        :param dates: Optional dates of the returns (same length)
+        :param copy: Copy the input; pass False to wrap an existing float64
+                     buffer (e.g. a memory-mapped slice) without copying
+        """
+        values = np.array(values, dtype=np.float64) if copy else np.asarray(values, dtype=np.float64)
+        if values.ndim != 1:
+            raise ValueError("Returns must be a 1-D array")
+        if len(values) < MIN_OBSERVATIONS:
+            raise ValueError(f"Insufficient data for calculation (min {MIN_OBSERVATIONS} data points)")
+        if not np.all(np.isfinite(values)):
+            raise ValueError("Returns contain missing or non-finite values")
+        if dates is not None and len(dates) != len(values):
+            raise ValueError("Dates must have one entry per return")
+        if not copy:
+            # A read-only view leaves the caller's array untouched
+            values = values.view()
+        values.flags.writeable = False
+
+        object.__setattr__(self, '_values', values)
+        object.__setattr__(self, '_dates', dates)
+        # _source: optional (callable, args) that rebuilds the series when unpickled,
+        # set for views of shared data such as a ReturnsStore mapping
+        for name in ('_mean', '_std', '_sorted', '_prefix', '_tail_sums', '_source'):
+            object.__setattr__(self, name, None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ReturnSeries is immutable")
+
+    def _cache(self, name, value):
+        object.__setattr__(self, name, value)
+        return value
+
+    def __reduce__(self):
+        if self._source is not None:
+            # Workers reopen the shared data instead of receiving a copy
+            return self._source
+        # Rebuild through __init__ so pickled copies (e.g. for worker processes) stay read-only
+        return (ReturnSeries, (np.array(self._values), self._dates))
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __array__(self, dtype=None, copy=None):
+        if copy:
+            return np.array(self._values, dtype=dtype)
+        return self._values if dtype is None else self._values.astype(dtype, copy=False)
+
+    def __repr__(self):
+        return f"ReturnSeries(n={len(self)}, mean={self.mean:.6f}, std={self.std:.6f})"
+
+    @property
+    def values(self):
+        """Read-only float64 array of returns"""
+        return self._values
+
+    @property
+    def dates(self):
+        """Dates of the returns, if known"""
+        return self._dates
+
+    @property
+    def mean(self):
+        """Mean daily return"""
+        if self._mean is None:
+            return self._cache('_mean', float(np.mean(self._values)))
+        return self._mean
+
+    @property
+    def std(self):
+        """Standard deviation of daily returns (population, ddof=0)"""
+        if self._std is None:
+            return self._cache('_std', float(np.std(self._values)))
+        return self._std
+
+    @property
+    def sorted(self):
+        """Read-only ascending copy of the returns"""
+        if self._sorted is None:
+            ordered = np.sort(self._values)
+            ordered.flags.writeable = False
+            return self._cache('_sorted', ordered)
+        return self._sorted
+
+    @property
+    def prefix_sum(self):
+        """Read-only prefix sum with a leading zero (see horizon.prefix_sum)"""
+        if self._prefix is None:
+            prefix = prefix_sum(self._values)
+            prefix.flags.writeable = False
+            return self._cache('_prefix', prefix)
+        return self._prefix
+
+    def quantile(self, q):
+        """
+        Empirical quantile(s) from the cached sorted copy (linear interpolation,
+        matching np.percentile), without re-sorting.
+
+        :param q: Probability or array of probabilities in [0, 1]
+        :return: Quantile(s) of the returns
+        """
+        ordered = self.sorted
+        position = np.asarray(q, dtype=np.float64) * (len(ordered) - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, len(ordered) - 1)
+        fraction = position - lower
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+
+    def tail_mean(self, q):
+        """
+        Mean simple return (expm1 of the log return) of the returns at or below
+        the q-quantile, in O(1) from a cached running sum over the sorted copy.
+
+        :param q: Probability in [0, 1]
+        :return: Lower-tail mean simple return
+        """
+        if self._tail_sums is None:
+            self._cache('_tail_sums', np.cumsum(np.expm1(self.sorted)))
+        count = int(q * (len(self) - 1)) + 1
+        return float(self._tail_sums[count - 1]) / count
+
+def as_return_series(returns):
+    """
+    Wrap returns in a ReturnSeries unless they already are one.
+
+    :param returns: ReturnSeries or array of daily log returns
+    :return: ReturnSeries
+    """
+    if isinstance(returns, ReturnSeries):
+        return returns
+    return ReturnSeries(returns)
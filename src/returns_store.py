@@ -0,0 +1,266 @@
+import os
+import json
+import logging
+import numpy as np
+from .return_series import ReturnSeries
+from .returns_transform import transform_prices
+from .instrumentation import timed
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+RETURNS_FILE = 'returns.npy'
+DATES_FILE = 'dates.npy'
+INDEX_FILE = 'index.json'
+STORE_VERSION = 1
+
+# Symbols transformed together while building; bounds the working matrix to a block of columns
+STORE_BLOCK_SIZE = 256
+
+def _to_day(date):
+    """Convert a date, datetime, Timestamp or 'YYYY-MM-DD' string to datetime64[D]"""
+    return np.datetime64(str(date)[:10], 'D')
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _store_dates(price_histories, calendar):
+    """
+    Dates of the store's rows: the union of every symbol's dates, or for the
+    'common' calendar only the dates on which every exchange traded.
+    """
+    days = {
+        symbol: np.asarray(prices.index.values).astype('datetime64[D]')
+        for symbol, prices in price_histories.items()
+    }
+    dates = np.unique(np.concatenate(list(days.values())))
+    if isinstance(calendar, str):
+        if calendar == 'common':
+            # Exchange from the Yahoo suffix (.NS, .BO), as transform_prices does
+            exchanges = {}
+            for symbol, symbol_days in days.items():
+                exchanges.setdefault(symbol.rpartition('.')[2] if '.' in symbol else '', []).append(symbol_days)
+            for exchange_days in exchanges.values():
+                dates = np.intersect1d(dates, np.concatenate(exchange_days))
+        return dates
+    return np.intersect1d(dates, np.asarray(calendar).astype('datetime64[D]'))
+
+@timed('returns_store.build')
+def build_returns_store(directory, price_histories, block_size=STORE_BLOCK_SIZE):
+    """
+    Write a returns store from closing price histories.
+
+    The store is a date x symbol float64 matrix of daily log returns saved
+    column-major (each symbol's history is contiguous on disk), a dates
+    array and a JSON index of symbols. Returns come from transform_prices
+    with the configured calendar, gap and outlier policies; every return it
+    masks (days a symbol did not trade, days before its first close, and
+    returns dropped by the policies) is stored as NaN, never as a zero move.
+    Symbols are transformed a block at a time, so the full matrix is never
+    held in memory; each block is aligned on the full store calendar, so gaps
+    are judged the same whichever symbols share a block.
+
+    :param directory: Store directory (created if missing; an existing store is replaced)
+    :param price_histories: Dict of symbol -> closing price Series indexed by date
+    :param block_size: Symbols transformed together
+    :return: ReturnsStore opened on the new files
+    """
+    if not price_histories:
+        raise ValueError("No price data to store")
+    os.makedirs(directory, exist_ok=True)
+    symbols = list(price_histories)
+
+    # The first date has no return
+    dates = _store_dates(price_histories, settings.RETURNS_CALENDAR)
+    if len(dates) < 2:
+        raise ValueError("Need at least two dates to compute returns")
+
+    returns_path = os.path.join(directory, RETURNS_FILE)
+    tmp_path = f"{returns_path}.{os.getpid()}.tmp"
+    first_valid = [len(dates) - 1] * len(symbols)
+    missing = [0] * len(symbols)
+    try:
+        matrix = np.lib.format.open_memmap(
+            tmp_path, mode='w+', dtype=np.float64, shape=(len(dates) - 1, len(symbols)), fortran_order=True
+        )
+        matrix[:] = np.nan
+        for first in range(0, len(symbols), block_size):
+            block = {symbol: price_histories[symbol] for symbol in symbols[first:first + block_size]}
+            transformed = transform_prices(block, calendar=dates)
+            rows = np.searchsorted(dates[1:], transformed.dates.astype('datetime64[D]'))
+            for offset, column in enumerate(range(first, first + len(block))):
+                valid = transformed.valid[:, offset]
+                matrix[rows[valid], column] = transformed.values[valid, offset]
+                stored = np.flatnonzero(valid)
+                if len(stored):
+                    first_valid[column] = int(rows[stored[0]])
+                    missing[column] = len(dates) - 1 - first_valid[column] - len(stored)
+        matrix.flush()
+        del matrix
+        os.replace(tmp_path, returns_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    def write_dates(path):
+        with open(path, 'wb') as f:
+            np.save(f, dates[1:])
+
+    def write_index(path):
+        with open(path, 'w') as f:
+            json.dump({'version': STORE_VERSION, 'symbols': symbols, 'first_valid': first_valid,
+                       'missing': missing}, f)
+
+    _write_atomic(os.path.join(directory, DATES_FILE), write_dates)
+    # The index is written last; readers check it against the matrix shape
+    _write_atomic(os.path.join(directory, INDEX_FILE), write_index)
+    logger.info(f"Stored {len(dates) - 1} days of returns for {len(symbols)} symbols in {directory}")
+    return ReturnsStore(directory)
+
+class ReturnsStore:
+    """
+    Read-only, memory-mapped date x symbol matrix of daily log returns.
+
+    Nothing is read into memory on opening: the matrix and dates are mapped
+    with np.memmap and window slices are views onto the mapping, so a
+    calculation touches only the pages of the windows it uses. Series taken
+    from the store pickle as a reference (directory, symbol, window) rather
+    than their data, so pool workers reopen the mapping and share the
+    operating system's page cache instead of each holding a copy.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: Store directory written by build_returns_store
+        """
+        self.directory = directory
+        try:
+            with open(os.path.join(directory, INDEX_FILE)) as f:
+                index = json.load(f)
+            self.returns = np.load(os.path.join(directory, RETURNS_FILE), mmap_mode='r')
+            self.dates = np.load(os.path.join(directory, DATES_FILE), mmap_mode='r')
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No returns store in {directory}")
+        if index.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported returns store version {index.get('version')}")
+        self.symbols = index['symbols']
+        self._first_valid = index['first_valid']
+        # Missing (NaN) days after each symbol's first return; stores written before
+        # missing days were kept as NaN have none
+        self._missing = index.get('missing') or [0] * len(self.symbols)
+        if self.returns.shape != (len(self.dates), len(self.symbols)):
+            raise ValueError("Returns store index does not match its data (store is being rewritten?)")
+        self._columns = {symbol: column for column, symbol in enumerate(self.symbols)}
+
+    def __reduce__(self):
+        return (open_returns_store, (self.directory,))
+
+    def __repr__(self):
+        return f"ReturnsStore({self.directory!r}, dates={len(self.dates)}, symbols={len(self.symbols)})"
+
+    def __contains__(self, symbol):
+        return symbol in self._columns
+
+    def _window_rows(self, window, end):
+        """Row range [start, stop) of the last 'window' returns up to 'end' (inclusive)"""
+        stop = len(self.dates) if end is None else int(np.searchsorted(self.dates, _to_day(end), 'right'))
+        start = 0 if window is None else stop - window
+        if start < 0:
+            raise ValueError(f"Only {stop} days of returns stored up to {end or 'the latest date'}")
+        return start, stop
+
+    def series(self, symbol, window=None, end=None):
+        """
+        ReturnSeries of a symbol's most recent returns.
+
+        Days the symbol has no return (NaN in the store) are skipped, so the
+        series holds its last 'window' actual returns. It is a zero-copy view
+        of the mapped data when the symbol has no missing days, and a copy of
+        its valid returns otherwise.
+
+        :param symbol: Yahoo Finance symbol
+        :param window: Number of returns [default: the whole stored history]
+        :param end: Last date (inclusive) [default: latest stored date]
+        :return: ReturnSeries
+        """
+        column = self._columns.get(symbol)
+        if column is None:
+            raise KeyError(f"{symbol} is not in the returns store")
+        first = self._first_valid[column]
+
+        if self._missing[column]:
+            stop = self._window_rows(None, end)[1]
+            rows = first + np.flatnonzero(~np.isnan(self.returns[first:stop, column]))
+            if window is not None:
+                if len(rows) < window:
+                    raise ValueError(f"Only {len(rows)} days of returns stored for {symbol}")
+                rows = rows[-window:]
+            series = ReturnSeries(self.returns[rows, column], dates=self.dates[rows], copy=False)
+        else:
+            start, stop = self._window_rows(window, end)
+            if window is None:
+                start = max(start, first)
+            elif start < first:
+                raise ValueError(f"Only {stop - first} days of returns stored for {symbol}")
+            series = ReturnSeries(self.returns[start:stop, column], dates=self.dates[start:stop], copy=False)
+
+        # Pickle as a reference to the store rather than the data
+        object.__setattr__(series, '_source', (open_store_series, (self.directory, symbol, window, end)))
+        return series
+
+    def matrix(self, symbols=None, window=None, end=None):
+        """
+        Returns of several symbols over a common window.
+
+        :param symbols: Symbols in column order [default: all, as a zero-copy view]
+        :param window: Number of returns [default: the whole stored history]
+        :param end: Last date (inclusive) [default: latest stored date]
+        :return: Read-only array (dates x symbols), NaN where a symbol has no return;
+                 a view when all symbols are requested, otherwise a copy of the selected columns
+        """
+        start, stop = self._window_rows(window, end)
+        if symbols is None:
+            columns = range(len(self.symbols))
+            values = self.returns[start:stop]
+        else:
+            missing = [symbol for symbol in symbols if symbol not in self._columns]
+            if missing:
+                raise KeyError(f"Not in the returns store: {', '.join(missing)}")
+            columns = [self._columns[symbol] for symbol in symbols]
+            values = np.take(self.returns[start:stop], columns, axis=1)
+            values.flags.writeable = False
+
+        short = [self.symbols[column] for column in columns if self._first_valid[column] > start]
+        if short:
+            raise ValueError(f"Insufficient stored history for: {', '.join(short)}")
+        return values
+
+    def close(self):
+        """Release the mappings (views already handed out keep their pages mapped)"""
+        self.returns = None
+        self.dates = None
+
+# One store per process and directory, reused across calls and pool tasks
+_stores = {}
+
+def open_returns_store(directory):
+    """
+    Return this process's shared store for a directory.
+
+    :param directory: Store directory
+    :return: ReturnsStore
+    """
+    key = os.path.realpath(directory)
+    if key not in _stores:
+        _stores[key] = ReturnsStore(directory)
+    return _stores[key]
+
+def open_store_series(directory, symbol, window=None, end=None):
+    """Zero-copy series from this process's shared store (unpickling entry point)"""
+    return open_returns_store(directory).series(symbol, window, end)
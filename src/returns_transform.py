@@ -0,0 +1,331 @@
+import os
+import logging
+import functools
+import numpy as np
+import pandas as pd
+from .return_series import ReturnSeries
+from .instrumentation import timed
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+RETURN_TYPES = ('log', 'simple')
+CALENDARS = ('union', 'common')
+GAP_POLICIES = ('ffill', 'drop')
+OUTLIER_POLICIES = ('keep', 'clip', 'mask')
+
+# Scales the median absolute deviation to a standard deviation for normal data
+MAD_SCALE = 1.4826
+
+class ReturnsMatrix:
+    """
+    Date x symbol returns with a validity mask.
+
+    Invalid entries (before a symbol's first close, on days it did not trade,
+    and returns discarded by the gap or outlier policies) hold 0.0, so the
+    values can be used directly as a zero-filled returns matrix, while the
+    mask recovers each symbol's own observed returns.
+
+    :ivar values: float64 array of returns (dates x symbols), 0.0 where invalid
+    :ivar valid: Boolean array (dates x symbols), True where the return is an observed move
+    :ivar dates: datetime64 array of the date each return ends on
+    :ivar symbols: Symbols, one per column
+    :ivar kind: 'log' or 'simple'
+    """
+
+    def __init__(self, values, valid, dates, symbols, kind='log'):
+        self.values = values
+        self.valid = valid
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.kind = kind
+        self._columns = {symbol: column for column, symbol in enumerate(self.symbols)}
+
+    def __repr__(self):
+        return f"ReturnsMatrix(dates={len(self.dates)}, symbols={len(self.symbols)}, kind={self.kind!r})"
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def counts(self):
+        """Number of valid returns per symbol"""
+        return np.count_nonzero(self.valid, axis=0)
+
+    @property
+    def coverage(self):
+        """Fraction of dates with a valid return, per symbol"""
+        return self.counts / len(self.dates) if len(self.dates) else np.zeros(len(self.symbols))
+
+    def to_frame(self):
+        """Zero-filled returns as a DataFrame (dates x symbols)"""
+        return pd.DataFrame(self.values, index=pd.DatetimeIndex(self.dates), columns=self.symbols)
+
+    def series(self, symbol):
+        """
+        One symbol's valid returns.
+
+        :param symbol: Symbol name
+        :return: ReturnSeries of the symbol's valid returns and their dates
+        """
+        column = self._columns[symbol]
+        valid = self.valid[:, column]
+        return ReturnSeries(self.values[valid, column], dates=self.dates[valid])
+
+def _price_matrix(prices, dates=None):
+    """
+    Scatter closing prices into one date x symbol matrix over the union of their dates.
+
+    :param prices: DataFrame of prices (dates x symbols), dict of symbol -> price Series,
+                   or iterable of price Series named by symbol
+    :param dates: Sorted datetime64[D] rows to use instead; prices on other dates are dropped
+    :return: Tuple of (float64 price matrix with NaN where missing, datetime64[D] dates, symbols)
+    """
+    if isinstance(prices, pd.DataFrame):
+        prices = prices.sort_index()
+        days = np.asarray(prices.index.values).astype('datetime64[D]')
+        matrix = np.array(prices.values, dtype=np.float64, order='F')
+        symbols = [str(symbol) for symbol in prices.columns]
+        if dates is None:
+            return matrix, days, symbols
+        keep = np.isin(days, dates)
+        aligned = np.full((len(dates), len(symbols)), np.nan, order='F')
+        aligned[np.searchsorted(dates, days[keep])] = matrix[keep]
+        return aligned, dates, symbols
+
+    if not isinstance(prices, dict):
+        prices = {series.name: series for series in prices}
+    symbols = [str(symbol) for symbol in prices]
+    days = [np.asarray(series.index.values).astype('datetime64[D]') for series in prices.values()]
+    if dates is None:
+        dates = np.unique(np.concatenate(days)) if days else np.empty(0, dtype='datetime64[D]')
+        keeps = [slice(None)] * len(days)
+    else:
+        keeps = [np.isin(series_days, dates) for series_days in days]
+    matrix = np.full((len(dates), len(symbols)), np.nan, order='F')
+    for column, (series, series_days, keep) in enumerate(zip(prices.values(), days, keeps)):
+        matrix[np.searchsorted(dates, series_days[keep]), column] = np.asarray(series.values)[keep]
+    return matrix, dates, symbols
+
+def _calendar_rows(observed, dates, symbols, calendar):
+    """Boolean mask of the dates kept by a 'union' or 'common' calendar"""
+    if calendar == 'union':
+        return np.ones(len(dates), dtype=bool)
+    # Exchange from the Yahoo suffix (.NS, .BO); a date is kept only if every exchange traded
+    exchanges = np.array([symbol.rpartition('.')[2] if '.' in symbol else '' for symbol in symbols])
+    keep = np.ones(len(dates), dtype=bool)
+    for exchange in np.unique(exchanges):
+        keep &= observed[:, exchanges == exchange].any(axis=1)
+    return keep
+
+def _adjust_corporate_actions(returns, valid, log_prices, dates, symbols, actions):
+    """
+    Fold splits and dividends into the log return of each ex-date, in place.
+
+    The total return over an ex-date is (P + D)·S / P₋₁, so the log return
+    gains log(S) + log(1 + D/P): the same as back-adjusting every earlier price.
+    An ex-date on which the symbol did not trade applies to its next valid return;
+    actions outside the dates of the prices are already reflected in them, or not yet.
+    """
+    columns = {symbol: column for column, symbol in enumerate(symbols)}
+    # A shared actions file lists other symbols and dates too; only actions of this
+    # matrix's symbols with an ex-date after its first price change any return
+    ex_dates = np.asarray(actions['date'].values).astype('datetime64[D]')
+    relevant = actions['symbol'].astype(str).isin(list(columns)).values & (ex_dates > dates[0]) & (ex_dates <= dates[-1])
+    actions = actions[relevant]
+    ex_rows = np.searchsorted(dates[1:], ex_dates[relevant])
+    splits = actions['split'].values if 'split' in actions else np.ones(len(actions))
+    dividends = actions['dividend'].values if 'dividend' in actions else np.zeros(len(actions))
+    applied = 0
+    for symbol, row, split, dividend in zip(actions['symbol'].astype(str), ex_rows, splits, dividends):
+        column = columns[symbol]
+        later = np.flatnonzero(valid[row:, column])
+        if not len(later):
+            continue
+        row += later[0]
+        returns[row, column] += np.log(split) + np.log1p(dividend / np.exp(log_prices[row + 1, column]))
+        applied += 1
+    if applied < len(actions):
+        logger.warning(f"{len(actions) - applied} corporate actions have no later return and were ignored")
+    elif applied:
+        logger.info(f"Applied {applied} corporate actions")
+
+def _column_medians(values, counts):
+    """Median of each column's leading counts values after a sort (NaNs sort last); NaN for empty columns"""
+    columns = np.arange(values.shape[1])
+    lower = np.maximum(counts - 1, 0) // 2
+    upper = np.maximum(counts // 2, lower)
+    medians = (values[lower, columns] + values[upper, columns]) / 2
+    medians[counts == 0] = np.nan
+    return medians
+
+def _outliers(returns, valid, threshold):
+    """
+    Valid returns more than threshold robust standard deviations (scaled MAD) from their symbol's median.
+
+    Both medians are read from sorts along the date axis over every symbol
+    at once, with invalid entries as NaN so they sort last.
+    """
+    counts = np.count_nonzero(valid, axis=0)
+    masked = np.where(valid, returns, np.nan)
+    masked.sort(axis=0)
+    median = _column_medians(masked, counts)
+    np.subtract(returns, median, out=masked)
+    np.abs(masked, out=masked)
+    masked[~valid] = np.nan
+    masked.sort(axis=0)
+    bound = threshold * MAD_SCALE * _column_medians(masked, counts)
+    # A zero MAD (mostly unchanged prices) or no valid returns flags nothing
+    bound[~(bound > 0)] = np.inf
+    with np.errstate(invalid='ignore'):
+        flagged = valid & (np.abs(returns - median) > bound)
+    return flagged, median, bound
+
+@timed('transform')
+def transform_prices(prices, kind='log', calendar=None, gap_policy=None, max_gap=None,
+                     outlier_policy=None, outlier_threshold=None, actions=None):
+    """
+    Clean closing prices for many symbols into returns in one vectorized pass.
+
+    Steps, each over the whole date x symbol matrix:
+    1. Align every symbol on one calendar: the union of their dates, the dates
+       every exchange traded ('common', so NSE and BSE holidays drop out and
+       the move folds into the next common date) or an explicit list of dates,
+       each of which is a row even if none of the given symbols traded on it
+    2. Forward-fill each symbol's last close across days it did not trade;
+       returns spanning a gap are kept ('ffill', up to max_gap missed days)
+       or discarded ('drop'). Non-positive prices count as missing
+    3. Fold splits and dividends into the ex-date returns
+    4. Clip or mask outliers beyond a threshold of robust standard deviations
+    5. Convert to simple returns if requested
+
+    :param prices: DataFrame of prices (dates x symbols), dict of symbol -> price Series,
+                   or iterable of price Series named by symbol
+    :param kind: 'log' or 'simple' returns
+    :param calendar: 'union', 'common' or an array of dates [default: settings.RETURNS_CALENDAR]
+    :param gap_policy: 'ffill' or 'drop' [default: settings.GAP_POLICY]
+    :param max_gap: Most consecutive missed days a kept return may span [default: settings.MAX_GAP_DAYS]
+    :param outlier_policy: 'keep', 'clip' or 'mask' [default: settings.OUTLIER_POLICY]
+    :param outlier_threshold: Robust standard deviations from the median [default: settings.OUTLIER_THRESHOLD]
+    :param actions: DataFrame of corporate actions with date, symbol and split (shares
+                    after per share before, e.g. 2 for 2:1) and/or dividend (cash per
+                    share) columns, for prices not already adjusted
+                    [default: settings.CORPORATE_ACTIONS_FILE, if set]
+    :return: ReturnsMatrix
+    """
+    calendar = settings.RETURNS_CALENDAR if calendar is None else calendar
+    gap_policy = gap_policy or settings.GAP_POLICY
+    max_gap = settings.MAX_GAP_DAYS if max_gap is None else max_gap
+    outlier_policy = outlier_policy or settings.OUTLIER_POLICY
+    outlier_threshold = outlier_threshold or settings.OUTLIER_THRESHOLD
+    if actions is None and settings.CORPORATE_ACTIONS_FILE:
+        actions = _configured_actions(settings.CORPORATE_ACTIONS_FILE)
+    if kind not in RETURN_TYPES:
+        raise ValueError(f"Unknown return type '{kind}'. Use one of: {', '.join(RETURN_TYPES)}")
+    if isinstance(calendar, str) and calendar not in CALENDARS:
+        raise ValueError(f"Unknown calendar '{calendar}'. Use one of: {', '.join(CALENDARS)} or a list of dates")
+    if gap_policy not in GAP_POLICIES:
+        raise ValueError(f"Unknown gap policy '{gap_policy}'. Use one of: {', '.join(GAP_POLICIES)}")
+    if outlier_policy not in OUTLIER_POLICIES:
+        raise ValueError(f"Unknown outlier policy '{outlier_policy}'. Use one of: {', '.join(OUTLIER_POLICIES)}")
+    if max_gap is not None and max_gap < 0:
+        raise ValueError("Maximum gap must be non-negative")
+    if outlier_threshold <= 0:
+        raise ValueError("Outlier threshold must be positive")
+
+    explicit = None if isinstance(calendar, str) else np.unique(np.asarray(calendar).astype('datetime64[D]'))
+    log_prices, dates, symbols = _price_matrix(prices, explicit)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.log(log_prices, out=log_prices)
+    # Missing, zero and negative prices are all unobserved
+    observed = np.isfinite(log_prices)
+
+    if explicit is None:
+        keep = _calendar_rows(observed, dates, symbols, calendar)
+        if not keep.all():
+            log_prices, observed, dates = log_prices[keep], observed[keep], dates[keep]
+    if len(dates) < 2 or not symbols:
+        raise ValueError("Need at least two dates of prices to compute returns")
+
+    # Row of each symbol's last observed price at or before each date (-1 before its first)
+    rows = np.arange(len(dates), dtype=np.int32 if len(dates) < 2 ** 31 else np.int64)[:, None]
+    last = np.where(observed, rows, -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+    filled = np.take_along_axis(log_prices, np.maximum(last, 0), axis=0)
+    returns = filled[1:] - filled[:-1]
+    del filled
+
+    # A return is valid when it ends on an observed price and has one before it
+    previous = last[:-1]
+    valid = observed[1:] & (previous >= 0)
+    spans = rows[1:] - previous
+    del last, previous
+    if gap_policy == 'drop':
+        valid &= spans == 1
+    elif max_gap is not None:
+        valid &= spans <= max_gap + 1
+    gaps = int(np.count_nonzero(valid & (spans > 1)))
+    del spans
+
+    if actions is not None and len(actions):
+        _adjust_corporate_actions(returns, valid, log_prices, dates, symbols, actions)
+
+    outliers = 0
+    if outlier_policy != 'keep':
+        flagged, median, bound = _outliers(returns, valid, outlier_threshold)
+        outliers = int(np.count_nonzero(flagged))
+        if outlier_policy == 'clip':
+            np.clip(returns, median - bound, median + bound, out=returns, where=flagged)
+        else:
+            valid &= ~flagged
+
+    returns[~valid] = 0.0
+    if kind == 'simple':
+        np.expm1(returns, out=returns)
+
+    logger.info(
+        f"Transformed prices into {len(dates) - 1} days of {kind} returns for {len(symbols)} symbols "
+        f"({np.count_nonzero(valid)} valid, {gaps} spanning gaps, {outliers} outliers {outlier_policy})"
+    )
+    return ReturnsMatrix(returns, valid, dates[1:].astype('datetime64[ns]'), symbols, kind)
+
+def load_corporate_actions(path):
+    """
+    Load corporate actions from a CSV or JSON file.
+
+    :param path: Path to a .csv or .json file (JSON holds a list of records) with date,
+                 symbol and split and/or dividend columns
+    :return: DataFrame of actions
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        actions = pd.read_csv(path)
+    elif ext == '.json':
+        actions = pd.read_json(path, orient='records')
+    else:
+        raise ValueError("Corporate action files must be .csv or .json")
+
+    actions.columns = actions.columns.astype(str).str.strip().str.lower()
+    missing = {'date', 'symbol'} - set(actions.columns)
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(sorted(missing))}")
+    if 'split' not in actions and 'dividend' not in actions:
+        raise ValueError(f"{path} has neither a split nor a dividend column")
+
+    actions['date'] = pd.to_datetime(actions['date'])
+    actions['symbol'] = actions['symbol'].astype(str).str.strip()
+    if 'split' in actions:
+        actions['split'] = pd.to_numeric(actions['split']).fillna(1.0)
+        if (actions['split'] <= 0).any():
+            raise ValueError("Split ratios must be positive")
+    if 'dividend' in actions:
+        actions['dividend'] = pd.to_numeric(actions['dividend']).fillna(0.0)
+        if (actions['dividend'] < 0).any():
+            raise ValueError("Dividends cannot be negative")
+    return actions
+
+@functools.lru_cache(maxsize=None)
+def _configured_actions(path):
+    """Corporate actions of the configured file, loaded once per process"""
+    return load_corporate_actions(path)
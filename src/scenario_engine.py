@@ -0,0 +1,263 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from .data_fetcher import yahoo_symbol
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the losses (float64 values) held in memory per block
+STRESS_CHUNK_ELEMENTS = 2 ** 24
+
+# Named market stress periods; each becomes one scenario of the cumulative
+# move from the close on the first date to the close on the last
+HISTORICAL_PERIODS = {
+    'lehman_2008': ('2008-09-12', '2008-10-27'),
+    'taper_tantrum_2013': ('2013-05-22', '2013-08-28'),
+    'demonetisation_2016': ('2016-11-08', '2016-12-26'),
+    'covid_2020': ('2020-02-19', '2020-03-23'),
+}
+
+class ScenarioSet:
+    """
+    Named stress scenarios as a matrix of simple-return shocks (scenarios x symbols).
+
+    Shocks are simple returns (-0.2 is a 20% fall), so revaluing holdings
+    against every scenario is one matrix product. Symbols a scenario does not
+    mention are unshocked.
+    """
+
+    def __init__(self, shocks, names, symbols):
+        """
+        :param shocks: Array of simple-return shocks (scenarios x symbols)
+        :param names: Scenario names, one per row
+        :param symbols: Symbols, one per column
+        """
+        shocks = np.ascontiguousarray(shocks, dtype=np.float64)
+        if shocks.ndim != 2 or shocks.shape != (len(names), len(symbols)):
+            raise ValueError("Shocks must be a scenarios x symbols matrix matching names and symbols")
+        if not np.all(np.isfinite(shocks)):
+            raise ValueError("Shocks contain missing or non-finite values")
+        if np.any(shocks < -1):
+            raise ValueError("Shocks cannot lose more than 100%")
+        self.shocks = shocks
+        self.names = list(names)
+        self.symbols = list(symbols)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"ScenarioSet(scenarios={len(self.names)}, symbols={len(self.symbols)})"
+
+    @classmethod
+    def from_frame(cls, shocks):
+        """
+        :param shocks: DataFrame of simple-return shocks (scenario names x symbols); missing values are unshocked
+        :return: ScenarioSet
+        """
+        return cls(shocks.fillna(0.0).values, shocks.index.astype(str), shocks.columns.astype(str))
+
+    def to_frame(self):
+        return pd.DataFrame(self.shocks, index=self.names, columns=self.symbols)
+
+    def concat(self, *others):
+        """
+        Combine scenario sets over the union of their symbols.
+
+        :param others: ScenarioSets
+        :return: ScenarioSet with every scenario of self followed by those of others
+        """
+        return ScenarioSet.from_frame(pd.concat([self.to_frame()] + [other.to_frame() for other in others]))
+
+def historical_day_scenarios(returns):
+    """
+    One scenario per historical day.
+
+    :param returns: DataFrame of daily log returns (dates x symbols)
+    :return: ScenarioSet named by date
+    """
+    shocks = np.expm1(returns.fillna(0.0).values)
+    return ScenarioSet(shocks, [str(date)[:10] for date in returns.index], returns.columns.astype(str))
+
+def historical_period_scenarios(returns, periods=None):
+    """
+    One scenario per stress period: each symbol's cumulative move over the period.
+
+    Periods outside the available history are skipped.
+
+    :param returns: DataFrame of daily log returns (dates x symbols)
+    :param periods: Dict of name -> (first date, last date) [default: HISTORICAL_PERIODS]
+    :return: ScenarioSet named by period
+    """
+    periods = HISTORICAL_PERIODS if periods is None else periods
+    names = []
+    shocks = []
+    for name, (start, end) in periods.items():
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if len(returns) == 0 or returns.index[0] > start or returns.index[-1] < end:
+            logger.warning(f"Skipping stress period {name}: not covered by the available history")
+            continue
+        window = returns[(returns.index > start) & (returns.index <= end)]
+        names.append(name)
+        shocks.append(np.expm1(window.fillna(0.0).values.sum(axis=0)))
+    return ScenarioSet(np.array(shocks).reshape(len(names), returns.shape[1]), names, returns.columns.astype(str))
+
+def factor_scenarios(betas, factor_shocks):
+    """
+    Scenarios defined as factor moves, mapped to symbols through their factor betas.
+
+    :param betas: DataFrame of factor betas (symbols x factors)
+    :param factor_shocks: DataFrame of simple-return factor shocks (scenario names x factors);
+                          factors a scenario omits do not move
+    :return: ScenarioSet
+    """
+    unknown = set(factor_shocks.columns) - set(betas.columns)
+    if unknown:
+        raise ValueError(f"No betas for factors: {', '.join(sorted(map(str, unknown)))}")
+    factor_shocks = factor_shocks.reindex(columns=betas.columns).fillna(0.0)
+    # Floor at -100%: a leveraged beta cannot lose more than the position
+    shocks = np.maximum(factor_shocks.values @ betas.fillna(0.0).values.T, -1.0)
+    return ScenarioSet(shocks, factor_shocks.index.astype(str), betas.index.astype(str))
+
+def load_shock_table(path, index_column):
+    """
+    Load a table of shocks or betas from a CSV or JSON file.
+
+    :param path: Path to a .csv or .json file (JSON holds a list of records)
+    :param index_column: Column naming each row (e.g. 'scenario' or 'symbol');
+                         every other column is numeric
+    :return: DataFrame indexed by index_column
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        table = pd.read_csv(path)
+    elif ext == '.json':
+        table = pd.read_json(path, orient='records')
+    else:
+        raise ValueError("Shock files must be .csv or .json")
+
+    if index_column not in table.columns:
+        raise ValueError(f"{path} is missing the '{index_column}' column")
+    table = table.set_index(table[index_column].astype(str).str.strip()).drop(columns=index_column)
+    table.index.name = index_column
+    table.columns = table.columns.astype(str).str.strip()
+    if table.empty or table.shape[1] == 0:
+        raise ValueError(f"{path} contains no shocks")
+    return table.apply(pd.to_numeric, errors='raise')
+
+def holdings_matrix(positions):
+    """
+    Pivot positions into a portfolios x Yahoo symbols matrix of position values.
+
+    :param positions: DataFrame of positions (ticker, exchange, portfolio_value) with an
+                      optional portfolio column naming the portfolio each belongs to;
+                      without it every position is in one portfolio
+    :return: DataFrame (portfolios x symbols), zero where a portfolio does not hold a symbol
+    """
+    symbols = [yahoo_symbol(ticker, exchange) for ticker, exchange in zip(positions['ticker'], positions['exchange'])]
+    portfolios = positions['portfolio'].astype(str) if 'portfolio' in positions else 'portfolio'
+    return (
+        positions.assign(symbol=symbols, portfolio=portfolios)
+        .pivot_table(index='portfolio', columns='symbol', values='portfolio_value', aggfunc='sum', fill_value=0.0)
+    )
+
+class StressResult:
+    """
+    Outcome of a stress test.
+
+    :ivar rankings: DataFrame with portfolio, rank, scenario, loss and loss_pct (of gross
+                    position value) for each portfolio's worst scenarios
+    :ivar losses: DataFrame of every loss (portfolios x scenarios), if requested
+    :ivar unshocked: Held symbols with no scenario data, revalued as unchanged
+    """
+
+    def __init__(self, rankings, losses, unshocked):
+        self.rankings = rankings
+        self.losses = losses
+        self.unshocked = unshocked
+
+@timed('stress')
+def stress_test(holdings, scenarios, top=10, chunk_elements=STRESS_CHUNK_ELEMENTS, keep_losses=False):
+    """
+    Revalue many portfolios against every scenario and rank their worst losses.
+
+    Losses are computed as blocked matrix products of holdings and shocks,
+    a block of scenarios at a time so at most chunk_elements losses are held
+    in memory. Each block is merged into a running top-k per portfolio with
+    argpartition, so the full loss matrix is never needed.
+
+    :param holdings: DataFrame of position values (portfolios x symbols)
+    :param scenarios: ScenarioSet
+    :param top: Worst scenarios ranked per portfolio
+    :param chunk_elements: Maximum losses computed per block
+    :param keep_losses: Also return the full loss matrix (portfolios x scenarios)
+    :return: StressResult
+    """
+    try:
+        if top <= 0:
+            raise ValueError("Number of ranked scenarios must be positive")
+        if len(scenarios) == 0:
+            raise ValueError("No scenarios to apply")
+        if holdings.empty:
+            raise ValueError("No holdings to stress")
+
+        shocked = set(scenarios.symbols)
+        unshocked = [symbol for symbol in holdings.columns if symbol not in shocked]
+        if unshocked:
+            logger.warning(f"No scenario data for {len(unshocked)} held symbols; revalued as unchanged")
+        values = holdings.reindex(columns=scenarios.symbols, fill_value=0.0).values.astype(np.float64)
+        gross = np.abs(holdings.values).sum(axis=1)
+
+        n_portfolios, n_scenarios = len(values), len(scenarios)
+        top = min(top, n_scenarios)
+        chunk = max(1, chunk_elements // n_portfolios)
+        worst_losses = np.empty((n_portfolios, 0))
+        worst_indices = np.empty((n_portfolios, 0), dtype=np.int64)
+        all_losses = np.empty((n_portfolios, n_scenarios)) if keep_losses else None
+
+        for start in range(0, n_scenarios, chunk):
+            stop = min(start + chunk, n_scenarios)
+            # Loss is the fall in value: -(holdings · shocks)
+            block = values @ scenarios.shocks[start:stop].T
+            np.negative(block, out=block)
+            if keep_losses:
+                all_losses[:, start:stop] = block
+
+            losses = np.concatenate([worst_losses, block], axis=1)
+            indices = np.concatenate([
+                worst_indices, np.broadcast_to(np.arange(start, stop), block.shape)
+            ], axis=1)
+            if losses.shape[1] > top:
+                keep = np.argpartition(-losses, top - 1, axis=1)[:, :top]
+                losses = np.take_along_axis(losses, keep, axis=1)
+                indices = np.take_along_axis(indices, keep, axis=1)
+            worst_losses, worst_indices = losses, indices
+
+        order = np.argsort(-worst_losses, axis=1, kind='stable')
+        worst_losses = np.take_along_axis(worst_losses, order, axis=1)
+        worst_indices = np.take_along_axis(worst_indices, order, axis=1)
+
+        names = np.asarray(scenarios.names, dtype=object)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            loss_pct = worst_losses / gross[:, None]
+        rankings = pd.DataFrame({
+            'portfolio': np.repeat(holdings.index.values, top),
+            'rank': np.tile(np.arange(1, top + 1), n_portfolios),
+            'scenario': names[worst_indices.ravel()],
+            'loss': worst_losses.ravel(),
+            'loss_pct': loss_pct.ravel(),
+        })
+        losses = (pd.DataFrame(all_losses, index=holdings.index, columns=scenarios.names)
+                  if keep_losses else None)
+
+        logger.info(
+            f"Stress test complete: {n_portfolios} portfolios x {n_scenarios} scenarios "
+            f"in blocks of {min(chunk, n_scenarios)} scenarios"
+        )
+        return StressResult(rankings, losses, unshocked)
+
+    except Exception as e:
+        logger.error(f"Stress test failed: {str(e)}")
+        raise RuntimeError(f"Stress test error: {str(e)}")
@@ -0,0 +1,346 @@
+import time
+import json
+import zlib
+import asyncio
+import logging
+import functools
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from .exceptions import DataFetchError
+from .return_series import ReturnSeries
+from .parametric_var import calculate_parametric_var
+from .historical_var import calculate_historical_var
+from .monte_carlo_var import calculate_monte_carlo_var
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_METHODS = ('parametric', 'historical', 'monte_carlo')
+
+# Seconds an idle keep-alive connection is held open
+KEEP_ALIVE_TIMEOUT = 60
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 502: 'Bad Gateway'}
+
+class TTLCache:
+    """
+    Least-recently-used cache whose entries also expire after a fixed time.
+
+    Not thread-safe; the service only touches it from the event loop thread.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used entries beyond maxsize"""
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+def synthetic_returns(ticker, exchange, window):
+    """
+    Local stand-in data source: deterministic daily log returns per symbol, no network.
+
+    :param ticker: Stock ticker
+    :param exchange: Stock exchange
+    :param window: Number of returns
+    :return: ReturnSeries
+    """
+    rng = np.random.default_rng(zlib.crc32(f"{ticker}.{exchange}".encode()))
+    return ReturnSeries(rng.normal(0.0004, 0.015, window))
+
+def _parse_var_request(params):
+    """
+    Normalize and validate the parameters of a VaR request.
+
+    :param params: Dict from the JSON body and/or query string
+    :return: Dict of typed parameters with defaults filled in
+    """
+    if not params.get('ticker'):
+        raise ValueError("ticker is required")
+    if params.get('portfolio_value') is None:
+        raise ValueError("portfolio_value is required")
+    exchange = str(params.get('exchange', 'NSE')).upper()
+    if exchange not in ('NSE', 'BSE'):
+        raise ValueError("exchange must be NSE or BSE")
+
+    methods = params.get('methods', SERVICE_METHODS)
+    if isinstance(methods, str):
+        methods = methods.split(',')
+    unknown = set(methods) - set(SERVICE_METHODS)
+    if unknown:
+        raise ValueError(f"Unknown methods: {', '.join(sorted(unknown))}")
+
+    seed = params.get('seed')
+    return {
+        'ticker': str(params['ticker']).upper(),
+        'exchange': exchange,
+        'portfolio_value': float(params['portfolio_value']),
+        'confidence_level': float(params.get('confidence', 0.95)),
+        'horizon': int(params.get('horizon', 1)),
+        'window': int(params.get('window', 252)),
+        'simulations': int(params.get('simulations', 10000)),
+        'historical_method': str(params.get('historical_method', 'bootstrap')),
+        'bootstrap_samples': int(params.get('bootstrap_samples', 10000)),
+        'sampling': str(params.get('sampling', 'pseudo')),
+        'seed': None if seed is None else int(seed),
+        # Canonical order so equivalent requests share a cache key
+        'methods': tuple(method for method in SERVICE_METHODS if method in methods),
+    }
+
+class VaRService:
+    """
+    In-memory VaR service behind a small JSON-over-HTTP API.
+
+    Return series (with their memoized mean, standard deviation and sorted
+    copy) and finished results are kept in TTL/LRU caches. Concurrent
+    identical requests share a single in-flight computation. Parametric and
+    historical VaR run on the event loop; Monte Carlo runs in a process pool
+    and data fetches run in threads, so neither blocks other requests.
+    """
+
+    def __init__(self, data_source=None, cache_size=None, cache_ttl=None, workers=1, offline=False):
+        """
+        :param data_source: Callable (ticker, exchange, window) -> ReturnSeries
+                            [default: fetch_stock_data through the price cache]
+        :param cache_size: Entries kept per cache [default: settings.SERVER_CACHE_SIZE]
+        :param cache_ttl: Seconds before cached series and results expire [default: settings.SERVER_CACHE_TTL]
+        :param workers: Monte Carlo worker processes
+        :param offline: Serve the default data source purely from the price cache
+        """
+        if data_source is None:
+            from .data_fetcher import fetch_stock_data
+            data_source = functools.partial(fetch_stock_data, offline=offline)
+        if workers <= 0:
+            raise ValueError("Worker count must be positive")
+        cache_size = cache_size or settings.SERVER_CACHE_SIZE
+        cache_ttl = cache_ttl or settings.SERVER_CACHE_TTL
+
+        self.data_source = data_source
+        self.returns_cache = TTLCache(cache_size, cache_ttl)
+        self.results_cache = TTLCache(cache_size, cache_ttl)
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self._inflight = {}
+        self.stats = dict.fromkeys(('requests', 'cache_hits', 'coalesced', 'computations', 'fetches'), 0)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def _coalesce(self, key, compute):
+        """Run compute() once for all concurrent callers with the same key"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+        # Shielded so one caller disconnecting does not cancel the shared work
+        return await asyncio.shield(future)
+
+    async def get_returns(self, ticker, exchange, window):
+        """
+        Return series for a symbol, from memory or fetched once in a thread.
+
+        :return: ReturnSeries
+        """
+        key = (ticker, exchange, window)
+        returns = self.returns_cache.get(key)
+        if returns is not None:
+            return returns
+
+        async def fetch():
+            self.stats['fetches'] += 1
+            loop = asyncio.get_running_loop()
+            returns = await loop.run_in_executor(None, self.data_source, ticker, exchange, window)
+            self.returns_cache.put(key, returns)
+            return returns
+
+        return await self._coalesce(('returns',) + key, fetch)
+
+    async def calculate(self, params):
+        """
+        Calculate VaR for one request.
+
+        :param params: Request parameters (see _parse_var_request)
+        :return: Dict of request parameters, requested VaR values and a cached flag
+        """
+        self.stats['requests'] += 1
+        request = _parse_var_request(params)
+        key = tuple(request.items())
+        result = self.results_cache.get(key)
+        if result is not None:
+            self.stats['cache_hits'] += 1
+            return {**result, 'cached': True}
+
+        async def compute():
+            self.stats['computations'] += 1
+            result = await self._compute(request)
+            self.results_cache.put(key, result)
+            return result
+
+        return {**await self._coalesce(('var',) + key, compute), 'cached': False}
+
+    async def _compute(self, request):
+        returns = await self.get_returns(request['ticker'], request['exchange'], request['window'])
+        value = request['portfolio_value']
+        confidence_level = request['confidence_level']
+        horizon = request['horizon']
+
+        result = {name: request[name] for name in ('ticker', 'exchange', 'portfolio_value',
+                                                   'confidence_level', 'horizon', 'window')}
+        result['methods'] = list(request['methods'])
+        if 'parametric' in request['methods']:
+            result['parametric_var'] = calculate_parametric_var(returns, value, confidence_level, horizon)
+        if 'historical' in request['methods']:
+            result['historical_var'] = calculate_historical_var(
+                returns, value, confidence_level, horizon,
+                method=request['historical_method'], samples=request['bootstrap_samples'], seed=request['seed']
+            )
+        if 'monte_carlo' in request['methods']:
+            loop = asyncio.get_running_loop()
+            result['monte_carlo_var'] = await loop.run_in_executor(self.executor, functools.partial(
+                calculate_monte_carlo_var, returns, value, confidence_level, horizon,
+                request['simulations'], seed=request['seed'], sampling=request['sampling']
+            ))
+        for method in request['methods']:
+            result[f"{method}_es"] = result[f"{method}_var"].expected_shortfall
+        return result
+
+    async def handle(self, method, target, body=b''):
+        """
+        Route one HTTP request.
+
+        :param method: HTTP method
+        :param target: Request target (path and query string)
+        :param body: Request body
+        :return: Tuple of (status code, JSON-serializable payload)
+        """
+        url = urlsplit(target)
+        try:
+            if url.path == '/health':
+                return 200, {'status': 'ok'}
+            if url.path == '/stats':
+                return 200, {**self.stats, 'cached_series': len(self.returns_cache),
+                             'cached_results': len(self.results_cache), 'in_flight': len(self._inflight)}
+            if url.path == '/var':
+                if method not in ('GET', 'POST'):
+                    return 405, {'error': f"Method {method} not allowed"}
+                params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                if body:
+                    params.update(json.loads(body))
+                return 200, await self.calculate(params)
+            return 404, {'error': f"Unknown path {url.path}"}
+
+        except DataFetchError as e:
+            return 502, {'error': str(e)}
+        except (ValueError, TypeError, RuntimeError) as e:
+            # Invalid parameters; the calculators report theirs as RuntimeError
+            return 400, {'error': str(e)}
+        except Exception as e:
+            logger.exception(f"Request {method} {target} failed")
+            return 500, {'error': str(e)}
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection, with keep-alive"""
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                    body = await reader.readexactly(int(headers.get('content-length', 0)))
+                except ValueError:
+                    status, payload, version = 400, {'error': 'Malformed request'}, 'HTTP/1.0'
+                else:
+                    status, payload = await self.handle(method, target, body)
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutting down with this connection idle
+            pass
+        finally:
+            writer.close()
+
+async def start_server(service, host=None, port=None):
+    """
+    Start listening for HTTP requests.
+
+    :param service: VaRService
+    :param host: Interface to bind [default: settings.SERVER_HOST]
+    :param port: Port to bind, 0 for any free port [default: settings.SERVER_PORT]
+    :return: asyncio Server
+    """
+    host = host or settings.SERVER_HOST
+    port = settings.SERVER_PORT if port is None else port
+    return await asyncio.start_server(service.handle_connection, host, port)
+
+def serve(service, host=None, port=None):
+    """
+    Run the VaR service until interrupted.
+
+    :param service: VaRService
+    :param host: Interface to bind [default: settings.SERVER_HOST]
+    :param port: Port to bind [default: settings.SERVER_PORT]
+    """
+    async def run():
+        server = await start_server(service, host, port)
+        address = server.sockets[0].getsockname()
+        logger.info(f"VaR service listening on http://{address[0]}:{address[1]}")
+        print(f"VaR service listening on http://{address[0]}:{address[1]} (Ctrl+C to stop)")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        logger.info("VaR service stopped")
+    finally:
+        service.close()
@@ -0,0 +1,214 @@
+import math
+import logging
+from collections import deque
+from functools import lru_cache
+from statistics import NormalDist
+import numpy as np
+from .backtest import SortedWindow
+from .mc_engine import simulate_standard_normals
+from .return_series import as_return_series
+
+logger = logging.getLogger(__name__)
+
+STREAMING_METHODS = ('parametric', 'historical', 'monte_carlo')
+
+# RiskMetrics decay factor for daily data
+DEFAULT_DECAY = 0.94
+
+@lru_cache(maxsize=None)
+def _normal_quantile(p):
+    return NormalDist().inv_cdf(p)
+
+class _SymbolState:
+    """Streaming state of one symbol"""
+
+    __slots__ = ('last_close', 'price', 'variance', 'current_variance', 'residuals', 'sorted_residuals')
+
+    def __init__(self, last_close, variance, residuals):
+        self.last_close = last_close
+        self.price = last_close
+        # EWMA variance forecast for the current day, and the same updated with the
+        # move so far today (what the variance would be if the day closed now)
+        self.variance = variance
+        self.current_variance = variance
+        self.residuals = deque(residuals, maxlen=len(residuals))
+        self.sorted_residuals = SortedWindow(residuals)
+
+    def tick(self, price, decay):
+        """Record an intraday price and fold the move since the last close into today's variance"""
+        move = math.log(price / self.last_close)
+        self.price = price
+        self.current_variance = decay * self.variance + (1 - decay) * move * move
+
+class StreamingVaR:
+    """
+    Intraday VaR for many symbols, updated as each price arrives.
+
+    Each symbol is seeded once from its daily log returns (e.g. the output of
+    fetch_stock_data) and then keeps:
+    - an EWMA (RiskMetrics) variance, updated in O(1) per tick
+    - a window of returns standardized by the EWMA volatility at the time,
+      kept sorted so filtered historical simulation (FHS) VaR rescales its
+      quantile by the current volatility in O(1); the window only changes at
+      the daily close, in O(log n) search plus a short memory move
+
+    Monte Carlo VaR reuses one set of standard normal shocks drawn on
+    construction: with lognormal returns the simulated quantile is the shocks'
+    quantile scaled by the current volatility, so it costs O(1) per query.
+
+    Ticks are plain scalar arithmetic with no array allocation, so one process
+    keeps up with thousands of symbols ticking every second.
+    """
+
+    def __init__(self, window=252, decay=DEFAULT_DECAY, simulations=10000, seed=None, sampling='pseudo'):
+        """
+        :param window: Standardized returns kept per symbol for FHS
+        :param decay: EWMA decay factor (0 < decay < 1)
+        :param simulations: Monte Carlo shocks drawn once and reused
+        :param seed: Random seed for the shocks
+        :param sampling: 'pseudo', 'antithetic' or 'sobol' shocks
+        """
+        if window < 10:
+            raise ValueError("Window must be at least 10 returns")
+        if not 0 < decay < 1:
+            raise ValueError("Decay must be between 0 and 1")
+        if simulations <= 1000:
+            raise ValueError("Minimum 1000 simulations required")
+        self.window = window
+        self.decay = decay
+        self._shocks = SortedWindow(simulate_standard_normals(simulations, seed=seed, sampling=sampling).tolist())
+        self._states = {}
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, symbol):
+        return symbol in self._states
+
+    @property
+    def symbols(self):
+        return list(self._states)
+
+    def add(self, symbol, returns, last_price):
+        """
+        Seed a symbol from its daily history.
+
+        :param symbol: Symbol name
+        :param returns: ReturnSeries or array of daily log returns, oldest first
+        :param last_price: Latest closing price, which ticks are measured against
+        """
+        returns = as_return_series(returns).values[-self.window:]
+        if last_price <= 0:
+            raise ValueError("Last price must be positive")
+
+        # Start from the window's mean square, then run the EWMA through it,
+        # standardizing each return by the forecast made before it was seen
+        decay = self.decay
+        variance = float(np.mean(returns ** 2))
+        residuals = []
+        for value in returns.tolist():
+            residuals.append(value / math.sqrt(variance) if variance > 0 else 0.0)
+            variance = decay * variance + (1 - decay) * value * value
+        self._states[symbol] = _SymbolState(float(last_price), variance, residuals)
+
+    def remove(self, symbol):
+        del self._states[symbol]
+
+    def update(self, symbol, price):
+        """
+        Apply an intraday tick in O(1).
+
+        :param symbol: Symbol name
+        :param price: Latest traded price
+        """
+        self._states[symbol].tick(price, self.decay)
+
+    def update_many(self, ticks):
+        """
+        Apply a batch of intraday ticks.
+
+        :param ticks: Iterable of (symbol, price)
+        """
+        decay = self.decay
+        states = self._states
+        for symbol, price in ticks:
+            states[symbol].tick(price, decay)
+
+    def close(self, symbol, price=None):
+        """
+        Commit the day's return at the close and roll the FHS window by one day.
+
+        :param symbol: Symbol name
+        :param price: Closing price [default: the last tick]
+        """
+        state = self._states[symbol]
+        price = state.price if price is None else price
+        move = math.log(price / state.last_close)
+
+        residual = move / math.sqrt(state.variance) if state.variance > 0 else 0.0
+        if len(state.residuals) == state.residuals.maxlen:
+            state.sorted_residuals.remove(state.residuals[0])
+        state.residuals.append(residual)
+        state.sorted_residuals.insert(residual)
+
+        state.variance = self.decay * state.variance + (1 - self.decay) * move * move
+        state.current_variance = state.variance
+        state.last_close = price
+        state.price = price
+
+    def volatility(self, symbol):
+        """Current daily EWMA volatility, including the move so far today"""
+        return math.sqrt(self._states[symbol].current_variance)
+
+    def price(self, symbol):
+        """Latest price"""
+        return self._states[symbol].price
+
+    def var(self, symbol, portfolio_value, confidence_level=0.95, horizon=1, method='parametric'):
+        """
+        Current VaR of a position.
+
+        :param symbol: Symbol name
+        :param portfolio_value: Current position value
+        :param confidence_level: Confidence level (0.90-0.99)
+        :param horizon: Time horizon in days (volatility scaled by its square root)
+        :param method: 'parametric' (EWMA normal), 'historical' (FHS) or 'monte_carlo' (EWMA lognormal)
+        :return: VaR value (always positive)
+        """
+        if not 0.90 <= confidence_level <= 0.99:
+            raise ValueError("Confidence level must be between 0.90 and 0.99")
+        state = self._states[symbol]
+        volatility = math.sqrt(state.current_variance * horizon)
+        p = 1 - confidence_level
+
+        if method == 'parametric':
+            # RiskMetrics: zero mean, normal returns
+            var = -portfolio_value * _normal_quantile(p) * volatility
+        elif method == 'historical':
+            var = -portfolio_value * math.expm1(volatility * state.sorted_residuals.quantile(p))
+        elif method == 'monte_carlo':
+            # Lognormal with zero expected price change: drift -σ²/2
+            quantile = -0.5 * volatility * volatility + volatility * self._shocks.quantile(p)
+            var = -portfolio_value * math.expm1(quantile)
+        else:
+            raise ValueError(f"Unknown method '{method}'. Use one of: {', '.join(STREAMING_METHODS)}")
+        return max(0.0, var)
+
+    def snapshot(self, portfolio_values, confidence_level=0.95, horizon=1, methods=STREAMING_METHODS):
+        """
+        Current VaR of many positions.
+
+        :param portfolio_values: Dict of symbol -> current position value
+        :param confidence_level: Confidence level (0.90-0.99)
+        :param horizon: Time horizon in days
+        :param methods: VaR methods to evaluate
+        :return: Dict of symbol -> {'price', 'volatility', '<method>_var', ...}
+        """
+        return {
+            symbol: {
+                'price': self._states[symbol].price,
+                'volatility': self.volatility(symbol),
+                **{f"{method}_var": self.var(symbol, value, confidence_level, horizon, method) for method in methods},
+            }
+            for symbol, value in portfolio_values.items()
+        }
@@ -1,13 +1,22 @@
-import os
-import sys
-
-def get_project_root():
-    """Get the absolute path to the project root directory"""
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.dirname(os.path.dirname(current_dir))
-
-def add_project_root_to_path():
-    """Add project root to Python path for module resolution"""
-    project_root = get_project_root()
-    if project_root not in sys.path:
-        sys.path.insert(0, project_root)
+import os
+import sys
+
+def get_project_root():
+    """Get the absolute path to the project root directory"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.dirname(os.path.dirname(current_dir))
+
+def add_project_root_to_path():
+    """Add project root to Python path for module resolution"""
+    project_root = get_project_root()
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+def validate_var_parameters(portfolio_value, confidence_level, horizon):
+    """Validate the inputs shared by the VaR calculators"""
+    if not 0.90 <= confidence_level <= 0.99:
+        raise ValueError("Confidence level must be between 0.90 and 0.99")
+    if portfolio_value <= 0:
+        raise ValueError("Portfolio value must be positive")
+    if horizon <= 0:
+        raise ValueError("Time horizon must be positive")
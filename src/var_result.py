@@ -0,0 +1,137 @@
+import math
+from functools import lru_cache
+from statistics import NormalDist
+import numpy as np
+
+class VaRResult(float):
+    """
+    VaR value carrying the tail statistics of the loss distribution behind it.
+
+    A float subclass: it is the VaR everywhere a calculator's plain float was
+    used before (formatting, arithmetic, pandas, JSON, SQLite), and adds the
+    Expected Shortfall, and when requested the tail losses and the moments of
+    the loss distribution, computed in the same pass as the VaR.
+
+    :ivar expected_shortfall: Mean loss at or beyond VaR (ES / CVaR, always positive)
+    :ivar confidence_level: Confidence level of the VaR and ES
+    :ivar horizon: Time horizon in days
+    :ivar method: Calculation method
+    :ivar tail: Losses at or beyond VaR (unordered), if requested and the method has a sample
+    :ivar moments: Dict of mean, std, skewness and excess kurtosis of the loss distribution, if requested
+    """
+
+    __slots__ = ('expected_shortfall', 'confidence_level', 'horizon', 'method', 'tail', 'moments')
+
+    def __new__(cls, var, expected_shortfall, confidence_level, horizon, method, tail=None, moments=None):
+        result = float.__new__(cls, var)
+        result.expected_shortfall = float(expected_shortfall)
+        result.confidence_level = confidence_level
+        result.horizon = horizon
+        result.method = method
+        result.tail = tail
+        result.moments = moments
+        return result
+
+    def __reduce__(self):
+        return (VaRResult, (float(self), self.expected_shortfall, self.confidence_level, self.horizon,
+                            self.method, self.tail, self.moments))
+
+    def __repr__(self):
+        return (
+            f"VaRResult(var={float(self):.2f}, expected_shortfall={self.expected_shortfall:.2f}, "
+            f"confidence_level={self.confidence_level}, horizon={self.horizon}, method={self.method!r})"
+        )
+
+    # Printing and f-strings show the VaR as a plain number, as before results carried metadata
+    __str__ = float.__repr__
+
+    @property
+    def var(self):
+        """VaR as a plain float"""
+        return float(self)
+
+    def to_dict(self):
+        """VaR, ES and moments (without the tail sample) as a JSON-serializable dict"""
+        return {
+            'method': self.method,
+            'confidence_level': self.confidence_level,
+            'horizon': self.horizon,
+            'var': float(self),
+            'expected_shortfall': self.expected_shortfall,
+            **({} if self.moments is None else self.moments),
+        }
+
+@lru_cache(maxsize=None)
+def normal_scores(confidence_level):
+    """
+    Standard normal scores of VaR and ES at a confidence level.
+
+    :param confidence_level: Confidence level
+    :return: Tuple of (Z, the (1 - confidence) quantile; the ES score -φ(Z)/(1 - confidence),
+             the mean of the standard normal tail below Z)
+    """
+    z_score = NormalDist().inv_cdf(1 - confidence_level)
+    return z_score, -NormalDist().pdf(z_score) / (1 - confidence_level)
+
+def loss_moments(losses, weights=None):
+    """
+    Mean, standard deviation, skewness and excess kurtosis of a loss sample.
+
+    :param losses: Array of losses
+    :param weights: Optional counts per loss (e.g. histogram bins)
+    :return: Dict of mean, std, skewness, kurtosis
+    """
+    mean = np.average(losses, weights=weights)
+    centered = losses - mean
+    squared = centered * centered
+    variance = np.average(squared, weights=weights)
+    std = math.sqrt(variance)
+    if std == 0:
+        return {'mean': float(mean), 'std': 0.0, 'skewness': 0.0, 'kurtosis': 0.0}
+    return {
+        'mean': float(mean),
+        'std': std,
+        'skewness': float(np.average(squared * centered, weights=weights) / std ** 3),
+        'kurtosis': float(np.average(squared * squared, weights=weights) / variance ** 2 - 3),
+    }
+
+def normal_moments(mean, std):
+    """Moments of a normal loss distribution"""
+    return {'mean': float(mean), 'std': float(std), 'skewness': 0.0, 'kurtosis': 0.0}
+
+def upper_tail(losses, confidence_level):
+    """
+    VaR and the tail beyond it from one selection pass over a loss sample.
+
+    np.partition places the two order statistics around the confidence
+    level's position (so VaR matches np.percentile's linear interpolation)
+    and leaves every larger loss after them, so ES needs no sort.
+
+    :param losses: Array of losses
+    :param confidence_level: Confidence level
+    :return: Tuple of (VaR, tail losses at or beyond VaR)
+    """
+    position = confidence_level * (len(losses) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(losses) - 1)
+    partitioned = np.partition(losses, (lower, upper))
+    var = partitioned[lower] + (partitioned[upper] - partitioned[lower]) * (position - lower)
+    return var, partitioned[math.ceil(position):]
+
+def sample_result(losses, confidence_level, horizon, method, details=False):
+    """
+    VaRResult of an empirical loss distribution (historical or simulated).
+
+    :param losses: Array of losses
+    :param confidence_level: Confidence level
+    :param horizon: Time horizon in days
+    :param method: Calculation method
+    :param details: Keep the tail sample and compute the moments
+    :return: VaRResult (VaR and ES floored at zero)
+    """
+    var, tail = upper_tail(losses, confidence_level)
+    return VaRResult(
+        max(0, var), max(0, tail.mean()), confidence_level, horizon, method,
+        tail=tail.copy() if details else None,
+        moments=loss_moments(losses) if details else None
+    )
@@ -0,0 +1,144 @@
+import numpy as np
+from statistics import NormalDist
+import logging
+from .horizon import aggregate_horizon_returns
+from .return_series import as_return_series
+from .mc_engine import simulate_standard_normal_quantiles
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+SURFACE_METHODS = ('parametric', 'historical', 'monte_carlo')
+DEFAULT_CONFIDENCE_LEVELS = (0.90, 0.91, 0.92, 0.93, 0.94, 0.95, 0.96, 0.97, 0.98, 0.99)
+DEFAULT_HORIZONS = (1, 5, 10, 20)
+
+def _parametric_surface(returns, portfolio_value, levels, horizons):
+    """Closed-form parametric VaR over the grid: |Z × σ × √T - μ × T|"""
+    mean = returns.mean
+    std = returns.std
+    z_scores = np.array([NormalDist().inv_cdf(1 - level) for level in levels])
+    var = portfolio_value * np.abs(
+        np.outer(np.sqrt(horizons) * std, z_scores) - (mean * horizons)[:, None]
+    )
+    return var
+
+def _historical_surface(returns, portfolio_value, levels, horizons, method, samples, seed):
+    """Historical VaR over the grid: one loss distribution and one quantile call per horizon"""
+    seeds = seed.spawn(len(horizons))
+    var = np.empty((len(horizons), len(levels)))
+    for row, (horizon, horizon_seed) in enumerate(zip(horizons, seeds)):
+        if horizon > 1:
+            returns_dist = aggregate_horizon_returns(
+                returns, horizon, method=method, samples=samples, seed=horizon_seed,
+                prefix=returns.prefix_sum
+            )
+            losses = -portfolio_value * np.expm1(returns_dist)
+            var[row] = np.percentile(losses, 100 * levels)
+        else:
+            # Daily losses come straight from the series' cached sorted copy
+            var[row] = -portfolio_value * np.expm1(returns.quantile(1 - levels))
+    return var
+
+def _monte_carlo_surface(returns, portfolio_value, levels, horizons, simulations, seed, sampling, workers):
+    """
+    Monte Carlo VaR over the grid from a single set of shocks.
+
+    Horizon log returns are drift_T + vol_T·Z with vol_T > 0, so their quantiles
+    are the same affine map of the quantiles of Z; the shocks are simulated by
+    the chunked engine and their quantiles extracted once for every horizon and level.
+    """
+    daily_mean = returns.mean
+    daily_std = returns.std
+    shock_quantiles = simulate_standard_normal_quantiles(
+        1 - levels, simulations, workers=workers, seed=seed, sampling=sampling
+    )
+
+    # Geometric Brownian motion over T days: (μ - 0.5σ²)T + σ√T·Z
+    drift = (daily_mean - 0.5 * daily_std ** 2) * horizons
+    volatility = daily_std * np.sqrt(horizons)
+    log_returns = drift[:, None] + np.outer(volatility, shock_quantiles)
+    return -portfolio_value * np.expm1(log_returns)
+
+@timed('var.surface')
+def calculate_var_surface(returns, portfolio_value, confidence_levels=DEFAULT_CONFIDENCE_LEVELS,
+                          horizons=DEFAULT_HORIZONS, methods=SURFACE_METHODS, simulations=10000,
+                          historical_method='bootstrap', bootstrap_samples=10000, seed=None,
+                          sampling='pseudo', mc_workers=1):
+    """
+    Calculate VaR for every confidence level and horizon in one pass per method.
+
+    Each method builds its loss distribution once per horizon (Monte Carlo once
+    overall) and extracts all requested quantiles in a single vectorized call;
+    the parametric surface is evaluated in closed form.
+
+    :param returns: ReturnSeries or array of historical log returns
+    :param portfolio_value: Current portfolio value
+    :param confidence_levels: Confidence levels (each 0.90-0.99)
+    :param horizons: Time horizons in days
+    :param methods: Any of 'parametric', 'historical', 'monte_carlo'
+    :param simulations: Monte Carlo simulations count
+    :param historical_method: Multi-day historical aggregation, 'bootstrap' or 'overlapping'
+    :param bootstrap_samples: Historical block bootstrap sample count
+    :param seed: Random seed
+    :param sampling: Monte Carlo sampling, 'pseudo', 'antithetic' or 'sobol'
+    :param mc_workers: Worker processes for Monte Carlo simulation chunks
+    :return: DataFrame with columns method, horizon, confidence_level, value_at_risk
+    """
+    # Deferred so the CLI can read SURFACE_METHODS without loading pandas
+    import pandas as pd
+
+    try:
+        returns = as_return_series(returns)
+        levels = np.asarray(confidence_levels, dtype=np.float64)
+        horizons = np.asarray(horizons, dtype=np.int64)
+
+        # Validate inputs (the series itself is validated once on construction)
+        if levels.size == 0 or np.any((levels < 0.90) | (levels > 0.99)):
+            raise ValueError("Confidence levels must be between 0.90 and 0.99")
+        if portfolio_value <= 0:
+            raise ValueError("Portfolio value must be positive")
+        if horizons.size == 0 or np.any(horizons <= 0):
+            raise ValueError("Time horizons must be positive")
+        unknown = set(methods) - set(SURFACE_METHODS)
+        if unknown:
+            raise ValueError(f"Unknown methods: {', '.join(sorted(unknown))}")
+        if 'monte_carlo' in methods and simulations <= 1000:
+            raise ValueError("Minimum 1000 simulations required")
+
+        seeds = dict(zip(SURFACE_METHODS, np.random.SeedSequence(seed).spawn(len(SURFACE_METHODS))))
+        surfaces = {}
+        if 'parametric' in methods:
+            surfaces['parametric'] = _parametric_surface(returns, portfolio_value, levels, horizons)
+        if 'historical' in methods:
+            surfaces['historical'] = _historical_surface(
+                returns, portfolio_value, levels, horizons,
+                historical_method, bootstrap_samples, seeds['historical']
+            )
+        if 'monte_carlo' in methods:
+            surfaces['monte_carlo'] = _monte_carlo_surface(
+                returns, portfolio_value, levels, horizons, simulations, seeds['monte_carlo'],
+                sampling, mc_workers
+            )
+
+        grid_horizons = np.repeat(horizons, len(levels))
+        grid_levels = np.tile(levels, len(horizons))
+        surface = pd.concat([
+            pd.DataFrame({
+                'method': method,
+                'horizon': grid_horizons,
+                'confidence_level': grid_levels,
+                # Ensure non-negative VaR
+                'value_at_risk': np.maximum(values.ravel(), 0.0),
+            })
+            for method, values in surfaces.items()
+        ], ignore_index=True)
+
+        logger.info(
+            f"VaR surface calculated: {len(methods)} methods x {len(horizons)} horizons x "
+            f"{len(levels)} confidence levels"
+        )
+        return surface
+
+    except Exception as e:
+        logger.error(f"VaR surface calculation failed: {str(e)}")
+        raise RuntimeError(f"VaR surface calculation error: {str(e)}")
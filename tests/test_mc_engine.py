@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from src.mc_engine import simulate_lognormal_quantile, simulate_standard_normal_quantiles
+
+DRIFT = 0.0005
+VOLATILITY = 0.02
+
+@pytest.mark.parametrize('sampling', ['pseudo', 'antithetic'])
+def test_chunked_run_is_reproducible_across_worker_counts(sampling):
+    runs = [
+        simulate_lognormal_quantile(DRIFT, VOLATILITY, 0.99, 40000, chunk_size=10000,
+                                    workers=workers, seed=7, sampling=sampling)
+        for workers in (1, 2, 3)
+    ]
+
+    for run in runs[1:]:
+        assert run.simulations == runs[0].simulations
+        assert run.quantile == runs[0].quantile
+        assert run.tail_mean == runs[0].tail_mean
+        assert (run.ci_low, run.ci_high) == (runs[0].ci_low, runs[0].ci_high)
+
+def test_single_chunk_is_reproducible_for_a_seed():
+    first = simulate_lognormal_quantile(DRIFT, VOLATILITY, 0.95, 5000, seed=3)
+    second = simulate_lognormal_quantile(DRIFT, VOLATILITY, 0.95, 5000, seed=3)
+    other = simulate_lognormal_quantile(DRIFT, VOLATILITY, 0.95, 5000, seed=4)
+
+    assert first.quantile == second.quantile
+    assert first.quantile != other.quantile
+
+def test_chunked_quantile_matches_single_chunk():
+    exact = simulate_lognormal_quantile(DRIFT, VOLATILITY, 0.99, 200000, seed=1)
+    chunked = simulate_lognormal_quantile(DRIFT, VOLATILITY, 0.99, 200000, chunk_size=20000, seed=1)
+
+    assert chunked.quantile == pytest.approx(exact.quantile, rel=1e-3)
+    assert chunked.tail_mean == pytest.approx(exact.tail_mean, rel=1e-3)
+
+def test_tolerance_stops_early_at_default_simulation_count():
+    estimate = simulate_lognormal_quantile(DRIFT, VOLATILITY, 0.95, 10000, seed=1, tolerance=0.5)
+
+    assert estimate.simulations < 10000
+
+def test_tolerance_warns_when_run_fits_in_one_chunk(caplog):
+    estimate = simulate_lognormal_quantile(DRIFT, VOLATILITY, 0.95, 2000, seed=1, tolerance=0.5)
+
+    assert estimate.simulations == 2000
+    assert 'tolerance has no effect' in caplog.text
+
+def test_standard_normal_quantiles_are_reproducible_across_worker_counts():
+    probabilities = [0.01, 0.05, 0.10]
+    serial = simulate_standard_normal_quantiles(probabilities, 40000, chunk_size=10000, seed=5)
+    parallel = simulate_standard_normal_quantiles(probabilities, 40000, chunk_size=10000, workers=2, seed=5)
+
+    np.testing.assert_array_equal(serial, parallel)
+    np.testing.assert_allclose(serial, [-2.326, -1.645, -1.282], atol=0.05)
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.exceptions import DataFetchError
+from src.price_cache import PriceCache, calendar_days
+
+class FakeDownloader:
+    """Stand-in for Yahoo Finance serving closes from a fixed business-day history"""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def __call__(self, symbol, period=None, start=None):
+        self.calls.append({'period': period, 'start': start})
+        if start is not None:
+            prices = self.prices[self.prices.index >= pd.Timestamp(start)]
+        else:
+            days = int(period.rstrip('d'))
+            prices = self.prices[self.prices.index > self.prices.index[-1] - pd.Timedelta(days=days)]
+        return prices.rename(symbol)
+
+def _history(days, end='2024-06-28'):
+    dates = pd.bdate_range(end=end, periods=days)
+    return pd.Series(100 + np.arange(days, dtype=np.float64), index=dates)
+
+def test_cold_download_covers_window_trading_days(tmp_path):
+    downloader = FakeDownloader(_history(1000))
+    cache = PriceCache(str(tmp_path), downloader)
+
+    prices = cache.get('TEST.NS', 252)
+
+    assert len(prices) == 252
+    assert downloader.calls == [{'period': f"{calendar_days(252)}d", 'start': None}]
+
+def test_fresh_symbol_is_served_without_download(tmp_path):
+    downloader = FakeDownloader(_history(1000))
+    cache = PriceCache(str(tmp_path), downloader, max_age=3600)
+    first = cache.get('TEST.NS', 100)
+
+    second = cache.get('TEST.NS', 100)
+
+    assert len(downloader.calls) == 1
+    np.testing.assert_array_equal(first.values, second.values)
+    np.testing.assert_array_equal(first.index.values.astype('datetime64[D]'),
+                                  second.index.values.astype('datetime64[D]'))
+
+def test_stale_symbol_merges_downloaded_tail(tmp_path):
+    history = _history(600)
+    downloader = FakeDownloader(history.iloc[:-5])
+    cache = PriceCache(str(tmp_path), downloader, max_age=0)
+    cache.get('TEST.NS', 200)
+
+    # Five new closes, and a corrected value for the last cached (intraday) close
+    updated = history.copy()
+    updated.iloc[-6] = -1.0
+    downloader.prices = updated
+    prices = cache.get('TEST.NS', 200)
+
+    assert downloader.calls[-1]['start'] == history.index[-6]
+    assert prices.index[-1] == history.index[-1]
+    assert prices.iloc[-6] == -1.0
+    assert len(prices) == 200
+    assert not prices.index.duplicated().any()
+    np.testing.assert_array_equal(cache.load('TEST.NS').values[-200:], updated.values[-200:])
+
+def test_longer_window_downloads_again(tmp_path):
+    downloader = FakeDownloader(_history(1000))
+    cache = PriceCache(str(tmp_path), downloader)
+    cache.get('TEST.NS', 100)
+
+    prices = cache.get('TEST.NS', 500)
+
+    assert len(prices) == 500
+    assert len(downloader.calls) == 2
+
+def test_offline_miss_raises_without_download(tmp_path):
+    downloader = FakeDownloader(_history(100))
+    cache = PriceCache(str(tmp_path), downloader)
+
+    with pytest.raises(DataFetchError):
+        cache.get('MISSING.NS', 50, offline=True)
+    assert downloader.calls == []
+
+def test_offline_hit_serves_cache(tmp_path):
+    downloader = FakeDownloader(_history(300))
+    cache = PriceCache(str(tmp_path), downloader, max_age=0)
+    cache.get('TEST.NS', 100)
+
+    prices = cache.get('TEST.NS', 100, offline=True)
+
+    assert len(prices) == 100
+    assert len(downloader.calls) == 1
+
+def test_caches_sharing_a_directory_keep_each_others_symbols(tmp_path):
+    downloader = FakeDownloader(_history(300))
+    first = PriceCache(str(tmp_path), downloader)
+    second = PriceCache(str(tmp_path), downloader)
+    first.get('A.NS', 100)
+    second.get('B.NS', 100)
+
+    first.get('B.NS', 100)
+    second.get('A.NS', 100)
+
+    assert len(downloader.calls) == 2
@@ -0,0 +1,23 @@
+import os
+from config import settings
+from src.renderer import report_path
+
+RECORDS = [
+    {'ticker': 'RELIANCE', 'exchange': 'NSE', 'portfolio_value': 1000000},
+    {'ticker': 'RELIANCE', 'exchange': 'NSE', 'portfolio_value': 500000},
+]
+
+def test_report_paths_are_unique_per_record(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'REPORTS_DIR', str(tmp_path))
+
+    paths = [report_path(record, 'png', index) for index, record in enumerate(RECORDS)]
+
+    assert len(set(paths)) == len(RECORDS)
+    assert all(os.path.dirname(path) == str(tmp_path) for path in paths)
+
+def test_single_report_path_has_no_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'REPORTS_DIR', str(tmp_path))
+
+    filename = os.path.basename(report_path(RECORDS[0], 'none'))
+
+    assert filename == f"var_report_{settings.CURRENT_USER}_NSE_RELIANCE_{settings.TIMESTAMP}.json"
@@ -0,0 +1,60 @@
+import sqlite3
+from src.results_store import ResultsStore, RESULT_FIELDS
+
+# var_results as created before the Expected Shortfall columns were added
+OLD_SCHEMA = """
+CREATE TABLE var_results (
+    id INTEGER PRIMARY KEY,
+    run_at TEXT NOT NULL,
+    user TEXT NOT NULL,
+    command TEXT,
+    ticker TEXT NOT NULL,
+    exchange TEXT NOT NULL,
+    portfolio_value REAL NOT NULL,
+    confidence_level REAL,
+    horizon INTEGER,
+    window INTEGER,
+    simulations INTEGER,
+    historical_method TEXT,
+    bootstrap_samples INTEGER,
+    sampling TEXT,
+    seed INTEGER,
+    parametric_var REAL,
+    historical_var REAL,
+    monte_carlo_var REAL
+);
+"""
+
+def _record(ticker, **values):
+    return {'ticker': ticker, 'exchange': 'NSE', 'portfolio_value': 1000000.0, 'user': 'analyst', **values}
+
+def test_records_expected_shortfall(tmp_path):
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        store.append(_record('RELIANCE', parametric_var=25000.0, parametric_es=31000.0, monte_carlo_es=30500.0))
+        history = store.history(ticker='RELIANCE')
+
+    assert list(history.columns) == list(RESULT_FIELDS)
+    assert history.loc[0, 'parametric_es'] == 31000.0
+    assert history.loc[0, 'monte_carlo_es'] == 30500.0
+
+def test_migrates_database_without_expected_shortfall_columns(tmp_path):
+    path = str(tmp_path / 'results.db')
+    connection = sqlite3.connect(path)
+    connection.executescript(OLD_SCHEMA)
+    connection.execute(
+        "INSERT INTO var_results (run_at, user, ticker, exchange, portfolio_value, parametric_var) "
+        "VALUES ('2025-01-02T10:00:00', 'analyst', 'TCS', 'NSE', 500000, 12000)"
+    )
+    connection.commit()
+    connection.close()
+
+    with ResultsStore(path) as store:
+        store.append(_record('TCS', parametric_var=13000.0, parametric_es=16000.0))
+        history = store.history(ticker='TCS')
+
+    assert history['parametric_var'].tolist() == [12000.0, 13000.0]
+    assert history['parametric_es'].isna().tolist() == [True, False]
+
+    # Reopening an up-to-date database leaves it unchanged
+    with ResultsStore(path) as store:
+        assert len(store.history(ticker='TCS')) == 2
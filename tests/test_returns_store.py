@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.returns_store import build_returns_store
+
+DATES = pd.bdate_range('2024-01-01', periods=300)
+
+def _prices(seed, dates=DATES):
+    rng = np.random.default_rng(seed)
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates)))), index=dates)
+
+@pytest.fixture
+def store(tmp_path):
+    full = _prices(1)
+    histories = {
+        'RELIANCE.NS': full,
+        # Did not trade on three days in the middle of the history
+        'TCS.NS': _prices(2).drop(DATES[[100, 101, 200]]),
+        'INFY.NS': _prices(3).iloc[150:],
+    }
+    return build_returns_store(str(tmp_path / 'store'), histories)
+
+def test_days_without_a_return_are_missing_not_zero(store):
+    returns = np.asarray(store.returns)
+    tcs = returns[:, store.symbols.index('TCS.NS')]
+    infy = returns[:, store.symbols.index('INFY.NS')]
+
+    assert np.isnan(tcs[[99, 100, 199]]).all()
+    assert np.isnan(infy[:150]).all()
+    assert np.isfinite(returns[:, store.symbols.index('RELIANCE.NS')]).all()
+
+def test_series_skips_missing_days(store):
+    series = store.series('TCS.NS', 250)
+
+    assert len(series) == 250
+    assert np.isfinite(series.values).all()
+    assert len(store.series('TCS.NS')) == 299 - 3
+    # The return after a gap spans the missed days
+    prices = _prices(2)
+    gap_return = series.values[list(series.dates).index(np.datetime64(DATES[102].date(), 'D'))]
+    assert gap_return == pytest.approx(np.log(prices.iloc[102] / prices.iloc[99]))
+
+def test_series_matches_prices_without_gaps(store):
+    series = store.series('RELIANCE.NS', 100)
+    prices = _prices(1)
+
+    np.testing.assert_allclose(series.values, np.diff(np.log(prices.values))[-100:])
+
+def test_window_longer_than_history_is_rejected(store):
+    with pytest.raises(ValueError, match='INFY.NS'):
+        store.series('INFY.NS', 200)
+    with pytest.raises(ValueError, match='TCS.NS'):
+        store.series('TCS.NS', 298)
+
+def test_batch_window_matches_fetched_prices(store, monkeypatch):
+    import src.batch as batch
+
+    histories = {'RELIANCE.NS': _prices(1).iloc[-120:]}
+    monkeypatch.setattr(batch, 'fetch_bulk_prices', lambda pairs, window, **kwargs: (histories, {}))
+    positions = pd.DataFrame({'ticker': ['RELIANCE'], 'exchange': ['NSE'], 'portfolio_value': [1e6]})
+    options = dict(window=120, simulations=2000, seed=7, workers=1)
+
+    fetched = batch.run_batch(positions, **options)
+    stored = batch.run_batch(positions, returns_store=store, **options)
+
+    for column in ('parametric_var', 'historical_var', 'monte_carlo_var'):
+        assert float(stored[column][0]) == pytest.approx(float(fetched[column][0]))
+
+@pytest.mark.parametrize('gap_policy, max_gap', [('drop', None), ('ffill', 1)])
+def test_block_size_does_not_change_stored_returns(tmp_path, monkeypatch, gap_policy, max_gap):
+    from config import settings
+
+    monkeypatch.setattr(settings, 'GAP_POLICY', gap_policy)
+    monkeypatch.setattr(settings, 'MAX_GAP_DAYS', max_gap)
+    histories = {
+        'RELIANCE.NS': _prices(1),
+        # Both miss the same two days, which only the first symbol's block would otherwise show
+        'TCS.NS': _prices(2).drop(DATES[[100, 101]]),
+        'INFY.NS': _prices(3).drop(DATES[[100, 101]]),
+    }
+    whole = build_returns_store(str(tmp_path / 'whole'), histories)
+    single = build_returns_store(str(tmp_path / 'single'), histories, block_size=1)
+
+    np.testing.assert_array_equal(np.asarray(whole.returns), np.asarray(single.returns))
+    assert np.isnan(np.asarray(single.returns)[101, 1:]).all()
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from config import settings
+from src import data_fetcher
+from src.returns_transform import transform_prices, _configured_actions
+
+DATES = pd.bdate_range('2024-01-01', periods=60)
+
+def _adjusted_prices(seed):
+    rng = np.random.default_rng(seed)
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(DATES)))), index=DATES)
+
+@pytest.fixture
+def actions_file(tmp_path, monkeypatch):
+    path = tmp_path / 'actions.csv'
+    path.write_text(
+        "date,symbol,split,dividend\n"
+        f"{DATES[30].date()},RELIANCE.NS,2,0\n"
+        f"{DATES[45].date()},RELIANCE.NS,1,5\n"
+        f"{DATES[10].date()},TCS.NS,5,0\n"
+        # Before the prices start, so already reflected in them
+        "2020-06-01,RELIANCE.NS,10,0\n"
+    )
+    monkeypatch.setattr(settings, 'CORPORATE_ACTIONS_FILE', str(path))
+    _configured_actions.cache_clear()
+    yield str(path)
+    _configured_actions.cache_clear()
+
+def test_configured_actions_recover_adjusted_returns(actions_file):
+    adjusted = _adjusted_prices(1)
+    # Unadjusted closes: halved from the split on, and dropping by the dividend on its ex-date
+    raw = adjusted.copy()
+    raw.iloc[:30] *= 2
+    ratio = (raw.iloc[45] + 5) / raw.iloc[45]
+    raw.iloc[:45] *= ratio
+
+    returns = transform_prices({'RELIANCE.NS': raw}).series('RELIANCE.NS')
+
+    np.testing.assert_allclose(returns.values, np.diff(np.log(adjusted.values)), atol=1e-12)
+
+def test_explicit_actions_override_the_setting(actions_file):
+    prices = _adjusted_prices(2)
+    no_actions = pd.DataFrame({'date': pd.to_datetime([]), 'symbol': [], 'split': []})
+
+    returns = transform_prices({'RELIANCE.NS': prices}, actions=no_actions).series('RELIANCE.NS')
+
+    np.testing.assert_allclose(returns.values, np.diff(np.log(prices.values)))
+
+def test_price_cache_downloads_unadjusted_closes_when_actions_are_configured(actions_file, monkeypatch):
+    monkeypatch.setattr(data_fetcher, '_price_cache', None)
+
+    cache = data_fetcher.get_price_cache()
+
+    assert cache.directory.endswith('unadjusted')
+    assert cache.downloader.keywords == {'adjusted': False}
+    monkeypatch.setattr(settings, 'CORPORATE_ACTIONS_FILE', None)
+    monkeypatch.setattr(data_fetcher, '_price_cache', None)
+    assert data_fetcher.get_price_cache().directory == settings.PRICES_DIR
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from src.exceptions import DataFetchError
+from src.server import TTLCache, VaRService, synthetic_returns
+
+class CountingSource:
+    """synthetic_returns that counts its calls and is slow enough for requests to overlap"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker, exchange, window):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return synthetic_returns(ticker, exchange, window)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def service():
+    service = VaRService(data_source=CountingSource(), cache_size=8, cache_ttl=60)
+    yield service
+    service.close()
+
+REQUEST = {'ticker': 'RELIANCE', 'portfolio_value': 1000000, 'methods': 'parametric,historical', 'seed': 1}
+
+def test_concurrent_identical_requests_share_one_computation(service):
+    async def run():
+        return await asyncio.gather(*(service.calculate(dict(REQUEST)) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert service.data_source.calls == 1
+    assert service.stats['computations'] == 1
+    assert service.stats['coalesced'] == 4
+    assert len({result['parametric_var'] for result in results}) == 1
+    assert not any(result['cached'] for result in results)
+
+def test_repeated_request_is_served_from_cache(service):
+    async def run():
+        first = await service.calculate(dict(REQUEST))
+        second = await service.calculate({**REQUEST, 'methods': 'historical,parametric'})
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert second['cached'] and not first['cached']
+    assert second['historical_var'] == first['historical_var']
+    assert second['historical_es'] >= second['historical_var']
+    assert service.stats['computations'] == 1
+
+def test_cache_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=4, ttl=10, clock=clock)
+    cache.put('a', 1)
+
+    clock.now = 9.9
+    assert cache.get('a') == 1
+    clock.now = 10.0
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=10, clock=FakeClock())
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+@pytest.mark.parametrize('params', [
+    {'portfolio_value': 1000000},
+    {'ticker': 'RELIANCE'},
+    {'ticker': 'RELIANCE', 'portfolio_value': 1000000, 'exchange': 'LSE'},
+    {'ticker': 'RELIANCE', 'portfolio_value': 1000000, 'methods': 'delta'},
+    {'ticker': 'RELIANCE', 'portfolio_value': 1000000, 'methods': 'parametric', 'confidence': 0.5},
+    {'ticker': 'RELIANCE', 'portfolio_value': 'lots'},
+])
+def test_invalid_requests_return_400(service, params):
+    status, payload = asyncio.run(service.handle('POST', '/var', json.dumps(params).encode()))
+
+    assert status == 400
+    assert payload['error']
+
+def test_data_fetch_failure_returns_502():
+    def unavailable(ticker, exchange, window):
+        raise DataFetchError(f"No data found for {ticker}.NS")
+
+    service = VaRService(data_source=unavailable)
+    try:
+        status, payload = asyncio.run(service.handle('GET', '/var?ticker=DEAD&portfolio_value=1000&methods=parametric'))
+    finally:
+        service.close()
+
+    assert status == 502
+    assert 'DEAD' in payload['error']
+
+def test_unknown_path_and_method(service):
+    assert asyncio.run(service.handle('GET', '/missing'))[0] == 404
+    assert asyncio.run(service.handle('DELETE', '/var'))[0] == 405
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.parametric_var import calculate_parametric_var
+from src.historical_var import calculate_historical_var
+from src.monte_carlo_var import calculate_monte_carlo_var, calculate_path_monte_carlo_var
+from src.portfolio_var import (
+    calculate_portfolio_parametric_var,
+    calculate_portfolio_historical_var,
+    calculate_portfolio_monte_carlo_var
+)
+
+VALUE = 1000000.0
+
+# Fat-tailed daily log returns, so the tail beyond VaR is well populated
+RETURNS = np.random.default_rng(11).standard_t(4, 1000) * 0.01 + 0.0003
+
+CALCULATORS = {
+    'parametric': lambda returns, level, horizon: calculate_parametric_var(returns, VALUE, level, horizon),
+    'historical bootstrap': lambda returns, level, horizon: calculate_historical_var(
+        returns, VALUE, level, horizon, seed=1),
+    'historical overlapping': lambda returns, level, horizon: calculate_historical_var(
+        returns, VALUE, level, horizon, method='overlapping'),
+    'monte carlo': lambda returns, level, horizon: calculate_monte_carlo_var(
+        returns, VALUE, level, horizon, seed=1),
+    'monte carlo chunked': lambda returns, level, horizon: calculate_monte_carlo_var(
+        returns, VALUE, level, horizon, simulations=50000, chunk_size=8192, seed=1),
+    'monte carlo paths': lambda returns, level, horizon: calculate_path_monte_carlo_var(
+        returns, VALUE, level, horizon, innovations='student_t', volatility_model='ewma', seed=1),
+}
+
+@pytest.mark.parametrize('horizon', [1, 10])
+@pytest.mark.parametrize('level', [0.90, 0.95, 0.99])
+@pytest.mark.parametrize('method', list(CALCULATORS))
+def test_expected_shortfall_is_at_least_var(method, level, horizon):
+    var = CALCULATORS[method](RETURNS, level, horizon)
+
+    assert var > 0
+    assert var.expected_shortfall >= var
+    assert (var.confidence_level, var.horizon) == (level, horizon)
+
+@pytest.mark.parametrize('method', list(CALCULATORS))
+def test_var_and_expected_shortfall_grow_with_confidence(method):
+    results = [CALCULATORS[method](RETURNS, level, 1) for level in (0.90, 0.95, 0.99)]
+
+    assert results[0] < results[1] < results[2]
+    assert results[0].expected_shortfall < results[1].expected_shortfall < results[2].expected_shortfall
+
+@pytest.mark.parametrize('calculator', [
+    calculate_portfolio_parametric_var,
+    lambda returns, holdings, level, horizon: calculate_portfolio_historical_var(returns, holdings, level, horizon, seed=1),
+    lambda returns, holdings, level, horizon: calculate_portfolio_monte_carlo_var(returns, holdings, level, horizon, seed=1),
+])
+@pytest.mark.parametrize('horizon', [1, 5])
+def test_portfolio_expected_shortfall_is_at_least_var(calculator, horizon):
+    rng = np.random.default_rng(3)
+    returns = pd.DataFrame(rng.standard_t(5, (750, 3)) * 0.01, columns=['A.NS', 'B.NS', 'C.NS'])
+    holdings = np.array([500000.0, 300000.0, 200000.0])
+
+    var = calculator(returns, holdings, 0.99, horizon)
+
+    assert 0 < var <= var.expected_shortfall
+
+def test_str_is_the_plain_var():
+    var = calculate_parametric_var(RETURNS, VALUE, 0.95, 1)
+
+    assert str(var) == str(float(var))
+    assert f"{var}" == f"{float(var)}"
+    assert f"{var:,.2f}" == f"{float(var):,.2f}"
+    assert repr(var).startswith('VaRResult(')